@@ -1,6 +1,22 @@
-import requests
-import json
-from PIL import Image
+from diagram_render import KrokiRenderer, RenderError
+
+# Shared so that every call reuses the same pooled HTTP session
+_kroki = KrokiRenderer()
+
+def mermaid_to_png(mermaid_code: str) -> bytes:
+    """
+    Converts a Mermaid.js diagram string into PNG bytes with a white background using the Kroki API.
+    
+    Args:
+        mermaid_code (str): The Mermaid.js diagram definition.
+    
+    Returns:
+        bytes: The PNG image.
+    
+    Raises:
+        RenderError: If Kroki cannot render the diagram.
+    """
+    return _kroki.render(mermaid_code, "png")
 
 def mermaid_to_image(mermaid_code: str, output_filename: str = "diagram.png"):
     """
@@ -13,29 +29,15 @@ def mermaid_to_image(mermaid_code: str, output_filename: str = "diagram.png"):
     Returns:
         str: The file path of the saved image if successful, otherwise an error message.
     """
-    # Send request to Kroki API
-    url = "https://kroki.io/mermaid/png"
-    headers = {"Content-Type": "application/json"}
-    data = json.dumps({"diagram_source": mermaid_code})
-
-    response = requests.post(url, headers=headers, data=data)
+    # The image is rendered in memory; only the final file is written
+    try:
+        image = mermaid_to_png(mermaid_code)
+    except RenderError as e:
+        return f"❌ {e}"
 
-    # Save and modify the image if the request is successful
-    if response.status_code == 200:
-        temp_filename = "temp_diagram.png"
-        with open(temp_filename, "wb") as f:
-            f.write(response.content)
-        
-        # Open image and convert to white background
-        img = Image.open(temp_filename).convert("RGBA")
-        white_bg = Image.new("RGB", img.size, (255, 255, 255))  # White background
-        white_bg.paste(img, mask=img.split()[3])  # Apply alpha mask
-        
-        # Save final image
-        white_bg.save(output_filename, "PNG")
-        return f"✅ ER Diagram saved with white background as '{output_filename}'"
-    else:
-        return f"❌ Failed to generate diagram. API Response: {response.text}"
+    with open(output_filename, "wb") as f:
+        f.write(image)
+    return f"✅ ER Diagram saved with white background as '{output_filename}'"
 
 # # Example usage
 # mermaid_code = """
@@ -1,14 +1,29 @@
+# Imports are timed from here when STARTUP_PROFILE=1
+import startup_profile
+startup_profile.start()
+
 import streamlit as st
-import pandas as pd
-import pyodbc
-import re
 import os
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import Font, Alignment, PatternFill
+import json
+import tempfile
+import uuid
+import zipfile
 from io import BytesIO
-from ERD_Gen import mermaid_to_image
-from PIL import Image
+import explorer
+from explorer import connection_string, get_tables, generate_mermaid_erd
+from metadata_cache import MetadataCache, load_catalog_cached, refresh_catalog_cached
+from connection_pool import get_pool, close_all_pools
+from parallel_extract import DEFAULT_PARALLELISM
+from jobs import get_job_manager
+from catalog_export import export_catalog, EXPORT_FORMATS
+from dependency_graph import DependencyGraph, DIRECTIONS, DEPENDENT_NODE_TYPES
+from schema_erd import generate_schema_erd, CLUSTER_MODES, DEFAULT_MAX_TABLES
+from instrumentation import action, get_tracer, span
+import shutil
+
+# pandas, numpy (the search indexes), openpyxl (Excel reports) and the diagram
+# renderers are imported where they are first used, so the first page is drawn
+# without them; most sessions only connect and search
 
 # Set page config
 st.set_page_config(page_title="Database Metadata Explorer", layout="wide")
@@ -30,9 +45,18 @@ with col2:
     db_username = st.text_input("Username (leave empty for Windows Auth)", "")
     db_password = st.text_input("Password (leave empty for Windows Auth)", "", type="password")
 
+# Number of catalog queries run concurrently, capped to limit load on production servers
+parallelism = st.number_input("Parallel catalog queries", min_value=1, max_value=16, value=max(1, min(DEFAULT_PARALLELISM, 16)))
+
 # Global variables
-if 'conn' not in st.session_state:
-    st.session_state.conn = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'conn_str' not in st.session_state:
+    st.session_state.conn_str = None
+if 'catalog' not in st.session_state:
+    st.session_state.catalog = None
+if 'graph' not in st.session_state:
+    st.session_state.graph = None
 if 'tables' not in st.session_state:
     st.session_state.tables = []
 if 'selected_table' not in st.session_state:
@@ -41,636 +65,560 @@ if 'dependencies' not in st.session_state:
     st.session_state.dependencies = {}
 if 'similar_tables' not in st.session_state:
     st.session_state.similar_tables = []
+if 'similar_scores' not in st.session_state:
+    st.session_state.similar_scores = {}
+if 'similarity_index' not in st.session_state:
+    st.session_state.similarity_index = None
+if 'column_index' not in st.session_state:
+    st.session_state.column_index = None
+if 'search_index' not in st.session_state:
+    st.session_state.search_index = None
 if 'search_query' not in st.session_state:
     st.session_state.search_query = ""
 if 'filtered_tables' not in st.session_state:
     st.session_state.filtered_tables = []
 if 'relationships' not in st.session_state:
     st.session_state.relationships = []
+if 'report_job_id' not in st.session_state:
+    st.session_state.report_job_id = None
+if 'erd_job_id' not in st.session_state:
+    st.session_state.erd_job_id = None
+if 'schema_erd' not in st.session_state:
+    st.session_state.schema_erd = None
+if 'report_job_table' not in st.session_state:
+    st.session_state.report_job_table = None
+if 'export_job_id' not in st.session_state:
+    st.session_state.export_job_id = None
+if 'erd_job_code' not in st.session_state:
+    st.session_state.erd_job_code = None
+if 'schema_png_job_id' not in st.session_state:
+    st.session_state.schema_png_job_id = None
+if 'drift_report' not in st.session_state:
+    st.session_state.drift_report = None
+if 'drift_baseline' not in st.session_state:
+    st.session_state.drift_baseline = None
+
+# Maximum number of tables listed for a search
+SEARCH_LIMIT = 200
+# Slowest steps listed in the performance panel
+SLOWEST_STEPS = 25
+
+# Function to attribute the timings of a user action to this session
+def user_action(name):
+    return action(name, session=st.session_state.session_id)
 
 # Function to connect to database
 def connect_to_db():
     try:
         # Use Windows authentication if username is empty
-        if db_username == "":
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server};DATABASE={db_name};Trusted_Connection=yes;"
-        else:
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server};DATABASE={db_name};UID={db_username};PWD={db_password};"
+        conn_str = connection_string(db_server, db_name, db_username, db_password)
         
-        conn = pyodbc.connect(conn_str)
-        return conn, "Connected successfully!"
+        # Borrow once from the shared pool to validate the connection string
+        with get_pool(conn_str).connection():
+            pass
+        return conn_str, "Connected successfully!"
     except Exception as e:
         return None, f"Error connecting to database: {str(e)}"
 
-# Function to get all tables
-def get_tables(conn):
-    cursor = conn.cursor()
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME")
-    tables = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    return tables
-
-# Function to get table columns
-def get_table_metadata(conn, table_name):
-    cursor = conn.cursor()
-    cursor.execute(f"""
-    SELECT 
-        c.COLUMN_NAME,
-        c.DATA_TYPE,
-        c.CHARACTER_MAXIMUM_LENGTH,
-        c.IS_NULLABLE,
-        COLUMNPROPERTY(OBJECT_ID(c.TABLE_SCHEMA + '.' + c.TABLE_NAME), c.COLUMN_NAME, 'IsIdentity') as IS_IDENTITY,
-        (SELECT COUNT(*) FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE k
-         WHERE k.TABLE_NAME = c.TABLE_NAME AND k.COLUMN_NAME = c.COLUMN_NAME
-         AND EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
-                    WHERE tc.CONSTRAINT_NAME = k.CONSTRAINT_NAME
-                    AND tc.CONSTRAINT_TYPE = 'PRIMARY KEY')) as IS_PRIMARY_KEY
-    FROM INFORMATION_SCHEMA.COLUMNS c
-    WHERE c.TABLE_NAME = ?
-    ORDER BY c.ORDINAL_POSITION
-    """, table_name)
-    
-    columns = []
-    for row in cursor.fetchall():
-        column_name, data_type, max_length, is_nullable, is_identity, is_primary_key = row
-        
-        # Format data type with length if applicable
-        if max_length is not None and max_length != -1:
-            formatted_type = f"{data_type}({max_length})"
-        elif max_length == -1:  # MAX types
-            formatted_type = f"{data_type}(MAX)"
-        else:
-            formatted_type = data_type
-            
-        columns.append({
-            "Column Name": column_name,
-            "Data Type": formatted_type,
-            "Nullable": "YES" if is_nullable == "YES" else "NO",
-            "Identity": "YES" if is_identity == 1 else "NO",
-            "Primary Key": "YES" if is_primary_key == 1 else "NO"
-        })
-    
-    cursor.close()
-    return pd.DataFrame(columns)
+# Function to identify dependencies and keep their relationships for the ERD
+def find_dependencies(graph, table_name, depth=1, direction="incoming"):
+    with span("compute", "dependency traversal"):
+        dependencies, st.session_state.relationships = explorer.find_dependencies(graph, table_name, depth, direction)
+    return dependencies
 
-# Function to get views
-def get_view_metadata(conn, view_name):
-    cursor = conn.cursor()
-    
-    # Get columns in the view
-    cursor.execute(f"""
-    SELECT 
-        c.COLUMN_NAME,
-        c.DATA_TYPE,
-        c.CHARACTER_MAXIMUM_LENGTH,
-        c.IS_NULLABLE
-    FROM INFORMATION_SCHEMA.COLUMNS c
-    WHERE c.TABLE_NAME = ?
-    ORDER BY c.ORDINAL_POSITION
-    """, view_name)
-    
-    columns = []
-    for row in cursor.fetchall():
-        column_name, data_type, max_length, is_nullable = row
-        
-        # Format data type with length if applicable
-        if max_length is not None and max_length != -1:
-            formatted_type = f"{data_type}({max_length})"
-        elif max_length == -1:  # MAX types
-            formatted_type = f"{data_type}(MAX)"
-        else:
-            formatted_type = data_type
-            
-        columns.append({
-            "Column Name": column_name,
-            "Data Type": formatted_type,
-            "Nullable": "YES" if is_nullable == "YES" else "NO"
-        })
-    
-    # Get view definition
-    cursor.execute(f"""
-    SELECT VIEW_DEFINITION 
-    FROM INFORMATION_SCHEMA.VIEWS 
-    WHERE TABLE_NAME = ?
-    """, view_name)
-    
-    view_def = cursor.fetchone()
-    definition = view_def[0] if view_def else "Definition not available"
-    
-    cursor.close()
-    
-    metadata = {
-        "columns": pd.DataFrame(columns),
-        "definition": definition
-    }
-    
-    return metadata
+# Function to find similar tables and keep their scores for display
+def find_similar_tables(similarity_index, selected_table):
+    with span("compute", "similar tables"):
+        similar = explorer.find_similar_tables(similarity_index, selected_table)
+    st.session_state.similar_scores = dict(similar)
+    return [table for table, _ in similar]
 
-# Function to get stored procedure metadata
-def get_procedure_metadata(conn, proc_name):
-    cursor = conn.cursor()
-    
-    # Get procedure definition
-    cursor.execute(f"""
-    SELECT ROUTINE_DEFINITION 
-    FROM INFORMATION_SCHEMA.ROUTINES 
-    WHERE ROUTINE_NAME = ? AND ROUTINE_TYPE = 'PROCEDURE'
-    """, proc_name)
-    
-    proc_def = cursor.fetchone()
-    definition = proc_def[0] if proc_def else "Definition not available"
-    
-    # Get parameters
-    cursor.execute(f"""
-    SELECT 
-        PARAMETER_NAME,
-        DATA_TYPE,
-        CHARACTER_MAXIMUM_LENGTH,
-        PARAMETER_MODE
-    FROM INFORMATION_SCHEMA.PARAMETERS
-    WHERE SPECIFIC_NAME = ?
-    ORDER BY ORDINAL_POSITION
-    """, proc_name)
-    
-    params = []
-    for row in cursor.fetchall():
-        param_name, data_type, max_length, mode = row
-        
-        # Format data type with length if applicable
-        if max_length is not None and max_length != -1:
-            formatted_type = f"{data_type}({max_length})"
-        elif max_length == -1:  # MAX types
-            formatted_type = f"{data_type}(MAX)"
-        else:
-            formatted_type = data_type
-            
-        params.append({
-            "Parameter Name": param_name,
-            "Data Type": formatted_type,
-            "Mode": mode
-        })
-    
-    cursor.close()
-    
-    metadata = {
-        "parameters": pd.DataFrame(params) if params else pd.DataFrame(columns=["Parameter Name", "Data Type", "Mode"]),
-        "definition": definition
-    }
-    
-    return metadata
+# Function to get the session's similarity index, building it on first use
+def get_similarity_index():
+    if st.session_state.similarity_index is None:
+        from similarity_index import ColumnSimilarityIndex
+        with span("compute", "build similarity index"):
+            st.session_state.similarity_index = ColumnSimilarityIndex.from_catalog(st.session_state.catalog)
+    return st.session_state.similarity_index
 
-# Function to get function metadata
-def get_function_metadata(conn, func_name):
-    cursor = conn.cursor()
-    
-    # Get function definition
-    cursor.execute(f"""
-    SELECT ROUTINE_DEFINITION 
-    FROM INFORMATION_SCHEMA.ROUTINES 
-    WHERE ROUTINE_NAME = ? AND ROUTINE_TYPE = 'FUNCTION'
-    """, func_name)
-    
-    func_def = cursor.fetchone()
-    definition = func_def[0] if func_def else "Definition not available"
-    
-    # Get parameters
-    cursor.execute(f"""
-    SELECT 
-        PARAMETER_NAME,
-        DATA_TYPE,
-        CHARACTER_MAXIMUM_LENGTH,
-        PARAMETER_MODE
-    FROM INFORMATION_SCHEMA.PARAMETERS
-    WHERE SPECIFIC_NAME = ?
-    ORDER BY ORDINAL_POSITION
-    """, func_name)
-    
-    params = []
-    for row in cursor.fetchall():
-        param_name, data_type, max_length, mode = row
-        
-        # Format data type with length if applicable
-        if max_length is not None and max_length != -1:
-            formatted_type = f"{data_type}({max_length})"
-        elif max_length == -1:  # MAX types
-            formatted_type = f"{data_type}(MAX)"
-        else:
-            formatted_type = data_type
-            
-        params.append({
-            "Parameter Name": param_name,
-            "Data Type": formatted_type,
-            "Mode": mode
-        })
-    
-    # Get return type
-    cursor.execute(f"""
-    SELECT 
-        DATA_TYPE,
-        CHARACTER_MAXIMUM_LENGTH
-    FROM INFORMATION_SCHEMA.ROUTINES
-    WHERE ROUTINE_NAME = ? AND ROUTINE_TYPE = 'FUNCTION'
-    """, func_name)
-    
-    return_type_row = cursor.fetchone()
-    return_type = ""
-    if return_type_row:
-        data_type, max_length = return_type_row
-        
-        # Format data type with length if applicable
-        if max_length is not None and max_length != -1:
-            return_type = f"{data_type}({max_length})"
-        elif max_length == -1:  # MAX types
-            return_type = f"{data_type}(MAX)"
-        else:
-            return_type = data_type
-    
-    cursor.close()
-    
-    metadata = {
-        "parameters": pd.DataFrame(params) if params else pd.DataFrame(columns=["Parameter Name", "Data Type", "Mode"]),
-        "return_type": return_type,
-        "definition": definition
-    }
-    
-    return metadata
-
-# Function to identify dependencies using the corrected query
-def find_dependencies(conn, table_name):
-    cursor = conn.cursor()
-    dependencies = {
-        "tables": [],
-        "views": [],
-        "procedures": [],
-        "functions": []
-    }
-    
-    # Get related tables through foreign keys - UPDATED with correct query
-    cursor.execute(f"""
-    SELECT DISTINCT
-        fk.name AS ForeignKeyName,
-        OBJECT_SCHEMA_NAME(fkc.parent_object_id) AS ReferencingSchema,
-        tp.name AS ReferencingTable,
-        cp.name AS ReferencingColumn,
-        OBJECT_SCHEMA_NAME(fkc.referenced_object_id) AS ReferencedSchema,
-        tr.name AS ReferencedTable,
-        cr.name AS ReferencedColumn
-    FROM 
-        sys.foreign_keys fk
-    JOIN 
-        sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-    JOIN 
-        sys.tables tp ON fkc.parent_object_id = tp.object_id
-    JOIN 
-        sys.columns cp ON fkc.parent_object_id = cp.object_id AND fkc.parent_column_id = cp.column_id
-    JOIN 
-        sys.tables tr ON fkc.referenced_object_id = tr.object_id
-    JOIN 
-        sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
-    WHERE 
-        tr.name = ?
-    ORDER BY 
-        ReferencedTable, ReferencingTable
-    """, table_name)
-    
-    # Store relationship data for ERD generation
-    relationships = []
-    
-    for row in cursor.fetchall():
-        fk_name, ref_schema, ref_table, ref_column, refed_schema, refed_table, refed_column = row
-        
-        # Add to relationships list for Mermaid diagram
-        relationships.append({
-            "fk_name": fk_name,
-            "referencing_schema": ref_schema,
-            "referencing_table": ref_table,
-            "referencing_column": ref_column,
-            "referenced_schema": refed_schema,
-            "referenced_table": refed_table,
-            "referenced_column": refed_column
-        })
-        
-        # Add to dependencies
-        if ref_table != table_name and ref_table not in dependencies["tables"]:
-            dependencies["tables"].append(ref_table)
-        if refed_table != table_name and refed_table not in dependencies["tables"]:
-            dependencies["tables"].append(refed_table)
-    
-    # Store relationships in session state
-    st.session_state.relationships = relationships
-    
-    # Get views that reference the table
-    cursor.execute(f"""
-    SELECT DISTINCT
-        v.name
-    FROM 
-        sys.views v
-        INNER JOIN sys.sql_expression_dependencies d 
-            ON v.object_id = d.referencing_id
-        INNER JOIN sys.tables t 
-            ON t.object_id = d.referenced_id
-    WHERE 
-        t.name = ?
-    """, table_name)
-    
-    for row in cursor.fetchall():
-        dependencies["views"].append(row[0])
-    
-    # Get stored procedures that reference the table
-    cursor.execute(f"""
-    SELECT DISTINCT
-        p.name
-    FROM 
-        sys.procedures p
-        INNER JOIN sys.sql_expression_dependencies d 
-            ON p.object_id = d.referencing_id
-        INNER JOIN sys.tables t 
-            ON t.object_id = d.referenced_id
-    WHERE 
-        t.name = ?
-    """, table_name)
-    
-    for row in cursor.fetchall():
-        dependencies["procedures"].append(row[0])
-    
-    # Get functions that reference the table
-    cursor.execute(f"""
-    SELECT DISTINCT
-        f.name
-    FROM 
-        sys.objects f
-        INNER JOIN sys.sql_expression_dependencies d 
-            ON f.object_id = d.referencing_id
-        INNER JOIN sys.tables t 
-            ON t.object_id = d.referenced_id
-    WHERE 
-        t.name = ? AND
-        f.type IN ('FN', 'IF', 'TF')
-    """, table_name)
-    
-    for row in cursor.fetchall():
-        dependencies["functions"].append(row[0])
-    
-    cursor.close()
-    return dependencies
+# Function to build the Excel report in a background job
+# Returns the workbook bytes, or the path of the temporary file in streaming mode
+def excel_report_job(source, selected_table, dependencies, similar_tables, streaming, job):
+    from excel_report import generate_excel_report, generate_excel_report_streaming
+    
+    if streaming:
+        report_path = generate_excel_report_streaming(source, selected_table, dependencies, similar_tables,
+                                                      progress=job.progress)
+        # Deleted when the next report replaces this one or the job expires
+        job.add_cleanup(os.remove, report_path)
+        return report_path
+    excel_file = generate_excel_report(source, selected_table, dependencies, similar_tables, progress=job.progress)
+    return excel_file.getvalue()
 
-# Function to generate Mermaid ERD
-def generate_mermaid_erd(relationships, selected_table):
-    mermaid_code = ["erDiagram"]
-    
-    # Track added relationships to avoid duplicates
-    added_relationships = set()
-    
-    for rel in relationships:
-        ref_table = rel["referencing_table"]
-        refed_table = rel["referenced_table"]
-        
-        # Create a unique identifier for this relationship
-        rel_key = f"{ref_table}:{refed_table}:{rel['referencing_column']}:{rel['referenced_column']}"
-        
-        if rel_key not in added_relationships:
-            # Add the relationship to the diagram
-            # Format: TableA ||--o{ TableB : "Column relationship"
-            mermaid_code.append(f'    {refed_table} ||--o{{ {ref_table} : "{rel["referenced_column"]}"')
-            added_relationships.add(rel_key)
-    
-    return "\n".join(mermaid_code)
+# Function to render the ERD image in a background job
+# Diagrams already rendered once are served from the render cache
+def erd_image_job(mermaid_code, job):
+    from diagram_render import get_renderer
+    from render_cache import get_render_cache
+    
+    job.progress(0, 1)
+    renderer = get_renderer()
+    image = get_render_cache().get_or_render(mermaid_code, renderer.render, renderer.options("png"))
+    job.progress(1, 1)
+    return image
 
-# Function to find similar tables
-def find_similar_tables(tables, selected_table):
-    # Extract root name (e.g., "work" from "workorders")
-    # Try different patterns to extract meaningful prefixes
-    prefixes = []
-    
-    # Case 1: Split by underscore
-    if '_' in selected_table:
-        parts = selected_table.split('_')
-        # Add the first part as a potential prefix
-        if parts[0]:
-            prefixes.append(parts[0].lower())
-    
-    # Case 2: Split by camel case
-    # Find boundaries between lowercase and uppercase letters
-    camel_parts = re.findall(r'[A-Z]?[a-z]+', selected_table)
-    if camel_parts and camel_parts[0]:
-        prefixes.append(camel_parts[0].lower())
-    
-    # Case 3: Just use first 4 characters if they're alphabetic
-    if len(selected_table) >= 4 and selected_table[:4].isalpha():
-        prefixes.append(selected_table[:4].lower())
-    
-    # Default: use the table name as is
-    prefixes.append(selected_table.lower())
-    
-    # Find tables that match any of the prefixes
-    similar = []
-    for table in tables:
-        # Skip the selected table itself
-        if table.lower() == selected_table.lower():
-            continue
-            
-        # Check if the table starts with any of our prefixes
-        table_lower = table.lower()
-        for prefix in prefixes:
-            if table_lower.startswith(prefix):
-                similar.append(table)
-                break
-                
-    return similar
+# The progress of a running job re-renders every second on Streamlit versions
+# with fragments, without re-running the rest of the page
+def auto_refresh(func):
+    fragment = getattr(st, "fragment", None)
+    return fragment(run_every=1)(func) if fragment else func
 
-# Function to generate Excel report
-def generate_excel_report(conn, selected_table, dependencies, similar_tables):
-    # Create workbook
-    wb = Workbook()
-    
-    # Create summary sheet
-    summary_sheet = wb.active
-    summary_sheet.title = "Summary"
-    
-    # Add header
-    summary_sheet.append(["Object Type", "Count", "Objects"])
-    header_font = Font(bold=True)
-    header_fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-    
-    for cell in summary_sheet[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-    
-    # Add data
-    all_objects = []
-    
-    # Add selected table
-    table_row = ["Tables", 1 + len(dependencies["tables"]) + len(similar_tables)]
-    table_objects = [selected_table] + dependencies["tables"] + similar_tables
-    table_row.append(", ".join(table_objects))
-    summary_sheet.append(table_row)
-    all_objects.extend(table_objects)
-    
-    # Add views
-    if dependencies["views"]:
-        views_row = ["Views", len(dependencies["views"]), ", ".join(dependencies["views"])]
-        summary_sheet.append(views_row)
-        all_objects.extend(dependencies["views"])
-    
-    # Add procedures
-    if dependencies["procedures"]:
-        procs_row = ["Stored Procedures", len(dependencies["procedures"]), ", ".join(dependencies["procedures"])]
-        summary_sheet.append(procs_row)
-        all_objects.extend(dependencies["procedures"])
-    
-    # Add functions
-    if dependencies["functions"]:
-        funcs_row = ["Functions", len(dependencies["functions"]), ", ".join(dependencies["functions"])]
-        summary_sheet.append(funcs_row)
-        all_objects.extend(dependencies["functions"])
-    
-    # Format summary sheet
-    for column in ['A', 'B', 'C']:
-        summary_sheet.column_dimensions[column].width = 25 if column != 'C' else 60
-    
-    # Create sheets for each object
-    for obj_name in all_objects:
-        # Determine object type
-        obj_type = None
-        if obj_name == selected_table or obj_name in dependencies["tables"] or obj_name in similar_tables:
-            obj_type = "table"
-        elif obj_name in dependencies["views"]:
-            obj_type = "view"
-        elif obj_name in dependencies["procedures"]:
-            obj_type = "procedure"
-        elif obj_name in dependencies["functions"]:
-            obj_type = "function"
-        
-        if not obj_type:
-            continue
-        
-        # Create sheet for the object
-        # Ensure sheet name is valid (max 31 chars, no illegal chars)
-        sheet_name = obj_name[:31].replace(':', '').replace('\\', '').replace('/', '').replace('?', '').replace('*', '').replace('[', '').replace(']', '')
-        obj_sheet = wb.create_sheet(title=sheet_name)
-        
-        # Add metadata based on object type
-        if obj_type == "table":
-            metadata = get_table_metadata(conn, obj_name)
-            obj_sheet.append(["Table Metadata: " + obj_name])
-            obj_sheet.append([])  # Empty row
-            
-            # Write table metadata
-            obj_sheet.append(list(metadata.columns))
-            for row in dataframe_to_rows(metadata, index=False, header=False):
-                obj_sheet.append(row)
-        
-        elif obj_type == "view":
-            metadata = get_view_metadata(conn, obj_name)
-            obj_sheet.append(["View Metadata: " + obj_name])
-            obj_sheet.append([])  # Empty row
-            
-            # Write view columns
-            obj_sheet.append(["View Columns:"])
-            obj_sheet.append(list(metadata["columns"].columns))
-            for row in dataframe_to_rows(metadata["columns"], index=False, header=False):
-                obj_sheet.append(row)
-            
-            # Write view definition
-            obj_sheet.append([])  # Empty row
-            obj_sheet.append(["View Definition:"])
-            obj_sheet.append([metadata["definition"]])
-            
-        elif obj_type == "procedure":
-            metadata = get_procedure_metadata(conn, obj_name)
-            obj_sheet.append(["Stored Procedure Metadata: " + obj_name])
-            obj_sheet.append([])  # Empty row
-            
-            # Write procedure parameters
-            if not metadata["parameters"].empty:
-                obj_sheet.append(["Parameters:"])
-                obj_sheet.append(list(metadata["parameters"].columns))
-                for row in dataframe_to_rows(metadata["parameters"], index=False, header=False):
-                    obj_sheet.append(row)
-            
-            # Write procedure definition
-            obj_sheet.append([])  # Empty row
-            obj_sheet.append(["Procedure Definition:"])
-            obj_sheet.append([metadata["definition"]])
-            
-        elif obj_type == "function":
-            metadata = get_function_metadata(conn, obj_name)
-            obj_sheet.append(["Function Metadata: " + obj_name])
-            obj_sheet.append([])  # Empty row
-            
-            # Write function return type
-            obj_sheet.append(["Return Type:"])
-            obj_sheet.append([metadata["return_type"]])
-            
-            # Write function parameters
-            if not metadata["parameters"].empty:
-                obj_sheet.append([])  # Empty row
-                obj_sheet.append(["Parameters:"])
-                obj_sheet.append(list(metadata["parameters"].columns))
-                for row in dataframe_to_rows(metadata["parameters"], index=False, header=False):
-                    obj_sheet.append(row)
-            
-            # Write function definition
-            obj_sheet.append([])  # Empty row
-            obj_sheet.append(["Function Definition:"])
-            obj_sheet.append([metadata["definition"]])
-        
-        # Format the sheet
-        obj_sheet.column_dimensions['A'].width = 30
-        if obj_type in ["table", "view"]:
-            for column in ['B', 'C', 'D', 'E']:
-                obj_sheet.column_dimensions[column].width = 20
-    
-    # Save to a BytesIO object
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
+# Function to poll a running job, rerunning the page once it has finished
+# so its result is drawn once, outside the polling fragment
+@auto_refresh
+def job_progress(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.fraction, text=f"{job.label}: {job.done} of {job.total or '?'} done")
+    if st.button("Cancel", key=f"cancel_{job.id}"):
+        job.cancel()
+
+# Function to show a running job's progress with a cancel button
+# Returns the job once it has finished, None while it runs or if there is none
+def show_job_progress(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return None
+    if not job.finished:
+        job_progress(job_id)
+        return None
+    if job.status == "cancelled":
+        st.warning(f"{job.label} was cancelled.")
+        return None
+    return job
+
+# Function to start rendering a diagram in the background, once per diagram
+# The render starts again if its job expired or was discarded for a retry
+# state_key prefixes the session keys holding the job ID and its Mermaid code
+def ensure_erd_job(state_key, mermaid_code, label="ERD diagram"):
+    id_key, code_key = f"{state_key}_job_id", f"{state_key}_job_code"
+    job_id = st.session_state.get(id_key)
+    if st.session_state.get(code_key) != mermaid_code or not job_id or get_job_manager().get(job_id) is None:
+        if st.session_state.get(id_key):
+            get_job_manager().cancel(st.session_state[id_key])
+        with user_action(f"Render {label}"):
+            job = get_job_manager().submit("erd", label, erd_image_job, mermaid_code)
+        st.session_state[id_key] = job.id
+        st.session_state[code_key] = mermaid_code
+    return st.session_state[id_key]
+
+# Function to offer rendering a failed or cancelled diagram again
+# ensure_erd_job submits a new render once the old job is gone
+def erd_retry_button(job_id):
+    if st.button("Retry", key=f"retry_{job_id}"):
+        get_job_manager().discard(job_id)
+        st.rerun()
+
+def erd_job_panel(job_id, file_name="er_diagram.png"):
+    job = show_job_progress(job_id)
+    if job is None:
+        job = get_job_manager().get(job_id)
+        if job is not None and job.status == "cancelled":
+            erd_retry_button(job_id)
+        return
+    if job.status == "failed":
+        st.error("❌ Failed to generate diagram due to Mermaid syntax error. Please fix the Mermaid code or retry.")
+        st.code(str(job.error), language="bash")
+        erd_retry_button(job_id)
+        return
+    st.subheader("ERD Diagram")
+    st.image(job.result, caption="Visualized ERD Diagram", use_column_width=True)
+    
+    # PNG download
+    st.download_button("Download ERD Diagram (PNG)", data=job.result, file_name=file_name, mime="image/png", key=f"png_{job.id}")
+
+def offer_report_download(data):
+    st.download_button(
+        label="Download Excel Report",
+        data=data,
+        file_name=f"DB_Metadata_{st.session_state.report_job_table}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+def report_job_panel():
+    job = show_job_progress(st.session_state.report_job_id)
+    if job is None:
+        return
+    if job.status == "failed":
+        st.error(f"Error generating Excel report: {job.error}")
+        return
+    
+    # Offer download, reading a streamed report from its temporary file
+    if isinstance(job.result, str):
+        if not os.path.exists(job.result):
+            st.warning("The Excel report file is no longer available. Please generate it again.")
+            return
+        with open(job.result, "rb") as report_file:
+            offer_report_download(report_file)
+    else:
+        offer_report_download(job.result)
     
-    return excel_file
+    st.success("Excel report generated successfully!")
+
+# Function to export the whole catalog in a background job
+# Returns the path of a temporary zip archive holding the exported files
+def catalog_export_job(conn_str, fmt, parallelism, job):
+    export_dir = tempfile.mkdtemp(prefix="catalog_export_")
+    try:
+        export_catalog(get_pool(conn_str), export_dir, fmt, parallelism=parallelism, progress=job.progress)
+        fd, archive_path = tempfile.mkstemp(prefix="catalog_export_", suffix=".zip")
+        os.close(fd)
+        # Deleted when the next export replaces this one or the job expires
+        job.add_cleanup(os.remove, archive_path)
+        # Parquet (zstd) and the CSV bundle are already compressed, so they
+        # are only stored; plain-text JSONL is deflated
+        compression = zipfile.ZIP_DEFLATED if fmt == "jsonl" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(archive_path, "w", compression=compression) as archive:
+            for file_name in sorted(os.listdir(export_dir)):
+                archive.write(os.path.join(export_dir, file_name), file_name)
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
+    return archive_path
+
+def export_job_panel():
+    job = show_job_progress(st.session_state.export_job_id)
+    if job is None:
+        return
+    if job.status == "failed":
+        st.error(f"Error exporting catalog: {job.error}")
+        return
+    if not os.path.exists(job.result):
+        st.warning("The catalog export is no longer available. Please export it again.")
+        return
+    with open(job.result, "rb") as export_file:
+        st.download_button(
+            label="Download Catalog Export",
+            data=export_file,
+            file_name=f"Catalog_{db_name}.zip",
+            mime="application/zip"
+        )
+
+# Function to render every page of a schema ERD in a background job
+# Returns the bytes of a zip archive with one PNG per page
+def schema_png_job(schema_erd, job):
+    from diagram_render import get_renderer, render_batch
+    from render_cache import get_render_cache
+    
+    names = ["00_overview"] + [f"{number:02d}_{page['tables'][0]}"
+                               for number, page in enumerate(schema_erd["pages"], start=1)]
+    sources = [schema_erd["overview"]] + [page["code"] for page in schema_erd["pages"]]
+    results = render_batch(sources, get_renderer(), "png", get_render_cache(), progress=job.progress)
+    
+    archive = BytesIO()
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as bundle:
+        for name, (image, error) in zip(names, results):
+            if error is None:
+                bundle.writestr(f"{name}.png", image)
+            else:
+                bundle.writestr(f"{name}.error.txt", str(error))
+    return archive.getvalue()
+
+def schema_png_job_panel():
+    job = show_job_progress(st.session_state.schema_png_job_id)
+    if job is None:
+        return
+    if job.status == "failed":
+        st.error(f"Error rendering diagrams: {job.error}")
+        return
+    st.download_button("Download All Diagrams (PNG)", data=job.result,
+                       file_name=f"ERD_{db_name}_png.zip", mime="application/zip")
+
+# Persistent catalog cache shared by all sessions
+@st.cache_resource
+def get_metadata_cache():
+    return MetadataCache()
+
+# Function to load the catalog of the connected database into the session
+def load_session_catalog(force_refresh=False):
+    with st.spinner("Loading database catalog..."):
+        catalog, message = load_catalog_cached(
+            get_pool(st.session_state.conn_str), db_server, db_name, get_metadata_cache(),
+            force_refresh, parallelism, login=db_username
+        )
+    set_session_catalog(catalog)
+    return message
+
+# Function to re-read only the objects changed since the catalog was loaded
+def refresh_session_catalog():
+    with st.spinner("Refreshing database catalog..."):
+        message = refresh_catalog_cached(
+            get_pool(st.session_state.conn_str), db_server, db_name, get_metadata_cache(),
+            st.session_state.catalog, parallelism, login=db_username
+        )
+    set_session_catalog(st.session_state.catalog)
+    return message
+
+# Function to (re)build everything the session derives from the catalog
+def set_session_catalog(catalog):
+    from search_index import TableSearchIndex
+    from column_index import ColumnIndex
+    
+    st.session_state.catalog = catalog
+    with span("compute", "build indexes", tables=len(catalog.tables)):
+        st.session_state.graph = DependencyGraph.from_catalog(catalog)
+        st.session_state.tables = get_tables(catalog)
+        st.session_state.search_index = TableSearchIndex.from_catalog(catalog)
+        st.session_state.column_index = ColumnIndex.from_catalog(catalog)
+        # The similarity index is built on the first analysis; once built,
+        # only tables whose columns changed are re-fingerprinted
+        if st.session_state.similarity_index is not None:
+            st.session_state.similarity_index.sync(catalog)
+    st.session_state.filtered_tables = []
+    st.session_state.schema_erd = None
+    st.session_state.schema_png_job_id = None
+    st.session_state.drift_report = None
+    st.session_state.drift_baseline = None
+
+# Function to load the catalog another connected database is compared with
+def load_baseline_catalog(source, uploaded_file, server, database):
+    from schema_diff import load_catalog_file
+    if source == "file":
+        return load_catalog_file(uploaded_file)
+    conn_str = connection_string(server, database, db_username, db_password)
+    catalog, _ = load_catalog_cached(get_pool(conn_str), server, database, get_metadata_cache(),
+                                     False, parallelism, login=db_username)
+    return catalog
+
+# Function to show the changes found by a schema drift comparison
+def drift_panel():
+    from schema_diff import definition_diff, summary_rows
+    import pandas as pd
+    
+    report = st.session_state.drift_report
+    stats = report["stats"]
+    if report["identical"]:
+        st.success(f"No drift: all {stats['objects']} objects are identical.")
+        return
+    st.write(f"**{len(report['added'])} added, {len(report['removed'])} removed, "
+             f"{len(report['changed'])} changed** ({stats['schemas_skipped']} of {stats['schemas']} schemas unchanged)")
+    st.dataframe(pd.DataFrame(summary_rows(report), columns=["Change", "Type", "Schema", "Name", "Details"]),
+                 hide_index=True)
+    st.download_button("Download Drift Report (JSON)", data=json.dumps(report, indent=2, default=str),
+                       file_name=f"drift_{db_name}.json", mime="application/json")
+    
+    redefined = [(entry["type"], entry["name"]) for entry in report["changed"] if "definition" in entry["changes"]]
+    if redefined:
+        obj_type, obj_name = st.selectbox("Definition changes", options=redefined,
+                                          format_func=lambda o: f"{o[1]} ({o[0]})")
+        st.code(definition_diff(st.session_state.drift_baseline, st.session_state.catalog, obj_type, obj_name),
+                language="diff")
 
 # Connect button
+force_refresh = st.checkbox("Force catalog refresh (ignore cached metadata)")
 if st.button("Connect to Database"):
-    conn, message = connect_to_db()
+    with user_action("Connect to Database"):
+        conn_str, message = connect_to_db()
+        
+        if conn_str:
+            st.session_state.conn_str = conn_str
+            message += " " + load_session_catalog(force_refresh)
     
-    if conn:
-        st.session_state.conn = conn
-        st.session_state.tables = get_tables(conn)
+    if conn_str:
         st.success(message)
     else:
         st.error(message)
 
 # If connected, show the rest of the app
-if st.session_state.conn:
+if st.session_state.conn_str:
     st.header("Database Exploration")
     
+    # Re-read the objects that changed on the server since the catalog was loaded
+    if st.button("Refresh Catalog"):
+        with user_action("Refresh Catalog"):
+            message = refresh_session_catalog()
+        st.success(message)
+    
+    # Machine-readable export of the whole catalog
+    with st.expander("Export Full Catalog"):
+        export_format = st.selectbox("Export format", options=EXPORT_FORMATS)
+        if st.button("Export Catalog"):
+            if st.session_state.export_job_id:
+                get_job_manager().discard(st.session_state.export_job_id)
+            with user_action("Export Catalog"):
+                job = get_job_manager().submit(
+                    "export", f"Catalog export ({export_format})", catalog_export_job,
+                    st.session_state.conn_str, export_format, parallelism
+                )
+            st.session_state.export_job_id = job.id
+        export_job_panel()
+    
+    # Differences from a saved catalog or another database
+    with st.expander("Schema Drift"):
+        drift_source = st.radio(
+            "Compare with",
+            options=["file", "database"],
+            format_func=lambda s: {"file": "Saved catalog (extract_cli or crawler JSON)", "database": "Another database"}[s],
+            horizontal=True
+        )
+        drift_file, drift_server, drift_database = None, None, None
+        if drift_source == "file":
+            drift_file = st.file_uploader("Baseline catalog", type=["json", "gz"])
+        else:
+            drift_col1, drift_col2 = st.columns(2)
+            with drift_col1:
+                drift_server = st.text_input("Baseline server", value=db_server)
+            with drift_col2:
+                drift_database = st.text_input("Baseline database")
+        if st.button("Compare Catalogs", disabled=not (drift_file or drift_database)):
+            from schema_diff import diff_catalogs
+            with user_action("Compare Catalogs"):
+                try:
+                    with st.spinner("Comparing catalogs..."):
+                        baseline = load_baseline_catalog(drift_source, drift_file, drift_server, drift_database)
+                        with span("compute", "diff catalogs"):
+                            st.session_state.drift_report = diff_catalogs(baseline, st.session_state.catalog)
+                    st.session_state.drift_baseline = baseline
+                except Exception as e:
+                    st.session_state.drift_report = None
+                    st.error(f"Error comparing catalogs: {str(e)}")
+        if st.session_state.drift_report:
+            drift_panel()
+    
+    # Whole-database ERD, split into clusters small enough to render
+    with st.expander("Whole-Database ERD"):
+        erd_col1, erd_col2 = st.columns(2)
+        with erd_col1:
+            max_tables = st.number_input("Tables per diagram", min_value=5, max_value=100, value=DEFAULT_MAX_TABLES)
+        with erd_col2:
+            cluster_mode = st.selectbox(
+                "Cluster tables by",
+                options=CLUSTER_MODES,
+                format_func=lambda m: {"component": "Foreign key connectivity", "schema": "Schema, then connectivity"}[m]
+            )
+        if st.button("Generate Schema ERD"):
+            with user_action("Generate Schema ERD"), span("compute", "cluster and generate diagrams"):
+                st.session_state.schema_erd = generate_schema_erd(st.session_state.catalog, max_tables, cluster_mode)
+        
+        schema_erd = st.session_state.schema_erd
+        if schema_erd:
+            pages = schema_erd["pages"]
+            st.write(f"**{len(pages)} diagrams** covering {sum(len(page['tables']) for page in pages)} tables")
+            
+            # All diagrams as Mermaid files in one archive
+            archive = BytesIO()
+            with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+                bundle.writestr("00_overview.mmd", schema_erd["overview"])
+                for number, page in enumerate(pages, start=1):
+                    bundle.writestr(f"{number:02d}_{page['tables'][0]}.mmd", page["code"])
+            st.download_button("Download All Diagrams (Mermaid)", data=archive.getvalue(),
+                               file_name=f"ERD_{db_name}.zip", mime="application/zip")
+            
+            if st.button("Render All Diagrams (PNG)"):
+                if st.session_state.schema_png_job_id:
+                    get_job_manager().cancel(st.session_state.schema_png_job_id)
+                with user_action("Render All Diagrams"):
+                    job = get_job_manager().submit("erd", "Rendering diagrams", schema_png_job, schema_erd)
+                st.session_state.schema_png_job_id = job.id
+            if st.session_state.schema_png_job_id:
+                schema_png_job_panel()
+            
+            page_options = ["overview"] + list(range(len(pages)))
+            page_choice = st.selectbox(
+                "Diagram",
+                options=page_options,
+                format_func=lambda p: "Overview of clusters" if p == "overview" else pages[p]["title"]
+            )
+            page_code = schema_erd["overview"] if page_choice == "overview" else pages[page_choice]["code"]
+            st.text_area("Mermaid Code", page_code, height=200)
+            erd_job_panel(ensure_erd_job("schema_erd", page_code, "Schema ERD diagram"), "schema_erd.png")
+    
+    # Shortest relationship path between two tables
+    with st.expander("Find Path Between Tables"):
+        path_col1, path_col2 = st.columns(2)
+        with path_col1:
+            path_from = st.selectbox("From table", options=st.session_state.tables, key="path_from")
+        with path_col2:
+            path_to = st.selectbox("To table", options=st.session_state.tables, key="path_to")
+        if st.button("Find Path"):
+            path = st.session_state.graph.shortest_path(path_from, path_to, edge_types={"fk"})
+            if path:
+                st.write(" → ".join(path))
+            else:
+                st.write("These tables are not connected through foreign keys.")
+    
+    # Columns of every table matching a name, from the in-memory column index
+    with st.expander("Search Columns"):
+        from column_index import SEARCH_MODES
+        col_query = st.text_input("Column name", placeholder="e.g. CUSTOMER_ID or postal")
+        col_col1, col_col2, col_col3 = st.columns(3)
+        with col_col1:
+            col_mode = st.selectbox(
+                "Match",
+                options=SEARCH_MODES,
+                index=SEARCH_MODES.index("fuzzy"),
+                format_func=lambda m: {"exact": "Exact name", "prefix": "Starts with", "fuzzy": "Similar names"}[m]
+            )
+        with col_col2:
+            col_type = st.text_input("Data type starts with", placeholder="e.g. int")
+        with col_col3:
+            col_keys_only = st.checkbox("Key columns only")
+        if col_query:
+            found = st.session_state.column_index.search(col_query, col_mode, col_type, col_keys_only, SEARCH_LIMIT)
+            st.write(f"**{len(found)} columns** in {len(set(record.table for record in found))} tables")
+            if found:
+                import pandas as pd
+                st.dataframe(pd.DataFrame([record.to_dict() for record in found]).rename(columns={
+                    "schema": "Schema", "table": "Table", "column": "Column", "data_type": "Data Type",
+                    "nullable": "Nullable", "primary_key": "PK", "foreign_key": "FK", "references": "References"
+                }), hide_index=True)
+    
     # Table search functionality
     st.subheader("Search and Select Table")
-    search_query = st.text_input("Search for table (partial name search):", 
+    search_query = st.text_input("Search for table (partial, misspelt or schema.table):", 
                                  value=st.session_state.search_query)
     
-    # Filter tables based on search query
+    # Filter tables based on search query, best matches first
     if search_query != st.session_state.search_query or not st.session_state.filtered_tables:
         st.session_state.search_query = search_query
         
         if search_query:
-            st.session_state.filtered_tables = [table for table in st.session_state.tables 
-                                               if search_query.lower() in table.lower()]
+            with user_action("Search Tables"):
+                st.session_state.filtered_tables = [
+                    table for table, _ in st.session_state.search_index.search(search_query, SEARCH_LIMIT)
+                ]
         else:
             st.session_state.filtered_tables = st.session_state.tables
     
     # Show filtered tables
     if st.session_state.filtered_tables:
-        selected_table = st.selectbox("Select a table:", options=st.session_state.filtered_tables)
+        selected_table = st.selectbox("Select a table:", options=st.session_state.filtered_tables,
+                                      format_func=st.session_state.search_index.qualified_name)
         
         if selected_table:
             st.session_state.selected_table = selected_table
             
+            # Traversal options
+            depth_col, direction_col = st.columns(2)
+            with depth_col:
+                depth = st.number_input("Dependency depth (hops)", min_value=1, max_value=10, value=1)
+            with direction_col:
+                direction = st.selectbox(
+                    "Direction",
+                    options=DIRECTIONS,
+                    format_func=lambda d: {
+                        "incoming": "Objects referencing this table",
+                        "outgoing": "Tables this table references",
+                        "both": "Both directions"
+                    }[d]
+                )
+            
             # Analyze button
             if st.button("Analyze Database"):
                 # Find dependencies and similar tables
-                with st.spinner("Analyzing dependencies and similar tables..."):
-                    st.session_state.dependencies = find_dependencies(st.session_state.conn, selected_table)
-                    st.session_state.similar_tables = find_similar_tables(st.session_state.tables, selected_table)
+                with st.spinner("Analyzing dependencies and similar tables..."), user_action("Analyze Database"):
+                    st.session_state.dependencies = find_dependencies(st.session_state.graph, selected_table, depth, direction)
+                    st.session_state.similar_tables = find_similar_tables(get_similarity_index(), selected_table)
             
             # Display results if analysis has been performed
             if "dependencies" in st.session_state and st.session_state.dependencies:
@@ -704,10 +652,19 @@ if st.session_state.conn:
                 else:
                     st.write("**Functions:** None found")
                 
+                # Definitions stay compressed in the catalog until one is shown
+                dependents = [(obj_type, name) for kind, obj_type in DEPENDENT_NODE_TYPES.items()
+                              for name in st.session_state.dependencies[kind]]
+                if dependents and st.checkbox("Show definitions"):
+                    obj_type, obj_name = st.selectbox("Object", options=dependents,
+                                                      format_func=lambda o: f"{o[1]} ({o[0]})")
+                    st.code(st.session_state.catalog.object_metadata(obj_type, obj_name)["definition"], language="sql")
+                
                 # Similar tables
                 st.subheader("Similar Tables")
                 if st.session_state.similar_tables:
-                    st.write(", ".join(st.session_state.similar_tables))
+                    st.write(", ".join(f"{table} ({st.session_state.similar_scores.get(table, 0):.0%} similarity)"
+                                       for table in st.session_state.similar_tables))
                 else:
                     st.write("No similar tables found")
                 
@@ -738,46 +695,79 @@ if st.session_state.conn:
                     #     st.markdown("### Preview (If supported by your browser):")
                     #     st.markdown(f"```mermaid\n{mermaid_code}\n```")
 
-                    # Convert and show image
-                    try:
-                        image = mermaid_to_image(mermaid_code, "er_diagram_white.png")
-                        image_path = "er_diagram_white.png"
-                        image = Image.open(image_path)
-                        st.subheader("ERD Diagram")
-                        st.image(image, caption="Visualized ERD Diagram", use_column_width=True)
-
-                        # PNG download
-                        with open(image_path, "rb") as img_file:
-                            st.download_button("Download ERD Diagram (PNG)", data=img_file, file_name="er_diagram.png", mime="image/png")
-                    except FileNotFoundError as e:
-                        st.error("❌ Failed to generate diagram due to Mermaid syntax error. Please fix the Mermaid code or retry.")
-                        st.code(str(e), language="bash")
+                    # Convert and show image in the background, once per diagram
+                    erd_job_panel(ensure_erd_job("erd", mermaid_code))
         
         # Generate Excel report button - only show if analysis has been done
         if "dependencies" in st.session_state and st.session_state.dependencies:
+            streaming = st.checkbox("Streaming mode (constant memory, for very large reports)")
             if st.button("Generate Excel Report"):
-                with st.spinner("Generating Excel report..."):
-                    excel_file = generate_excel_report(
-                        st.session_state.conn,
+                # Build the workbook in the background so the page stays usable
+                if st.session_state.report_job_id:
+                    get_job_manager().discard(st.session_state.report_job_id)
+                with user_action("Generate Excel Report"):
+                    job = get_job_manager().submit(
+                        "report",
+                        f"Excel report for {selected_table}",
+                        excel_report_job,
+                        st.session_state.catalog,
                         selected_table,
                         st.session_state.dependencies,
-                        st.session_state.similar_tables
-                    )
-                    
-                    # Offer download
-                    st.download_button(
-                        label="Download Excel Report",
-                        data=excel_file,
-                        file_name=f"DB_Metadata_{selected_table}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        st.session_state.similar_tables,
+                        streaming
                     )
-                    
-                    st.success("Excel report generated successfully!")
+                st.session_state.report_job_id = job.id
+                st.session_state.report_job_table = selected_table
+            report_job_panel()
+
+# Function to show where this session's time went, per user action
+# Background jobs still running are included on the next rerun
+def performance_panel():
+    import pandas as pd
+    
+    tracer = get_tracer()
+    session = st.session_state.session_id
+    st.header("Performance")
+    summary = tracer.summary(session)
+    if not summary:
+        st.write("Nothing has been measured in this session yet.")
+        return
+    
+    st.dataframe(pd.DataFrame(summary).rename(columns={
+        "action": "Action", "category": "Step", "count": "Count", "seconds": "Seconds",
+        "rows": "Rows", "bytes": "Bytes"
+    }), hide_index=True)
+    
+    with st.expander("Slowest steps"):
+        steps = sorted((s for s in tracer.spans(session) if s["category"] != "action"),
+                       key=lambda s: s["duration"], reverse=True)[:SLOWEST_STEPS]
+        st.dataframe(pd.DataFrame([{
+            "Action": s["action"], "Step": s["category"], "Name": s["name"], "Seconds": s["duration"],
+            "Rows": s["rows"], "Bytes": s["bytes"], "Error": s["error"]
+        } for s in steps]), hide_index=True)
+    
+    perf_col1, perf_col2 = st.columns(2)
+    with perf_col1:
+        # Opens in chrome://tracing or https://ui.perfetto.dev
+        st.download_button("Download Trace (Chrome JSON)",
+                           data=json.dumps(tracer.chrome_trace(session), default=str),
+                           file_name="metadata_explorer_trace.json", mime="application/json")
+    with perf_col2:
+        if st.button("Clear Timings"):
+            tracer.clear(session)
+
+if st.sidebar.checkbox("Show performance panel"):
+    performance_panel()
+
+# Import times of the first run in this process, with STARTUP_PROFILE=1
+startup_profile.finish()
+if startup_profile.ENABLED:
+    with st.sidebar.expander("Startup profile"):
+        st.code(startup_profile.format_report())
 
-# Cleanup connection when app restarts
+# Cleanup pooled connections when the server process exits
 def cleanup():
-    if st.session_state.conn:
-        st.session_state.conn.close()
+    close_all_pools()
 
 # Register the cleanup function to be called when the script is terminated
 import atexit
@@ -0,0 +1,187 @@
+"""
+Benchmarks of the extraction, analysis, ERD and report code paths.
+
+Every scale builds a synthetic database (see synthetic_db), served through a
+ConnectionPool of SyntheticConnections with a configurable per-query latency,
+and times each step, counting the queries it ran, its peak traced memory and
+the size of what it produced:
+
+    python benchmark.py --scales 100 1000 10000 --columns 12 --latency 0.005
+
+Results are printed as a table and can be saved as JSON with --json to
+compare runs.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from catalog import load_catalog, fetch_metadata_batch
+from connection_pool import ConnectionPool
+from records import paused_gc
+from dependency_graph import DependencyGraph
+from explorer import find_dependencies, generate_mermaid_erd, get_table_metadata
+from synthetic_db import QueryStats, SyntheticConnection, generate_catalog_rows
+
+DEFAULT_SCALES = [100, 1000, 5000]
+# Tables looked up per scale for the per-table steps
+SAMPLE_TABLES = 20
+
+
+def measure(step, stats, func, *args):
+    """
+    Runs func(*args) and returns (result, measurement).
+
+    The measurement holds the step name, wall time in milliseconds, number
+    of queries run, and peak memory allocated during the call in MB. As
+    tracemalloc slows Python code down several times, the step is run a
+    second time for the memory figure so it does not distort the timing.
+    """
+    stats.reset()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    queries = stats.queries
+
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "step": step,
+        "ms": round(elapsed * 1000, 1),
+        "queries": queries,
+        "peak_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+def output_size(value):
+    """Returns the size in bytes of a step's output, where it has one."""
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if hasattr(value, "getbuffer"):
+        return value.getbuffer().nbytes
+    return None
+
+
+# Function to benchmark every step at one scale
+def run_scale(tables, columns, latency, parallelism, seed=0, definition_size=0):
+    """
+    Benchmarks one synthetic database size.
+
+    Returns:
+        list: One measurement dict per step, with the scale added.
+    """
+    from excel_report import generate_excel_report, generate_excel_report_streaming
+    from schema_erd import generate_schema_erd
+    from search_index import TableSearchIndex
+    from similarity_index import ColumnSimilarityIndex
+
+    rows = generate_catalog_rows(tables, columns, definition_size=definition_size, seed=seed)
+    stats = QueryStats()
+    pool = ConnectionPool("synthetic", max_size=parallelism,
+                          connect=lambda _: SyntheticConnection(rows, latency, stats))
+    sample = random.Random(seed).sample([name for _, name in rows["tables"]], min(SAMPLE_TABLES, tables))
+    results = []
+
+    def record(step, func, *args):
+        value, measurement = measure(step, stats, func, *args)
+        measurement["output_bytes"] = output_size(value)
+        results.append(measurement)
+        return value
+
+    catalog = record("load_catalog", load_catalog, pool, parallelism)
+    record("load_catalog (sequential)", load_catalog, pool, 1)
+
+    # As extract_cli loads it; the app cannot pause the process-wide collector
+    def load_catalog_paused_gc():
+        with paused_gc():
+            return load_catalog(pool, parallelism)
+    record("load_catalog (gc paused)", load_catalog_paused_gc)
+    graph = record("build dependency graph", DependencyGraph.from_catalog, catalog)
+
+    def dependencies_of_sample():
+        return [find_dependencies(graph, table, 2, "both") for table in sample]
+    found = record(f"find_dependencies x{len(sample)}", dependencies_of_sample)
+
+    def metadata_of_sample():
+        return [get_table_metadata(catalog, table) for table in sample]
+    record(f"get_table_metadata x{len(sample)}", metadata_of_sample)
+
+    objects = [("table", table) for table in sample]
+    record(f"fetch_metadata_batch x{len(sample)} (SQL)", fetch_metadata_batch, pool, objects)
+
+    def erds_of_sample():
+        return "\n".join(generate_mermaid_erd(relationships, table) for table, (_, relationships) in zip(sample, found))
+    record(f"generate_mermaid_erd x{len(sample)}", erds_of_sample)
+
+    table = sample[0]
+    dependencies = found[0][0]
+    record("generate_excel_report", generate_excel_report, catalog, table, dependencies, [])
+
+    def streaming_report():
+        import os
+        path = generate_excel_report_streaming(catalog, table, dependencies, [])
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        return data
+    record("generate_excel_report_streaming", streaming_report)
+
+    def schema_erd_text():
+        schema_erd = generate_schema_erd(catalog)
+        return schema_erd["overview"] + "".join(page["code"] for page in schema_erd["pages"])
+    record("generate_schema_erd", schema_erd_text)
+
+    index = record("build search index", TableSearchIndex.from_catalog, catalog)
+    record("search x100", lambda: [index.search(name[:6]) for name in (sample * 5)[:100]])
+    similarity = record("build similarity index", ColumnSimilarityIndex.from_catalog, catalog)
+    record(f"similar tables x{len(sample)}", lambda: [similarity.similar(name) for name in sample])
+
+    pool.close()
+    for measurement in results:
+        measurement["tables"] = tables
+    return results
+
+
+def print_table(results):
+    header = f"{'tables':>7}  {'step':<40} {'ms':>10} {'queries':>8} {'peak MB':>9} {'output':>12}"
+    print(header)
+    print("-" * len(header))
+    for m in results:
+        output = "" if m["output_bytes"] is None else f"{m['output_bytes']:,}"
+        print(f"{m['tables']:>7}  {m['step']:<40} {m['ms']:>10,.1f} {m['queries']:>8} {m['peak_mb']:>9.2f} {output:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the metadata explorer on synthetic databases.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Numbers of tables")
+    parser.add_argument("--columns", type=int, default=10, help="Columns per table")
+    parser.add_argument("--latency", type=float, default=0.002, help="Seconds added to every query")
+    parser.add_argument("--parallelism", type=int, default=4, help="Catalog queries run at once")
+    parser.add_argument("--definition-size", type=int, default=0,
+                        help="Characters per procedure and function definition (default: one line)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for tables in args.scales:
+        print(f"Benchmarking {tables} tables...", file=sys.stderr)
+        results.extend(run_scale(tables, args.columns, args.latency, args.parallelism, args.seed,
+                                 args.definition_size))
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
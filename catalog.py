@@ -0,0 +1,772 @@
+"""
+Whole-database catalog snapshot.
+
+Loads every table, column, key, view, routine, parameter and expression
+dependency of a SQL Server database in a fixed number of set-based queries
+and keeps them in dictionaries indexed by object name, so that the per-object
+metadata lookups in the app never go back to the server.
+
+A snapshot also records the object_id and dates of every object it holds, so
+it can later be brought up to date incrementally with refresh_catalog.
+
+View and routine definitions are read in full from sys.sql_modules (the
+INFORMATION_SCHEMA views cut them off at 4000 characters). The snapshot
+compresses each one as it is loaded and decompresses it only when it is
+asked for.
+
+Every loader accepts either a single connection or a ConnectionPool; given a
+pool, the independent queries are run concurrently (see parallel_extract).
+"""
+
+import base64
+import zlib
+
+from parallel_extract import DEFAULT_PARALLELISM, execute_queries
+from records import Column, Parameter, Relationship, intern
+
+# sys.objects types held in the catalog: tables, views, procedures, functions
+CATALOG_OBJECT_TYPES = "('U', 'V', 'P', 'PC', 'X', 'RF', 'FN', 'IF', 'TF')"
+
+# Bulk catalog queries, one round trip each regardless of database size
+CATALOG_QUERIES = {
+    "objects": f"""
+    SELECT object_id, name, type, create_date, modify_date
+    FROM sys.objects
+    WHERE is_ms_shipped = 0 AND type IN {CATALOG_OBJECT_TYPES}
+    """,
+    "tables": """
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_TYPE = 'BASE TABLE'
+    ORDER BY TABLE_NAME
+    """,
+    "columns": """
+    SELECT
+        c.TABLE_SCHEMA,
+        c.TABLE_NAME,
+        c.COLUMN_NAME,
+        c.DATA_TYPE,
+        c.CHARACTER_MAXIMUM_LENGTH,
+        c.IS_NULLABLE,
+        COLUMNPROPERTY(OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' + QUOTENAME(c.TABLE_NAME)), c.COLUMN_NAME, 'IsIdentity') AS IS_IDENTITY
+    FROM INFORMATION_SCHEMA.COLUMNS c
+    ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+    """,
+    "primary_keys": """
+    SELECT k.TABLE_NAME, k.COLUMN_NAME
+    FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE k
+    JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+        ON tc.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+        AND tc.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA
+    WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+    """,
+    "foreign_keys": """
+    SELECT DISTINCT
+        fk.name AS ForeignKeyName,
+        OBJECT_SCHEMA_NAME(fkc.parent_object_id) AS ReferencingSchema,
+        tp.name AS ReferencingTable,
+        cp.name AS ReferencingColumn,
+        OBJECT_SCHEMA_NAME(fkc.referenced_object_id) AS ReferencedSchema,
+        tr.name AS ReferencedTable,
+        cr.name AS ReferencedColumn
+    FROM
+        sys.foreign_keys fk
+    JOIN
+        sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+    JOIN
+        sys.tables tp ON fkc.parent_object_id = tp.object_id
+    JOIN
+        sys.columns cp ON fkc.parent_object_id = cp.object_id AND fkc.parent_column_id = cp.column_id
+    JOIN
+        sys.tables tr ON fkc.referenced_object_id = tr.object_id
+    JOIN
+        sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
+    ORDER BY
+        ReferencedTable, ReferencingTable
+    """,
+    "views": """
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM INFORMATION_SCHEMA.VIEWS
+    """,
+    "routines": """
+    SELECT
+        ROUTINE_SCHEMA,
+        ROUTINE_NAME,
+        ROUTINE_TYPE,
+        DATA_TYPE,
+        CHARACTER_MAXIMUM_LENGTH
+    FROM INFORMATION_SCHEMA.ROUTINES
+    """,
+    "definitions": f"""
+    SELECT o.name, m.definition
+    FROM sys.sql_modules m
+    JOIN sys.objects o ON o.object_id = m.object_id
+    WHERE o.is_ms_shipped = 0 AND o.type IN {CATALOG_OBJECT_TYPES}
+    """,
+    "parameters": """
+    SELECT
+        SPECIFIC_NAME,
+        PARAMETER_NAME,
+        DATA_TYPE,
+        CHARACTER_MAXIMUM_LENGTH,
+        PARAMETER_MODE
+    FROM INFORMATION_SCHEMA.PARAMETERS
+    ORDER BY SPECIFIC_NAME, ORDINAL_POSITION
+    """,
+    "dependencies": """
+    SELECT DISTINCT
+        t.name AS ReferencedTable,
+        o.name AS ReferencingName,
+        o.type AS ReferencingType
+    FROM
+        sys.sql_expression_dependencies d
+        INNER JOIN sys.objects o
+            ON o.object_id = d.referencing_id
+        INNER JOIN sys.tables t
+            ON t.object_id = d.referenced_id
+    WHERE
+        o.type IN ('V', 'P', 'PC', 'X', 'RF', 'FN', 'IF', 'TF')
+    ORDER BY
+        ReferencedTable, ReferencingName
+    """,
+}
+
+# sys.objects type codes grouped the way the app reports dependencies
+DEPENDENT_KINDS = {
+    "V": "views",
+    "P": "procedures",
+    "PC": "procedures",
+    "X": "procedures",
+    "RF": "procedures",
+    "FN": "functions",
+    "IF": "functions",
+    "TF": "functions",
+}
+
+# Chunked, name-filtered versions of the catalog queries used for batch fetches.
+# {names} is replaced with one "?" placeholder per object name in the chunk.
+BATCH_QUERIES = {
+    "columns": """
+    SELECT
+        c.TABLE_SCHEMA,
+        c.TABLE_NAME,
+        c.COLUMN_NAME,
+        c.DATA_TYPE,
+        c.CHARACTER_MAXIMUM_LENGTH,
+        c.IS_NULLABLE,
+        COLUMNPROPERTY(OBJECT_ID(QUOTENAME(c.TABLE_SCHEMA) + '.' + QUOTENAME(c.TABLE_NAME)), c.COLUMN_NAME, 'IsIdentity') AS IS_IDENTITY
+    FROM INFORMATION_SCHEMA.COLUMNS c
+    WHERE c.TABLE_NAME IN ({names})
+    ORDER BY c.TABLE_SCHEMA, c.TABLE_NAME, c.ORDINAL_POSITION
+    """,
+    "primary_keys": """
+    SELECT k.TABLE_NAME, k.COLUMN_NAME
+    FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE k
+    JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+        ON tc.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+        AND tc.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA
+    WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+        AND k.TABLE_NAME IN ({names})
+    """,
+    "views": """
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM INFORMATION_SCHEMA.VIEWS
+    WHERE TABLE_NAME IN ({names})
+    """,
+    "routines": """
+    SELECT
+        ROUTINE_SCHEMA,
+        ROUTINE_NAME,
+        ROUTINE_TYPE,
+        DATA_TYPE,
+        CHARACTER_MAXIMUM_LENGTH
+    FROM INFORMATION_SCHEMA.ROUTINES
+    WHERE ROUTINE_NAME IN ({names})
+    """,
+    "definitions": f"""
+    SELECT o.name, m.definition
+    FROM sys.sql_modules m
+    JOIN sys.objects o ON o.object_id = m.object_id
+    WHERE o.is_ms_shipped = 0 AND o.type IN {CATALOG_OBJECT_TYPES}
+        AND o.name IN ({{names}})
+    """,
+    "parameters": """
+    SELECT
+        SPECIFIC_NAME,
+        PARAMETER_NAME,
+        DATA_TYPE,
+        CHARACTER_MAXIMUM_LENGTH,
+        PARAMETER_MODE
+    FROM INFORMATION_SCHEMA.PARAMETERS
+    WHERE SPECIFIC_NAME IN ({names})
+    ORDER BY SPECIFIC_NAME, ORDINAL_POSITION
+    """,
+    "tables": """
+    SELECT TABLE_SCHEMA, TABLE_NAME
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_TYPE = 'BASE TABLE' AND TABLE_NAME IN ({names})
+    ORDER BY TABLE_NAME
+    """,
+    "foreign_keys": """
+    SELECT DISTINCT
+        fk.name AS ForeignKeyName,
+        OBJECT_SCHEMA_NAME(fkc.parent_object_id) AS ReferencingSchema,
+        tp.name AS ReferencingTable,
+        cp.name AS ReferencingColumn,
+        OBJECT_SCHEMA_NAME(fkc.referenced_object_id) AS ReferencedSchema,
+        tr.name AS ReferencedTable,
+        cr.name AS ReferencedColumn
+    FROM
+        sys.foreign_keys fk
+    JOIN
+        sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+    JOIN
+        sys.tables tp ON fkc.parent_object_id = tp.object_id
+    JOIN
+        sys.columns cp ON fkc.parent_object_id = cp.object_id AND fkc.parent_column_id = cp.column_id
+    JOIN
+        sys.tables tr ON fkc.referenced_object_id = tr.object_id
+    JOIN
+        sys.columns cr ON fkc.referenced_object_id = cr.object_id AND fkc.referenced_column_id = cr.column_id
+    WHERE
+        tp.name IN ({names}) OR tr.name IN ({names})
+    ORDER BY
+        ReferencedTable, ReferencingTable
+    """,
+    "dependencies": """
+    SELECT DISTINCT
+        t.name AS ReferencedTable,
+        o.name AS ReferencingName,
+        o.type AS ReferencingType
+    FROM
+        sys.sql_expression_dependencies d
+        INNER JOIN sys.objects o
+            ON o.object_id = d.referencing_id
+        INNER JOIN sys.tables t
+            ON t.object_id = d.referenced_id
+    WHERE
+        o.type IN ('V', 'P', 'PC', 'X', 'RF', 'FN', 'IF', 'TF')
+        AND (t.name IN ({names}) OR o.name IN ({names}))
+    ORDER BY
+        ReferencedTable, ReferencingName
+    """,
+}
+
+# Queries used by refresh_catalog to find out what changed since a snapshot
+REFRESH_QUERIES = {
+    "object_ids": f"""
+    SELECT object_id
+    FROM sys.objects
+    WHERE is_ms_shipped = 0 AND type IN {CATALOG_OBJECT_TYPES}
+    """,
+    "changed_objects": f"""
+    SELECT object_id, name, type, create_date, modify_date
+    FROM sys.objects
+    WHERE is_ms_shipped = 0 AND type IN {CATALOG_OBJECT_TYPES}
+        AND (modify_date > CONVERT(datetime, ?, 126) OR create_date > CONVERT(datetime, ?, 126))
+    """,
+}
+
+# Which batch queries each object type needs
+BATCH_QUERIES_BY_TYPE = {
+    "table": ["columns", "primary_keys"],
+    "view": ["columns", "views", "definitions"],
+    "procedure": ["routines", "parameters", "definitions"],
+    "function": ["routines", "parameters", "definitions"],
+}
+
+# zlib level of stored definitions; every definition is compressed on each
+# full load, where higher levels cost several times the time for a few % less
+DEFINITION_COMPRESSION_LEVEL = 1
+
+# SQL Server accepts at most 2100 parameters per statement
+BATCH_CHUNK_SIZE = 1000
+
+TABLE_COLUMNS = ["Column Name", "Data Type", "Nullable", "Identity", "Primary Key"]
+VIEW_COLUMNS = ["Column Name", "Data Type", "Nullable"]
+PARAMETER_COLUMNS = ["Parameter Name", "Data Type", "Mode"]
+
+
+def _timestamp(value):
+    # ISO 8601 with milliseconds, which CONVERT(datetime, ?, 126) reads back
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+    return str(value) if value is not None else ""
+
+
+def _yes_no(flag):
+    return "YES" if flag else "NO"
+
+
+def compress_definition(definition):
+    """Compresses definition text as the snapshot stores it: zlib of UTF-8."""
+    return zlib.compress(definition.encode("utf-8"), DEFINITION_COMPRESSION_LEVEL)
+
+
+def decompress_definition(data):
+    """Returns the text of a definition compressed by compress_definition."""
+    return zlib.decompress(data).decode("utf-8")
+
+
+def _compress_definition_row(row):
+    # Definitions are compressed as they are fetched, so the full text of a
+    # large database is never held in memory at once; NULL for encrypted modules
+    name, definition = row
+    return name, compress_definition(definition) if definition is not None else None
+
+
+def _statement(query_name, query, params=()):
+    if query_name == "definitions":
+        return query, params, _compress_definition_row
+    return query, params
+
+
+def format_data_type(data_type, max_length):
+    """
+    Formats a SQL data type with its length the way the explorer displays it.
+
+    Args:
+        data_type (str): Base type name, e.g. "varchar".
+        max_length (int): CHARACTER_MAXIMUM_LENGTH, -1 for MAX types or None.
+
+    Returns:
+        str: e.g. "varchar(50)", "nvarchar(MAX)" or "int".
+    """
+    if max_length is not None and max_length != -1:
+        return f"{data_type}({max_length})"
+    elif max_length == -1:  # MAX types
+        return f"{data_type}(MAX)"
+    return data_type
+
+
+class CatalogSnapshot:
+    """
+    In-memory, name-indexed copy of a database catalog.
+
+    Objects are keyed by their unqualified name, matching how the rest of the
+    app refers to tables, views and routines. Same-named objects in different
+    schemas share one entry, as the original per-object queries did.
+
+    Columns, parameters and foreign keys are held as the slotted records of
+    the records module; the metadata lookups return plain row tuples in the
+    order of TABLE_COLUMNS, VIEW_COLUMNS and PARAMETER_COLUMNS.
+    """
+
+    def __init__(self):
+        self.tables = {}            # table name -> schema
+        self.columns = {}           # table/view name -> [Column, ...]
+        self.views = {}             # view name -> {"schema"}
+        self.routines = {}          # routine name -> {"schema", "type", "return_type"}
+        self.definitions = {}       # view/routine name -> compress_definition() bytes
+        self.parameters = {}        # routine name -> [Parameter, ...]
+        self.foreign_keys = []      # Relationship records, as used for the ERD
+        self.fks_by_referenced = {}     # table name -> [relationship, ...]
+        self.fks_by_referencing = {}    # table name -> [relationship, ...]
+        self.dependents = {}        # table name -> {"views": [...], "procedures": [...], "functions": [...]}
+        self.objects = {}           # str(object_id) -> [name, sys.objects type]
+        self.high_water_mark = ""   # latest create/modify date seen, ISO 8601
+
+    @classmethod
+    def from_rows(cls, rowsets):
+        """
+        Builds the indexes from the result sets of CATALOG_QUERIES.
+
+        Args:
+            rowsets (dict): Query name -> list of result rows. Missing names
+                are treated as empty result sets. Definitions may be text or
+                already compressed, as the loaders fetch them.
+
+        Returns:
+            CatalogSnapshot: The populated snapshot.
+        """
+        catalog = cls()
+
+        for object_id, name, obj_type, create_date, modify_date in rowsets.get("objects", []):
+            catalog.add_object(object_id, name, obj_type, create_date, modify_date)
+
+        for schema, name in rowsets.get("tables", []):
+            catalog.tables.setdefault(name, intern(schema))
+
+        primary_keys = set((table, column) for table, column in rowsets.get("primary_keys", []))
+
+        # A database uses few distinct types, so each is formatted only once
+        data_types = {}
+        for schema, table, column, data_type, max_length, is_nullable, is_identity in rowsets.get("columns", []):
+            formatted = data_types.get((data_type, max_length))
+            if formatted is None:
+                formatted = data_types[(data_type, max_length)] = format_data_type(data_type, max_length)
+            catalog.columns.setdefault(table, []).append(Column(
+                column,
+                formatted,
+                is_nullable == "YES",
+                is_identity == 1,
+                (table, column) in primary_keys,
+            ))
+
+        for row in rowsets.get("foreign_keys", []):
+            catalog.add_relationship(Relationship(*row))
+
+        for schema, name in rowsets.get("views", []):
+            catalog.views.setdefault(name, {"schema": intern(schema)})
+
+        for schema, name, routine_type, data_type, max_length in rowsets.get("routines", []):
+            catalog.routines.setdefault(name, {
+                "schema": intern(schema),
+                "type": intern(routine_type),
+                "return_type": format_data_type(data_type, max_length) if data_type else "",
+            })
+
+        # NULL for encrypted modules; text rows are compressed here
+        for name, definition in rowsets.get("definitions", []):
+            if definition is not None and name not in catalog.definitions:
+                if isinstance(definition, str):
+                    definition = compress_definition(definition)
+                catalog.definitions[name] = definition
+
+        for specific_name, param_name, data_type, max_length, mode in rowsets.get("parameters", []):
+            catalog.parameters.setdefault(specific_name, []).append(
+                Parameter(param_name, format_data_type(data_type, max_length), mode)
+            )
+
+        for table, referencing_name, referencing_type in rowsets.get("dependencies", []):
+            kind = DEPENDENT_KINDS.get(referencing_type.strip())
+            if kind:
+                found = catalog.dependents.setdefault(table, {"views": [], "procedures": [], "functions": []})
+                if referencing_name not in found[kind]:
+                    found[kind].append(referencing_name)
+
+        return catalog
+
+    def to_dict(self, compact=False):
+        """
+        Returns the snapshot as plain JSON-serialisable data.
+
+        Columns, parameters and foreign keys are dicts, or with compact
+        lists of their values in the records' field order, as stored by the
+        catalog cache. Definitions are plain text under "definitions", or
+        with compact stay compressed, base64-encoded under
+        "compressed_definitions". from_dict reads both forms.
+        """
+        dump = (lambda record: record.values()) if compact else (lambda record: record.to_dict())
+        if compact:
+            definitions_key = "compressed_definitions"
+            definitions = {name: base64.b64encode(data).decode("ascii") for name, data in self.definitions.items()}
+        else:
+            definitions_key = "definitions"
+            definitions = {name: decompress_definition(data) for name, data in self.definitions.items()}
+        return {
+            "tables": self.tables,
+            "columns": {name: [dump(column) for column in columns] for name, columns in self.columns.items()},
+            "views": self.views,
+            "routines": self.routines,
+            "parameters": {name: [dump(parameter) for parameter in parameters]
+                           for name, parameters in self.parameters.items()},
+            "foreign_keys": [dump(rel) for rel in self.foreign_keys],
+            definitions_key: definitions,
+            "dependents": self.dependents,
+            "objects": self.objects,
+            "high_water_mark": self.high_water_mark,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a snapshot, including its indexes, from to_dict() output."""
+        catalog = cls()
+        catalog.tables = {name: intern(schema) for name, schema in data["tables"].items()}
+        catalog.columns = {name: Column.load_all(columns) for name, columns in data["columns"].items()}
+        catalog.views = data["views"]
+        catalog.routines = data["routines"]
+        catalog.definitions = {name: base64.b64decode(encoded)
+                               for name, encoded in data.get("compressed_definitions", {}).items()}
+        for name, definition in data.get("definitions", {}).items():
+            catalog.definitions[name] = compress_definition(definition)
+        catalog.parameters = {name: Parameter.load_all(parameters) for name, parameters in data["parameters"].items()}
+        catalog.dependents = data["dependents"]
+        catalog.objects = data.get("objects", {})
+        catalog.high_water_mark = data.get("high_water_mark", "")
+        for rel in Relationship.load_all(data["foreign_keys"]):
+            catalog.add_relationship(rel)
+        return catalog
+
+    def add_object(self, object_id, name, obj_type, create_date, modify_date):
+        """Records an object of the inventory and advances the high-water mark."""
+        self.objects[str(object_id)] = [name, obj_type.strip()]
+        self.high_water_mark = max(self.high_water_mark, _timestamp(create_date), _timestamp(modify_date))
+
+    def remove_names(self, names):
+        """
+        Drops everything known about the given object names: their columns,
+        keys, definitions, parameters, relationships and dependency entries.
+        """
+        names = set(names)
+        for index in (self.tables, self.columns, self.views, self.routines, self.parameters, self.definitions,
+                      self.dependents):
+            for name in names:
+                index.pop(name, None)
+
+        relationships = [rel for rel in self.foreign_keys
+                         if rel.referencing_table not in names and rel.referenced_table not in names]
+        self.foreign_keys = []
+        self.fks_by_referenced = {}
+        self.fks_by_referencing = {}
+        for rel in relationships:
+            self.add_relationship(rel)
+
+        for found in self.dependents.values():
+            for kind, dependent_names in found.items():
+                found[kind] = [name for name in dependent_names if name not in names]
+
+    def merge(self, other):
+        """Adds the entries of another (partial) snapshot to this one."""
+        for name, schema in other.tables.items():
+            self.tables.setdefault(name, schema)
+        for index, other_index in ((self.columns, other.columns), (self.views, other.views),
+                                   (self.routines, other.routines), (self.parameters, other.parameters),
+                                   (self.definitions, other.definitions)):
+            for name, value in other_index.items():
+                index.setdefault(name, value)
+        for rel in other.foreign_keys:
+            self.add_relationship(rel)
+        for table, other_found in other.dependents.items():
+            found = self.dependents.setdefault(table, {"views": [], "procedures": [], "functions": []})
+            for kind, dependent_names in other_found.items():
+                for name in dependent_names:
+                    if name not in found[kind]:
+                        found[kind].append(name)
+
+    def add_relationship(self, rel):
+        """Adds a foreign key relationship and indexes it in both directions."""
+        self.foreign_keys.append(rel)
+        self.fks_by_referenced.setdefault(rel.referenced_table, []).append(rel)
+        self.fks_by_referencing.setdefault(rel.referencing_table, []).append(rel)
+
+    def table_names(self):
+        """Returns all base table names, sorted by name."""
+        return sorted(self.tables, key=str.lower)
+
+    def table_columns(self, table_name):
+        """Returns the column rows shown for a table, in TABLE_COLUMNS order."""
+        return [(c.name, c.data_type, _yes_no(c.nullable), _yes_no(c.identity), _yes_no(c.primary_key))
+                for c in self.columns.get(table_name, [])]
+
+    def view_columns(self, view_name):
+        """Returns the column rows shown for a view, in VIEW_COLUMNS order."""
+        return [(c.name, c.data_type, _yes_no(c.nullable)) for c in self.columns.get(view_name, [])]
+
+    def definition(self, name):
+        """Returns the full SQL text of a view or routine, or None if it is not known."""
+        data = self.definitions.get(name)
+        return decompress_definition(data) if data is not None else None
+
+    def view_definition(self, view_name):
+        """Returns the SQL text of a view."""
+        definition = self.definition(view_name) if view_name in self.views else None
+        return definition or "Definition not available"
+
+    def routine(self, routine_name, routine_type):
+        """Returns the routine entry if it exists with the given ROUTINE_TYPE."""
+        routine = self.routines.get(routine_name)
+        if routine and routine["type"] == routine_type:
+            return routine
+        return None
+
+    def routine_definition(self, routine_name, routine_type):
+        """Returns the SQL text of a procedure or function."""
+        definition = self.definition(routine_name) if self.routine(routine_name, routine_type) else None
+        return definition or "Definition not available"
+
+    def routine_parameters(self, routine_name):
+        """Returns the parameter rows shown for a procedure or function, in PARAMETER_COLUMNS order."""
+        return [(p.name, p.data_type, p.mode) for p in self.parameters.get(routine_name, [])]
+
+    def function_return_type(self, func_name):
+        """Returns the formatted return type of a scalar function, or ""."""
+        routine = self.routine(func_name, "FUNCTION")
+        return routine["return_type"] if routine else ""
+
+    def object_metadata(self, obj_type, obj_name):
+        """
+        Returns the report metadata of one object.
+
+        Args:
+            obj_type (str): "table", "view", "procedure" or "function".
+            obj_name (str): Unqualified object name.
+
+        Returns:
+            dict: "columns" for tables and views, "parameters" for routines,
+            "definition" for everything but tables and "return_type" for
+            functions. Rows are tuples in the order of TABLE_COLUMNS,
+            VIEW_COLUMNS or PARAMETER_COLUMNS.
+        """
+        if obj_type == "table":
+            return {"columns": self.table_columns(obj_name)}
+        elif obj_type == "view":
+            return {
+                "columns": self.view_columns(obj_name),
+                "definition": self.view_definition(obj_name)
+            }
+        elif obj_type == "procedure":
+            return {
+                "parameters": self.routine_parameters(obj_name),
+                "definition": self.routine_definition(obj_name, "PROCEDURE")
+            }
+        elif obj_type == "function":
+            return {
+                "parameters": self.routine_parameters(obj_name),
+                "return_type": self.function_return_type(obj_name),
+                "definition": self.routine_definition(obj_name, "FUNCTION")
+            }
+        raise ValueError(f"Unknown object type: {obj_type}")
+
+    def metadata_batch(self, objects):
+        """Returns {(type, name): metadata} for a list of (type, name) pairs."""
+        return {(obj_type, obj_name): self.object_metadata(obj_type, obj_name)
+                for obj_type, obj_name in objects}
+
+    def referencing_relationships(self, table_name):
+        """Returns the foreign keys whose referenced (parent) side is the table."""
+        return list(self.fks_by_referenced.get(table_name, []))
+
+    def table_dependents(self, table_name):
+        """Returns the views, procedures and functions that reference the table."""
+        found = self.dependents.get(table_name, {})
+        return {kind: list(found.get(kind, [])) for kind in ("views", "procedures", "functions")}
+
+
+# Function to load a full catalog snapshot
+def load_catalog(conn, parallelism=DEFAULT_PARALLELISM):
+    """
+    Loads the whole catalog of the connected database.
+
+    Args:
+        conn: An open pyodbc connection or a ConnectionPool.
+        parallelism (int): Maximum number of catalog queries run at once
+            when conn is a pool.
+
+    Returns:
+        CatalogSnapshot: Indexed snapshot of all catalog objects.
+    """
+    results = execute_queries(conn, [_statement(name, query) for name, query in CATALOG_QUERIES.items()],
+                              parallelism)
+    return CatalogSnapshot.from_rows(dict(zip(CATALOG_QUERIES, results)))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Function to fetch the metadata of many objects at once
+def fetch_metadata_batch(source, objects, chunk_size=BATCH_CHUNK_SIZE, parallelism=DEFAULT_PARALLELISM):
+    """
+    Fetches report metadata for a list of objects in set-based queries.
+
+    Names are grouped by the catalog queries their object type needs and sent
+    as chunked IN lists, so the number of round trips depends on the number of
+    object types and chunks rather than on the number of objects.
+
+    Args:
+        source: A CatalogSnapshot (answered from memory), an open pyodbc
+            connection or a ConnectionPool.
+        objects (list): (type, name) pairs, type being "table", "view",
+            "procedure" or "function".
+        chunk_size (int): Maximum number of names per IN list.
+        parallelism (int): Maximum number of queries run at once.
+
+    Returns:
+        dict: (type, name) -> metadata, as returned by
+        CatalogSnapshot.object_metadata.
+    """
+    if isinstance(source, CatalogSnapshot):
+        return source.metadata_batch(objects)
+
+    names_by_query = {}
+    for obj_type, obj_name in objects:
+        for query_name in BATCH_QUERIES_BY_TYPE[obj_type]:
+            names = names_by_query.setdefault(query_name, [])
+            if obj_name not in names:
+                names.append(obj_name)
+
+    rowsets = _fetch_rowsets(source, names_by_query, chunk_size, parallelism)
+    return CatalogSnapshot.from_rows(rowsets).metadata_batch(objects)
+
+
+def _fetch_rowsets(conn, names_by_query, chunk_size, parallelism):
+    # Runs each BATCH_QUERIES entry once per chunk of names
+    statements = []
+    query_names = []
+    for query_name, names in names_by_query.items():
+        template = BATCH_QUERIES[query_name]
+        # Queries matching on two columns repeat the IN list
+        repeat = template.count("{names}")
+        for chunk in _chunks(names, chunk_size // repeat):
+            query = template.format(names=", ".join("?" * len(chunk)))
+            statements.append(_statement(query_name, query, list(chunk) * repeat))
+            query_names.append(query_name)
+
+    # Chunks are concatenated in statement order, so the merge is deterministic
+    rowsets = {query_name: [] for query_name in names_by_query}
+    for query_name, rows in zip(query_names, execute_queries(conn, statements, parallelism)):
+        rowsets[query_name].extend(rows)
+    return rowsets
+
+
+# Function to bring a catalog snapshot up to date
+def refresh_catalog(conn, catalog, chunk_size=BATCH_CHUNK_SIZE, parallelism=DEFAULT_PARALLELISM):
+    """
+    Incrementally refreshes a snapshot in place.
+
+    Objects created or modified after the snapshot's high-water mark and
+    objects whose object_id has disappeared from sys.objects are re-read (or
+    removed); everything else is left untouched.
+
+    Args:
+        conn: An open pyodbc connection or a ConnectionPool for the
+            snapshot's database.
+        catalog (CatalogSnapshot): The snapshot to update.
+        chunk_size (int): Maximum number of names per IN list.
+        parallelism (int): Maximum number of queries run at once.
+
+    Returns:
+        dict: Counts of "added", "changed" and "removed" objects and the
+        total number of objects "reread".
+    """
+    id_rows, changed_rows = execute_queries(conn, [
+        (REFRESH_QUERIES["object_ids"], ()),
+        (REFRESH_QUERIES["changed_objects"], (catalog.high_water_mark, catalog.high_water_mark)),
+    ], parallelism)
+    current_ids = set(str(row[0]) for row in id_rows)
+
+    removed_ids = [object_id for object_id in catalog.objects if object_id not in current_ids]
+    added = sum(1 for row in changed_rows if str(row[0]) not in catalog.objects)
+    stats = {
+        "added": added,
+        "changed": len(changed_rows) - added,
+        "removed": len(removed_ids),
+        "reread": len(changed_rows),
+    }
+    if not changed_rows and not removed_ids:
+        return stats
+
+    names = [catalog.objects[object_id][0] for object_id in removed_ids]
+    for row in changed_rows:
+        # A renamed object leaves its entries behind under the old name
+        known = catalog.objects.get(str(row[0]))
+        for name in (known[0] if known else None, row[1]):
+            if name and name not in names:
+                names.append(name)
+
+    # Re-read every catalog entry of the affected names, including the
+    # foreign keys and dependencies that point at them from other objects.
+    # The snapshot is only changed once everything has been fetched, so a
+    # failed refresh leaves it as it was and the next one retries.
+    rowsets = _fetch_rowsets(conn, {query_name: names for query_name in BATCH_QUERIES}, chunk_size, parallelism)
+    update = CatalogSnapshot.from_rows(rowsets)
+
+    for object_id in removed_ids:
+        del catalog.objects[object_id]
+    for object_id, name, obj_type, create_date, modify_date in changed_rows:
+        catalog.add_object(object_id, name, obj_type, create_date, modify_date)
+    catalog.remove_names(names)
+    catalog.merge(update)
+    return stats
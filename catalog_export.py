@@ -0,0 +1,204 @@
+"""
+Bulk export of the whole catalog as machine-readable files.
+
+Each catalog query (the same ones behind the snapshot used by
+get_table_metadata and find_dependencies) is streamed from the server with
+fetchmany and written chunk by chunk, so no dataset is ever held in memory
+as a whole. Supported formats:
+
+    parquet - one .parquet file per dataset (requires pyarrow)
+    jsonl   - one .jsonl file per dataset, one JSON object per row
+    csv     - a single catalog_csv.zip with one CSV file per dataset
+"""
+
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import CATALOG_QUERIES
+from connection_pool import ConnectionPool
+from instrumentation import get_tracer, in_context, span
+from parallel_extract import DEFAULT_PARALLELISM, borrow
+
+EXPORT_FORMATS = ["parquet", "jsonl", "csv"]
+DEFAULT_CHUNK_ROWS = 10000
+# Definitions can run to megabytes each, so they are fetched in smaller chunks
+DEFINITION_CHUNK_ROWS = 100
+
+# Output columns of each CATALOG_QUERIES result set, with their value kinds
+EXPORT_COLUMNS = {
+    "objects": [("object_id", "int"), ("name", "string"), ("type", "string"),
+                ("create_date", "timestamp"), ("modify_date", "timestamp")],
+    "tables": [("schema", "string"), ("name", "string")],
+    "columns": [("schema", "string"), ("table_name", "string"), ("column_name", "string"),
+                ("data_type", "string"), ("max_length", "int"), ("is_nullable", "string"),
+                ("is_identity", "int")],
+    "primary_keys": [("table_name", "string"), ("column_name", "string")],
+    "foreign_keys": [("fk_name", "string"), ("referencing_schema", "string"),
+                     ("referencing_table", "string"), ("referencing_column", "string"),
+                     ("referenced_schema", "string"), ("referenced_table", "string"),
+                     ("referenced_column", "string")],
+    "views": [("schema", "string"), ("name", "string")],
+    "routines": [("schema", "string"), ("name", "string"), ("routine_type", "string"),
+                 ("data_type", "string"), ("max_length", "int")],
+    "definitions": [("name", "string"), ("definition", "string")],
+    "parameters": [("specific_name", "string"), ("parameter_name", "string"),
+                   ("data_type", "string"), ("max_length", "int"), ("mode", "string")],
+    "dependencies": [("referenced_table", "string"), ("referencing_name", "string"),
+                     ("referencing_type", "string")],
+}
+
+
+def _stream_rows(source, dataset, chunk_rows):
+    # Yields lists of row tuples straight from the cursor
+    # Only the time spent in the cursor is recorded, not the writing in between
+    if dataset == "definitions":
+        chunk_rows = min(chunk_rows, DEFINITION_CHUNK_ROWS)
+    with borrow(source) as conn:
+        started = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(CATALOG_QUERIES[dataset])
+        elapsed = time.perf_counter() - started
+        count = 0
+        while True:
+            fetch_started = time.perf_counter()
+            rows = cursor.fetchmany(chunk_rows)
+            elapsed += time.perf_counter() - fetch_started
+            if not rows:
+                break
+            count += len(rows)
+            yield [tuple(row) for row in rows]
+        cursor.close()
+        get_tracer().record("query", f"export {dataset}", started, elapsed,
+                            rows=count, sql=CATALOG_QUERIES[dataset])
+
+
+def _parquet_schema(dataset):
+    import pyarrow as pa
+    kinds = {"string": pa.string(), "int": pa.int64(), "timestamp": pa.timestamp("ms")}
+    return pa.schema([(name, kinds[kind]) for name, kind in EXPORT_COLUMNS[dataset]])
+
+
+def _write_parquet(source, dataset, output_dir, chunk_rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(dataset)
+    names = schema.names
+    path = os.path.join(output_dir, f"{dataset}.parquet")
+    count = 0
+    with span("export", f"{dataset}.parquet") as timing:
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for rows in _stream_rows(source, dataset, chunk_rows):
+                columns = [list(values) for values in zip(*rows)]
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=schema.field(name).type) for name, values in zip(names, columns)],
+                    schema=schema
+                ))
+                count += len(rows)
+        timing["rows"], timing["bytes"] = count, os.path.getsize(path)
+    return path, count
+
+
+def _write_jsonl(source, dataset, output_dir, chunk_rows):
+    names = [name for name, _ in EXPORT_COLUMNS[dataset]]
+    path = os.path.join(output_dir, f"{dataset}.jsonl")
+    count = 0
+    with span("export", f"{dataset}.jsonl") as timing:
+        with open(path, "w", encoding="utf-8") as f:
+            for rows in _stream_rows(source, dataset, chunk_rows):
+                for row in rows:
+                    f.write(json.dumps(dict(zip(names, row)), default=str))
+                    f.write("\n")
+                count += len(rows)
+        timing["rows"], timing["bytes"] = count, os.path.getsize(path)
+    return path, count
+
+
+def _write_csv_zip(source, datasets, output_dir, chunk_rows):
+    path = os.path.join(output_dir, "catalog_csv.zip")
+    counts = {}
+    with span("export", "catalog_csv.zip") as timing:
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for dataset in datasets:
+                count = 0
+                with bundle.open(f"{dataset}.csv", "w") as member:
+                    text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+                    writer = csv.writer(text)
+                    writer.writerow([name for name, _ in EXPORT_COLUMNS[dataset]])
+                    for rows in _stream_rows(source, dataset, chunk_rows):
+                        writer.writerows(rows)
+                        count += len(rows)
+                    text.flush()
+                    text.detach()
+                counts[dataset] = (path, count)
+        timing["rows"] = sum(count for _, count in counts.values())
+        timing["bytes"] = os.path.getsize(path)
+    return counts
+
+
+# Function to export the whole catalog to files
+def export_catalog(source, output_dir, fmt="parquet", datasets=None,
+                   chunk_rows=DEFAULT_CHUNK_ROWS, parallelism=DEFAULT_PARALLELISM, progress=None):
+    """
+    Streams the catalog of a database into export files.
+
+    Args:
+        source: An open pyodbc connection or a ConnectionPool. With a pool,
+            Parquet and JSONL datasets are exported concurrently.
+        output_dir (str): Directory to write the files to; created if needed.
+        fmt (str): "parquet", "jsonl" or "csv" (zipped CSV bundle).
+        datasets (list): Names from EXPORT_COLUMNS to export; all by default.
+        chunk_rows (int): Rows fetched and written per chunk.
+        parallelism (int): Maximum number of datasets exported at once.
+        progress (callable): Called as progress(datasets_done, datasets_total).
+
+    Returns:
+        dict: Dataset name -> (file path, number of rows written).
+
+    Raises:
+        ImportError: If fmt is "parquet" and pyarrow is not installed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    datasets = list(datasets or EXPORT_COLUMNS)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if progress:
+        progress(0, len(datasets))
+
+    if fmt == "csv":
+        results = _write_csv_zip(source, datasets, output_dir, chunk_rows)
+        if progress:
+            progress(len(datasets), len(datasets))
+        return results
+
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+        write = _write_parquet
+    else:
+        write = _write_jsonl
+
+    results = {}
+    if not isinstance(source, ConnectionPool) or parallelism <= 1:
+        for dataset in datasets:
+            results[dataset] = write(source, dataset, output_dir, chunk_rows)
+            if progress:
+                progress(len(results), len(datasets))
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(parallelism, len(datasets))) as executor:
+        futures = {dataset: executor.submit(in_context(write), source, dataset, output_dir, chunk_rows)
+                   for dataset in datasets}
+        for dataset, future in futures.items():
+            results[dataset] = future.result()
+            if progress:
+                progress(len(results), len(datasets))
+    return results
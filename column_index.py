@@ -0,0 +1,123 @@
+"""
+Database-wide column search.
+
+Every column of every table (from the catalog's single bulk column query)
+is entered into an inverted index keyed by lower-case column name, with a
+sorted list of the distinct names for prefix lookups and a trigram index of
+them for substring and fuzzy lookups. Lookups return the matching columns
+of all tables with their types and key flags.
+"""
+
+from bisect import bisect_left
+
+from records import Record
+from search_index import TableSearchIndex, DEFAULT_LIMIT
+
+SEARCH_MODES = ["exact", "prefix", "fuzzy"]
+
+
+class IndexedColumn(Record):
+    """A table column with its table and key information, as returned by searches."""
+
+    __slots__ = ("schema", "table", "column", "data_type", "nullable", "primary_key", "foreign_key", "references")
+
+    def __init__(self, schema, table, column, data_type, nullable, primary_key, foreign_key, references):
+        self.schema = schema
+        self.table = table
+        self.column = column
+        self.data_type = data_type
+        self.nullable = nullable
+        self.primary_key = primary_key
+        self.foreign_key = foreign_key
+        self.references = references
+
+
+class ColumnIndex:
+    """Inverted index of column name -> columns of all tables."""
+
+    def __init__(self):
+        self.columns = []       # IndexedColumn records
+        self.by_name = {}       # lower-case column name -> [record number, ...]
+        self.names = []         # sorted distinct lower-case names
+        self._fuzzy = None
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Indexes every table column of a CatalogSnapshot."""
+        index = cls()
+        for table, schema in catalog.tables.items():
+            references = {}
+            for rel in catalog.fks_by_referencing.get(table, []):
+                references.setdefault(rel.referencing_column, []).append(
+                    f'{rel.referenced_table}.{rel.referenced_column}'
+                )
+            for column in catalog.columns.get(table, []):
+                index.columns.append(IndexedColumn(
+                    schema, table, column.name, column.data_type, column.nullable, column.primary_key,
+                    column.name in references, ", ".join(references.get(column.name, [])),
+                ))
+                index.by_name.setdefault(column.name.lower(), []).append(len(index.columns) - 1)
+
+        index.names = sorted(index.by_name)
+        # The trigram index is shared with table search; columns have no schema
+        index._fuzzy = TableSearchIndex({name: "" for name in index.names})
+        return index
+
+    def matching_names(self, query, mode="exact", limit=DEFAULT_LIMIT):
+        """
+        Returns the distinct column names matching a query.
+
+        Args:
+            query (str): Column name or part of one.
+            mode (str): "exact" for the name itself, "prefix" for names
+                starting with the query, "fuzzy" for ranked substring and
+                typo-tolerant matches.
+            limit (int): Maximum number of names for "prefix" and "fuzzy".
+
+        Returns:
+            list: Lower-case column names, best match first.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if mode == "exact":
+            return [query] if query in self.by_name else []
+        if mode == "prefix":
+            start = bisect_left(self.names, query)
+            found = []
+            for name in self.names[start:]:
+                if not name.startswith(query) or len(found) >= limit:
+                    break
+                found.append(name)
+            return found
+        if mode == "fuzzy":
+            return [name for name, _ in self._fuzzy.search(query, limit)]
+        raise ValueError(f"Unknown search mode: {mode}")
+
+    def search(self, query, mode="exact", data_type=None, keys_only=False, limit=DEFAULT_LIMIT):
+        """
+        Finds the columns of all tables matching a query.
+
+        Args:
+            query (str): Column name or part of one.
+            mode (str): See matching_names.
+            data_type (str): Only return columns whose type starts with this,
+                e.g. "int" or "nvarchar".
+            keys_only (bool): Only return primary and foreign key columns.
+            limit (int): Maximum number of distinct column names matched.
+
+        Returns:
+            list: IndexedColumn records, grouped by matched name in rank
+            order.
+        """
+        data_type = data_type.strip().lower() if data_type else None
+        results = []
+        for name in self.matching_names(query, mode, limit):
+            for number in self.by_name[name]:
+                record = self.columns[number]
+                if data_type and not record.data_type.lower().startswith(data_type):
+                    continue
+                if keys_only and not (record.primary_key or record.foreign_key):
+                    continue
+                results.append(record)
+        return results
@@ -0,0 +1,178 @@
+"""
+Process-wide pyodbc connection pool.
+
+One pool exists per connection string and is shared by every Streamlit
+session in the process. Connections that sat idle for a while are validated
+before they are handed out, idle ones are closed after a timeout and broken
+ones are replaced, so callers simply borrow a connection for the duration of
+their work:
+
+    with get_pool(conn_str).connection() as conn:
+        ...
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from instrumentation import span
+
+DEFAULT_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", 8))
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300))
+DEFAULT_CHECKOUT_TIMEOUT = float(os.environ.get("DB_POOL_CHECKOUT_TIMEOUT", 60))
+# Connections idle for less than this many seconds are handed out without a
+# validation round trip; one that died meanwhile fails its first query and is
+# discarded on the way back
+DEFAULT_VALIDATE_AFTER = float(os.environ.get("DB_POOL_VALIDATE_AFTER", 30))
+
+VALIDATION_QUERY = "SELECT 1"
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of connections for one connection string.
+
+    Args:
+        conn_str (str): ODBC connection string.
+        max_size (int): Maximum number of connections open at the same time.
+        idle_timeout (float): Seconds after which an unused connection is closed.
+        validate_after (float): Seconds a connection must have been idle to be
+            validated before it is handed out again.
+        connect (callable): Opens a connection from conn_str; pyodbc.connect
+            by default.
+    """
+
+    def __init__(self, conn_str, max_size=DEFAULT_MAX_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 connect=None, validate_after=DEFAULT_VALIDATE_AFTER):
+        self.conn_str = conn_str
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self._connect = connect
+        self._idle = deque()    # (connection, time it was returned), newest on the right
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _open(self):
+        if self._connect is None:
+            import pyodbc
+            self._connect = pyodbc.connect
+        return self._connect(self.conn_str)
+
+    @staticmethod
+    def _is_alive(conn):
+        try:
+            with span("query", "connection validation", sql=VALIDATION_QUERY):
+                cursor = conn.cursor()
+                cursor.execute(VALIDATION_QUERY)
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        # Reuse the most recently returned live connection, dropping stale ones
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, returned_at = self._idle.pop()
+            idle = time.monotonic() - returned_at
+            if idle > self.idle_timeout or (idle > self.validate_after and not self._is_alive(conn)):
+                self._close(conn)
+                continue
+            return conn
+        return self._open()
+
+    def _checkin(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self, timeout=DEFAULT_CHECKOUT_TIMEOUT):
+        """
+        Borrows a connection for the duration of a with block.
+
+        A connection that is found dead after an error is discarded instead of
+        being returned to the pool, and the next checkout opens a new one.
+
+        Args:
+            timeout (float): Seconds to wait for a free slot.
+
+        Raises:
+            PoolTimeout: If all max_size connections stay busy for timeout seconds.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f"No database connection available after {timeout} seconds")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            if conn is not None and not self._is_alive(conn):
+                self._close(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def prune(self):
+        """Closes idle connections that have exceeded the idle timeout."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [item for item in self._idle if now - item[1] > self.idle_timeout]
+            self._idle = deque(item for item in self._idle if now - item[1] <= self.idle_timeout)
+        for conn, _ in expired:
+            self._close(conn)
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+# Function to get the shared pool of a connection string
+def get_pool(conn_str, max_size=DEFAULT_MAX_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Returns the process-wide pool for a connection string, creating it on
+    first use. Idle connections of every pool are pruned on each call.
+    """
+    with _pools_lock:
+        pool = _pools.get(conn_str)
+        if pool is None:
+            pool = _pools[conn_str] = ConnectionPool(conn_str, max_size, idle_timeout)
+        pools = list(_pools.values())
+    for other in pools:
+        other.prune()
+    return pool
+
+
+# Function to close every pooled connection
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
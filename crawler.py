@@ -0,0 +1,325 @@
+"""
+Multi-server catalog crawler.
+
+Extracts the catalogs of every database in an inventory concurrently and
+consolidates them into one file with an entry per database:
+
+    python crawler.py --inventory inventory.csv --output-dir harvest
+
+The inventory is a CSV file with "server" and "database" columns (and an
+optional "username" column) or a JSON list of objects with the same keys.
+Passwords are never stored in the inventory; SQL logins read theirs from
+the environment variable named by a "password_env" column, DB_PASSWORD by
+default.
+
+Databases run on a shared thread pool, with a separate limit on the number
+of databases extracted at once per server so no instance is overloaded.
+Failed extractions are retried with exponential backoff. Every finished
+database is written to its own file and recorded in a state file, so an
+interrupted crawl resumes where it stopped. The state is cleared once every
+database is done, so the next crawl extracts them all again. Catalogs go through the same
+on-disk cache as the app, so a nightly crawl only re-reads what changed.
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from connection_pool import ConnectionPool
+from explorer import connection_string
+from metadata_cache import MetadataCache, load_catalog_cached
+
+DEFAULT_WORKERS = int(os.environ.get("CRAWL_WORKERS", 16))
+DEFAULT_PER_SERVER = int(os.environ.get("CRAWL_PER_SERVER", 2))
+DEFAULT_RETRIES = int(os.environ.get("CRAWL_RETRIES", 3))
+# Seconds before the first retry; doubled for every further attempt
+DEFAULT_BACKOFF = float(os.environ.get("CRAWL_BACKOFF", 5))
+# Catalog queries run at once within one database
+DEFAULT_PARALLELISM = int(os.environ.get("CRAWL_PARALLELISM", 2))
+
+STATE_FILE = "crawl_state.json"
+CONSOLIDATED_FILE = "consolidated_catalog.json.gz"
+
+
+# Function to read a crawl inventory
+def load_inventory(path):
+    """
+    Reads the databases to crawl.
+
+    Args:
+        path (str): A .json file holding a list of objects, or a CSV file
+            with a header row; both with "server" and "database" and
+            optionally "username" and "password_env".
+
+    Returns:
+        list: Dicts with server, database, username and password, without
+        duplicates, in file order.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    inventory = []
+    seen = set()
+    for row in rows:
+        server, database = row["server"].strip(), row["database"].strip()
+        key = database_key(server, database)
+        if key in seen:
+            continue
+        seen.add(key)
+        username = (row.get("username") or "").strip()
+        inventory.append({
+            "server": server,
+            "database": database,
+            "username": username,
+            "password": os.environ.get(row.get("password_env") or "DB_PASSWORD", "") if username else "",
+        })
+    return inventory
+
+
+def database_key(server, database):
+    """Returns the identifier of a database in the state and output files."""
+    return f"{server.strip().lower()}/{database.strip().lower()}"
+
+
+def _file_name(key):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in key.replace("/", "__")) + ".json.gz"
+
+
+def _write_json_gz(path, data):
+    # Written to a temporary file first so readers never see a partial file
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, default=str)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class Crawler:
+    """
+    Concurrent, resumable extraction of many databases.
+
+    Args:
+        output_dir (str): Directory for the per-database files, the state
+            file and the consolidated catalog.
+        workers (int): Maximum number of databases extracted at once overall.
+        per_server (int): Maximum number of databases extracted at once on
+            any one server.
+        retries (int): Further attempts after a failed extraction.
+        backoff (float): Seconds before the first retry, doubled each time.
+        parallelism (int): Catalog queries run at once within a database.
+        cache (MetadataCache): Catalog cache; the default on-disk cache if None.
+        connect (callable): Opens a connection from a connection string;
+            pyodbc.connect by default.
+    """
+
+    def __init__(self, output_dir, workers=DEFAULT_WORKERS, per_server=DEFAULT_PER_SERVER,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, parallelism=DEFAULT_PARALLELISM,
+                 cache=None, connect=None):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.per_server = per_server
+        self.retries = retries
+        self.backoff = backoff
+        self.parallelism = parallelism
+        self.cache = cache or MetadataCache()
+        self.connect = connect
+        self._server_slots = {}
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+        self.state = self._load_state()
+
+    def _load_state(self):
+        path = os.path.join(self.output_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _record(self, key, entry):
+        with self._lock:
+            self.state[key] = entry
+            path = os.path.join(self.output_dir, STATE_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=1)
+            os.replace(path + ".tmp", path)
+
+    def _clear_state(self):
+        with self._lock:
+            self.state = {}
+            path = os.path.join(self.output_dir, STATE_FILE)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _slot(self, server):
+        with self._lock:
+            key = server.strip().lower()
+            if key not in self._server_slots:
+                self._server_slots[key] = threading.BoundedSemaphore(self.per_server)
+            return self._server_slots[key]
+
+    def extract(self, entry):
+        """
+        Extracts one database, retrying failures with exponential backoff.
+
+        Returns:
+            dict: The state entry recorded for the database.
+        """
+        key = database_key(entry["server"], entry["database"])
+        conn_str = connection_string(entry["server"], entry["database"], entry["username"], entry["password"])
+        started = time.time()
+        for attempt in range(self.retries + 1):
+            try:
+                with self._slot(entry["server"]):
+                    pool = ConnectionPool(conn_str, max_size=self.parallelism, connect=self.connect)
+                    try:
+                        catalog, message = load_catalog_cached(
+                            pool, entry["server"], entry["database"], self.cache, parallelism=self.parallelism,
+                            login=entry["username"]
+                        )
+                    finally:
+                        pool.close()
+
+                file_name = _file_name(key)
+                _write_json_gz(os.path.join(self.output_dir, file_name), {
+                    "server": entry["server"],
+                    "database": entry["database"],
+                    "extracted_at": datetime.now().isoformat(timespec="seconds"),
+                    "catalog": catalog.to_dict(),
+                })
+                result = {
+                    "status": "done",
+                    "file": file_name,
+                    "tables": len(catalog.tables),
+                    "attempts": attempt + 1,
+                    "seconds": round(time.time() - started, 1),
+                    "message": message,
+                }
+                break
+            except Exception as e:
+                result = {"status": "failed", "error": str(e), "attempts": attempt + 1}
+                if attempt < self.retries:
+                    # Jitter keeps retries against one server from lining up
+                    time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        self._record(key, result)
+        return result
+
+    def crawl(self, inventory, resume=True, progress=None):
+        """
+        Extracts every database of an inventory and consolidates the results.
+
+        Args:
+            inventory (list): Entries from load_inventory.
+            resume (bool): Skip databases already extracted by an earlier,
+                unfinished run into the same output_dir. A run is finished,
+                and its state cleared, once every database is done.
+            progress (callable): Called as progress(done, total, key, result)
+                after each database.
+
+        Returns:
+            dict: Counts of "done", "failed" and "skipped" databases.
+        """
+        pending = [entry for entry in inventory
+                   if not (resume and self.state.get(database_key(entry["server"], entry["database"]), {})
+                           .get("status") == "done")]
+        counts = {"done": 0, "failed": 0, "skipped": len(inventory) - len(pending)}
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(pending)), thread_name_prefix="crawl") as executor:
+                futures = {executor.submit(self.extract, entry): entry for entry in pending}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    entry = futures[future]
+                    result = future.result()
+                    counts[result["status"]] += 1
+                    if progress:
+                        progress(done, len(pending), database_key(entry["server"], entry["database"]), result)
+
+        self.consolidate(inventory)
+        if all(self.state.get(database_key(entry["server"], entry["database"]), {}).get("status") == "done"
+               for entry in inventory):
+            self._clear_state()
+        return counts
+
+    def consolidate(self, inventory):
+        """
+        Writes the consolidated catalog with one entry per inventory database.
+
+        Databases are copied into the output one at a time, so memory use is
+        bounded by the largest single catalog.
+
+        Returns:
+            str: Path of the consolidated file.
+        """
+        path = os.path.join(self.output_dir, CONSOLIDATED_FILE)
+        temp_path = path + ".tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as out:
+            out.write('{"generated_at": %s, "databases": [' % json.dumps(datetime.now().isoformat(timespec="seconds")))
+            first = True
+            for entry in inventory:
+                state = self.state.get(database_key(entry["server"], entry["database"]), {})
+                if state.get("status") == "done":
+                    with gzip.open(os.path.join(self.output_dir, state["file"]), "rt", encoding="utf-8") as f:
+                        data = f.read()
+                else:
+                    # Databases not extracted yet are listed with their last error
+                    data = json.dumps({"server": entry["server"], "database": entry["database"],
+                                       "error": state.get("error", "not extracted")})
+                out.write(data if first else "," + data)
+                first = False
+            out.write("]}")
+        os.replace(temp_path, path)
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the catalogs of many databases concurrently.")
+    parser.add_argument("--inventory", required=True, help="CSV or JSON list of servers and databases")
+    parser.add_argument("--output-dir", default="catalog_harvest", help="Directory to write the catalogs to")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Databases extracted at once")
+    parser.add_argument("--per-server", type=int, default=DEFAULT_PER_SERVER,
+                        help="Databases extracted at once on one server")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Retries of a failed database")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Seconds before the first retry")
+    parser.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM,
+                        help="Catalog queries run at once within a database")
+    parser.add_argument("--restart", action="store_true", help="Extract every database again")
+    parser.add_argument("--quiet", action="store_true", help="Only report failures")
+    args = parser.parse_args(argv)
+
+    inventory = load_inventory(args.inventory)
+    crawler = Crawler(args.output_dir, args.workers, args.per_server, args.retries, args.backoff, args.parallelism)
+
+    def report(done, total, key, result):
+        if result["status"] == "failed":
+            print(f"[{done}/{total}] {key} failed after {result['attempts']} attempts: {result['error']}",
+                  file=sys.stderr)
+        elif not args.quiet:
+            print(f"[{done}/{total}] {key}: {result['tables']} tables in {result['seconds']}s", file=sys.stderr)
+
+    started = time.perf_counter()
+    counts = crawler.crawl(inventory, resume=not args.restart, progress=report)
+    if not args.quiet:
+        print(f"{counts['done']} extracted, {counts['failed']} failed, {counts['skipped']} already done "
+              f"in {time.perf_counter() - started:.0f}s.", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
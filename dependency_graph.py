@@ -0,0 +1,141 @@
+"""
+In-memory dependency graph of a whole database.
+
+Nodes are tables, views, procedures and functions; edges are foreign keys
+(referencing table -> referenced table) and sql_expression_dependencies
+(referencing object -> table). The graph is built once from a catalog
+snapshot and indexed in both directions, so multi-hop traversals and path
+searches run in memory instead of one SQL round trip per hop.
+"""
+
+from collections import deque
+
+DIRECTIONS = ["incoming", "outgoing", "both"]
+
+# Dependent kinds of the catalog snapshot and the node types they map to
+DEPENDENT_NODE_TYPES = {"views": "view", "procedures": "procedure", "functions": "function"}
+
+
+class DependencyGraph:
+    """
+    Directed graph with adjacency indexes in both directions.
+
+    Edges are kept in one list and referenced by index from the adjacency
+    lists; each edge is a (source, target, edge_type, data) tuple where
+    edge_type is "fk" or "expression" and data is the foreign key's
+    records.Relationship for "fk" edges.
+    """
+
+    def __init__(self):
+        self.node_types = {}    # node name -> "table", "view", "procedure" or "function"
+        self.edges = []
+        self.outgoing = {}      # node name -> [edge index, ...]
+        self.incoming = {}      # node name -> [edge index, ...]
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Builds the graph from a CatalogSnapshot."""
+        graph = cls()
+        for name in catalog.tables:
+            graph.add_node(name, "table")
+        for name in catalog.views:
+            graph.add_node(name, "view")
+        for name, routine in catalog.routines.items():
+            graph.add_node(name, "procedure" if routine["type"] == "PROCEDURE" else "function")
+
+        for rel in catalog.foreign_keys:
+            graph.add_edge(rel.referencing_table, rel.referenced_table, "fk", rel)
+
+        for table, found in catalog.dependents.items():
+            for kind, names in found.items():
+                for name in names:
+                    graph.add_node(name, DEPENDENT_NODE_TYPES[kind])
+                    graph.add_edge(name, table, "expression")
+        return graph
+
+    def add_node(self, name, node_type):
+        self.node_types.setdefault(name, node_type)
+
+    def add_edge(self, source, target, edge_type, data=None):
+        self.node_types.setdefault(source, "table")
+        self.node_types.setdefault(target, "table")
+        self.edges.append((source, target, edge_type, data))
+        index = len(self.edges) - 1
+        self.outgoing.setdefault(source, []).append(index)
+        self.incoming.setdefault(target, []).append(index)
+
+    def _neighbours(self, node, direction, edge_types):
+        # Yields (neighbour, edge index) pairs in insertion order
+        if direction in ("outgoing", "both"):
+            for index in self.outgoing.get(node, []):
+                if edge_types is None or self.edges[index][2] in edge_types:
+                    yield self.edges[index][1], index
+        if direction in ("incoming", "both"):
+            for index in self.incoming.get(node, []):
+                if edge_types is None or self.edges[index][2] in edge_types:
+                    yield self.edges[index][0], index
+
+    def traverse(self, start, max_depth=1, direction="incoming", node_types=None, edge_types=None):
+        """
+        Breadth-first traversal from a node.
+
+        Args:
+            start (str): Name of the node to start from.
+            max_depth (int): Maximum number of hops; None for unlimited.
+            direction (str): "incoming" follows edges pointing at a node (who
+                references it), "outgoing" follows edges leaving it (what it
+                references), "both" follows either.
+            node_types (set): Node types to visit; others are neither returned
+                nor traversed through. All types by default.
+            edge_types (set): Edge types to follow ("fk", "expression"). All by
+                default.
+
+        Returns:
+            tuple: (nodes, edges) - an ordered dict of reached node name ->
+            depth (excluding start) and the list of traversed edge tuples.
+        """
+        depths = {start: 0}
+        seen_edges = set()
+        edges = []
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            depth = depths[node]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for neighbour, index in self._neighbours(node, direction, edge_types):
+                if node_types is not None and neighbour != start and self.node_types.get(neighbour) not in node_types:
+                    continue
+                if index not in seen_edges:
+                    seen_edges.add(index)
+                    edges.append(self.edges[index])
+                if neighbour not in depths:
+                    depths[neighbour] = depth + 1
+                    queue.append(neighbour)
+        del depths[start]
+        return depths, edges
+
+    def shortest_path(self, source, target, direction="both", edge_types=None, node_types=None):
+        """
+        Returns the shortest chain of nodes from source to target, including
+        both ends, or None if they are not connected.
+        """
+        if source == target:
+            return [source]
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbour, _ in self._neighbours(node, direction, edge_types):
+                if neighbour in previous:
+                    continue
+                if node_types is not None and neighbour != target and self.node_types.get(neighbour) not in node_types:
+                    continue
+                previous[neighbour] = node
+                if neighbour == target:
+                    path = [target]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return path[::-1]
+                queue.append(neighbour)
+        return None
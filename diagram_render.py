@@ -0,0 +1,298 @@
+"""
+Pluggable Mermaid diagram renderers.
+
+Two backends implement the same small interface:
+
+    kroki - posts the diagram to a Kroki server; the base URL is configurable
+            so a self-hosted instance can replace the public https://kroki.io
+    local - draws ER diagrams in process (see local_renderer), with no
+            network access at all
+
+With DIAGRAM_RENDERER set to "auto" (the default) every available backend
+renders a small probe diagram once per process and the fastest one is used.
+
+Rendering never touches the disk: backends return image bytes, and Kroki
+requests share one pooled HTTP session with timeouts and retries. Batches of
+diagrams, such as all pages of a schema ERD, are rendered concurrently with
+a bounded number of requests in flight.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from io import BytesIO
+
+import local_renderer
+from instrumentation import in_context, span
+
+DEFAULT_KROKI_URL = os.environ.get("KROKI_URL", "https://kroki.io")
+DEFAULT_TIMEOUT = float(os.environ.get("KROKI_TIMEOUT", 30))
+# Timeout of the availability probe, kept short for air-gapped networks
+PROBE_TIMEOUT = float(os.environ.get("RENDER_PROBE_TIMEOUT", 5))
+# Retries of failed Kroki requests, with exponential backoff
+RENDER_RETRIES = int(os.environ.get("RENDER_RETRIES", 3))
+# Maximum number of diagrams rendered at once by render_batch
+MAX_CONCURRENT_RENDERS = int(os.environ.get("MAX_CONCURRENT_RENDERS", 4))
+DEFAULT_RENDERER = os.environ.get("DIAGRAM_RENDERER", "auto")
+RENDERERS = ["auto", "kroki", "local"]
+IMAGE_FORMATS = ["png", "svg"]
+
+PROBE_DIAGRAM = """erDiagram
+    PARENT {
+        int id PK
+    }
+    CHILD {
+        int id PK
+        int parent_id FK
+    }
+    PARENT ||--o{ CHILD : "parent_id"
+"""
+
+
+class RenderError(Exception):
+    """Raised when a backend cannot render a diagram."""
+
+
+class Renderer:
+    """Interface of a diagram backend."""
+
+    name = None
+
+    def probe(self):
+        """
+        Renders the probe diagram.
+
+        Returns:
+            float: Seconds taken, or None if the backend is not available.
+        """
+        start = time.perf_counter()
+        try:
+            self.render(PROBE_DIAGRAM)
+        except RenderError:
+            return None
+        return time.perf_counter() - start
+
+    def render(self, source, fmt="png"):
+        """
+        Renders a Mermaid diagram.
+
+        Args:
+            source (str): The Mermaid diagram definition.
+            fmt (str): "png" or "svg".
+
+        Returns:
+            bytes: The image.
+
+        Raises:
+            RenderError: If the diagram cannot be rendered.
+        """
+        raise NotImplementedError
+
+    def options(self, fmt="png"):
+        """Returns the render options identifying this backend's output."""
+        return {"renderer": self.name, "format": fmt}
+
+
+class KrokiRenderer(Renderer):
+    """Renders through the HTTP API of a Kroki server."""
+
+    name = "kroki"
+
+    def __init__(self, base_url=DEFAULT_KROKI_URL, timeout=DEFAULT_TIMEOUT, retries=RENDER_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        """Returns the pooled HTTP session, creating it on first use."""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # Rendering is idempotent, so POSTs are safe to retry
+                retry = Retry(total=self.retries, backoff_factor=0.5,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=["POST"], raise_on_status=False)
+                adapter = HTTPAdapter(pool_maxsize=MAX_CONCURRENT_RENDERS, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _post(self, source, fmt, timeout, pooled=True):
+        import requests
+
+        # The probe goes without the pooled session so that it is not retried
+        post = self.session().post if pooled else requests.post
+        try:
+            response = post(
+                f"{self.base_url}/mermaid/{fmt}",
+                json={"diagram_source": source},
+                timeout=timeout
+            )
+        except requests.RequestException as e:
+            raise RenderError(f"Kroki request failed: {e}")
+        if response.status_code != 200:
+            raise RenderError(f"Failed to generate diagram. API Response: {response.text}")
+        return response.content
+
+    def probe(self):
+        start = time.perf_counter()
+        try:
+            self._post(PROBE_DIAGRAM, "png", PROBE_TIMEOUT, pooled=False)
+        except RenderError:
+            return None
+        return time.perf_counter() - start
+
+    def render(self, source, fmt="png"):
+        with span("render", f"kroki {fmt}", source_bytes=len(source)) as timing:
+            content = self._post(source, fmt, self.timeout)
+            if fmt != "png":
+                timing["bytes"] = len(content)
+                return content
+
+            # Kroki PNGs are transparent; flatten them onto a white background
+            from PIL import Image
+
+            img = Image.open(BytesIO(content)).convert("RGBA")
+            white_bg = Image.new("RGB", img.size, (255, 255, 255))
+            white_bg.paste(img, mask=img.split()[3])
+            output = BytesIO()
+            white_bg.save(output, "PNG")
+            timing["bytes"] = output.tell()
+            return output.getvalue()
+
+
+class LocalRenderer(Renderer):
+    """Renders ER diagrams in process; other diagram types are rejected."""
+
+    name = "local"
+
+    def render(self, source, fmt="png"):
+        with span("render", f"local {fmt}", source_bytes=len(source)) as timing:
+            try:
+                if fmt == "svg":
+                    image = local_renderer.render_svg(source)
+                else:
+                    image = local_renderer.render_png(source)
+            except ValueError as e:
+                raise RenderError(str(e))
+            timing["bytes"] = len(image)
+            return image
+
+    def probe(self):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            return None
+        return super().probe()
+
+
+# Function to create a renderer by name
+def create_renderer(name, kroki_url=DEFAULT_KROKI_URL, timeout=DEFAULT_TIMEOUT):
+    if name == "kroki":
+        return KrokiRenderer(kroki_url, timeout)
+    if name == "local":
+        return LocalRenderer()
+    raise ValueError(f"Unknown renderer: {name}")
+
+
+# Function to pick the fastest available renderer
+def select_renderer(renderers):
+    """
+    Returns the renderer that renders the probe diagram fastest.
+
+    Args:
+        renderers (list): Candidate Renderer instances.
+
+    Returns:
+        Renderer: The fastest available candidate.
+
+    Raises:
+        RenderError: If no candidate is available.
+    """
+    best, best_time = None, None
+    for renderer in renderers:
+        elapsed = renderer.probe()
+        if elapsed is None:
+            continue
+        if best is None or elapsed < best_time:
+            best, best_time = renderer, elapsed
+    if best is None:
+        raise RenderError("No diagram renderer is available")
+    return best
+
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+# Function to get the process-wide renderer
+def get_renderer(name=DEFAULT_RENDERER):
+    """
+    Returns the renderer for a configured name, choosing one for "auto".
+
+    The automatic choice is made once per process, so only the first call
+    pays for the probes.
+    """
+    with _renderers_lock:
+        if name not in _renderers:
+            if name == "auto":
+                _renderers[name] = select_renderer([create_renderer(n) for n in RENDERERS if n != "auto"])
+            else:
+                _renderers[name] = create_renderer(name)
+        return _renderers[name]
+
+
+# Function to render several diagrams concurrently
+def render_batch(sources, renderer=None, fmt="png", cache=None,
+                 max_workers=MAX_CONCURRENT_RENDERS, progress=None):
+    """
+    Renders a list of diagrams with a bounded number in flight.
+
+    Args:
+        sources (list): Mermaid diagram definitions.
+        renderer (Renderer): Backend to use; the process-wide one by default.
+        fmt (str): "png" or "svg".
+        cache (RenderCache): Optional cache consulted before rendering.
+        max_workers (int): Maximum number of diagrams rendered at once.
+        progress (callable): Called as progress(diagrams_done, diagrams_total).
+
+    Returns:
+        list: One (image bytes, error) pair per source, in source order;
+        error is None on success and image is None on failure.
+    """
+    renderer = renderer or get_renderer()
+
+    def render_one(source):
+        if cache is None:
+            return renderer.render(source, fmt)
+        return cache.get_or_render(source, lambda s: renderer.render(s, fmt), renderer.options(fmt))
+
+    results = [None] * len(sources)
+    if progress:
+        progress(0, len(sources))
+    if not sources:
+        return results
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources))),
+                                  thread_name_prefix="render")
+    try:
+        futures = {executor.submit(in_context(render_one), source): i for i, source in enumerate(sources)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                results[futures[future]] = (future.result(), None)
+            except Exception as e:
+                results[futures[future]] = (None, e)
+            if progress:
+                progress(done, len(sources))
+    finally:
+        # Drops queued renders if the caller stopped the batch from progress()
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
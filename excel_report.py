@@ -0,0 +1,306 @@
+"""
+Excel metadata reports.
+
+A report has a summary sheet listing the selected table, its dependencies
+and its similar tables, and one sheet per object with its columns,
+parameters and definition. Metadata is fetched a batch of objects at a time
+from a catalog snapshot or a connection. generate_excel_report builds the
+workbook in memory; generate_excel_report_streaming writes it in constant
+memory to a temporary file.
+"""
+
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from catalog import fetch_metadata_batch, TABLE_COLUMNS, VIEW_COLUMNS, PARAMETER_COLUMNS
+from instrumentation import get_tracer, span
+
+# Objects whose metadata is fetched per batch while a report is written
+REPORT_BATCH_SIZE = 200
+SUMMARY_HEADER = ["Object Type", "Count", "Objects"]
+# Characters an Excel cell can hold
+EXCEL_CELL_LIMIT = 32767
+
+# Function to list the objects of a report and its summary rows
+def report_objects(selected_table, dependencies, similar_tables):
+    summary_rows = []
+    all_objects = []
+    
+    # Add selected table
+    table_row = ["Tables", 1 + len(dependencies["tables"]) + len(similar_tables)]
+    table_objects = [selected_table] + dependencies["tables"] + similar_tables
+    table_row.append(", ".join(table_objects))
+    summary_rows.append(table_row)
+    all_objects.extend(table_objects)
+    
+    # Add views
+    if dependencies["views"]:
+        views_row = ["Views", len(dependencies["views"]), ", ".join(dependencies["views"])]
+        summary_rows.append(views_row)
+        all_objects.extend(dependencies["views"])
+    
+    # Add procedures
+    if dependencies["procedures"]:
+        procs_row = ["Stored Procedures", len(dependencies["procedures"]), ", ".join(dependencies["procedures"])]
+        summary_rows.append(procs_row)
+        all_objects.extend(dependencies["procedures"])
+    
+    # Add functions
+    if dependencies["functions"]:
+        funcs_row = ["Functions", len(dependencies["functions"]), ", ".join(dependencies["functions"])]
+        summary_rows.append(funcs_row)
+        all_objects.extend(dependencies["functions"])
+    
+    # Determine the type of each object
+    objects = []
+    for obj_name in all_objects:
+        obj_type = None
+        if obj_name == selected_table or obj_name in dependencies["tables"] or obj_name in similar_tables:
+            obj_type = "table"
+        elif obj_name in dependencies["views"]:
+            obj_type = "view"
+        elif obj_name in dependencies["procedures"]:
+            obj_type = "procedure"
+        elif obj_name in dependencies["functions"]:
+            obj_type = "function"
+        
+        if obj_type:
+            objects.append((obj_type, obj_name))
+    
+    return summary_rows, objects
+
+# Function to yield report metadata a batch of objects at a time
+def iter_object_metadata(source, objects, batch_size=REPORT_BATCH_SIZE):
+    for i in range(0, len(objects), batch_size):
+        chunk = objects[i:i + batch_size]
+        batch = fetch_metadata_batch(source, chunk)
+        for obj_type, obj_name in chunk:
+            yield obj_type, obj_name, batch[(obj_type, obj_name)]
+
+# Function to make a valid sheet name (max 31 chars, no illegal chars)
+def sheet_title(obj_name):
+    return obj_name[:31].replace(':', '').replace('\\', '').replace('/', '').replace('?', '').replace('*', '').replace('[', '').replace(']', '')
+
+# Function to write a definition in one cell, or split over several rows if it overflows a cell
+def definition_rows(definition):
+    if len(definition) <= EXCEL_CELL_LIMIT:
+        return [[definition]]
+    # Long definitions are split at line breaks where possible
+    rows = []
+    chunk = ""
+    for line in definition.splitlines(keepends=True):
+        while len(line) > EXCEL_CELL_LIMIT:
+            if chunk:
+                rows.append([chunk])
+                chunk = ""
+            rows.append([line[:EXCEL_CELL_LIMIT]])
+            line = line[EXCEL_CELL_LIMIT:]
+        if len(chunk) + len(line) > EXCEL_CELL_LIMIT:
+            rows.append([chunk])
+            chunk = ""
+        chunk += line
+    if chunk:
+        rows.append([chunk])
+    return rows
+
+# Function to build the rows of an object's sheet
+def object_sheet_rows(obj_type, obj_name, metadata):
+    rows = []
+    
+    if obj_type == "table":
+        rows.append(["Table Metadata: " + obj_name])
+        rows.append([])  # Empty row
+        
+        # Write table metadata
+        rows.append(TABLE_COLUMNS)
+        rows.extend(metadata["columns"])
+    
+    elif obj_type == "view":
+        rows.append(["View Metadata: " + obj_name])
+        rows.append([])  # Empty row
+        
+        # Write view columns
+        rows.append(["View Columns:"])
+        rows.append(VIEW_COLUMNS)
+        rows.extend(metadata["columns"])
+        
+        # Write view definition
+        rows.append([])  # Empty row
+        rows.append(["View Definition:"])
+        rows.extend(definition_rows(metadata["definition"]))
+        
+    elif obj_type == "procedure":
+        rows.append(["Stored Procedure Metadata: " + obj_name])
+        rows.append([])  # Empty row
+        
+        # Write procedure parameters
+        if metadata["parameters"]:
+            rows.append(["Parameters:"])
+            rows.append(PARAMETER_COLUMNS)
+            rows.extend(metadata["parameters"])
+        
+        # Write procedure definition
+        rows.append([])  # Empty row
+        rows.append(["Procedure Definition:"])
+        rows.extend(definition_rows(metadata["definition"]))
+        
+    elif obj_type == "function":
+        rows.append(["Function Metadata: " + obj_name])
+        rows.append([])  # Empty row
+        
+        # Write function return type
+        rows.append(["Return Type:"])
+        rows.append([metadata["return_type"]])
+        
+        # Write function parameters
+        if metadata["parameters"]:
+            rows.append([])  # Empty row
+            rows.append(["Parameters:"])
+            rows.append(PARAMETER_COLUMNS)
+            rows.extend(metadata["parameters"])
+        
+        # Write function definition
+        rows.append([])  # Empty row
+        rows.append(["Function Definition:"])
+        rows.extend(definition_rows(metadata["definition"]))
+    
+    return rows
+
+# Function to set the column widths of a sheet
+def format_sheet(sheet, obj_type=None):
+    if obj_type is None:
+        # Summary sheet
+        for column in ['A', 'B', 'C']:
+            sheet.column_dimensions[column].width = 25 if column != 'C' else 60
+        return
+    
+    sheet.column_dimensions['A'].width = 30
+    if obj_type in ["table", "view"]:
+        for column in ['B', 'C', 'D', 'E']:
+            sheet.column_dimensions[column].width = 20
+
+# Function to delete the temporary sheet files of a write-only workbook that is not saved
+def discard_write_only_sheets(wb):
+    for sheet in wb.worksheets:
+        writer = getattr(sheet, "_writer", None)
+        if writer is None or not isinstance(writer.out, str):
+            continue
+        try:
+            if not sheet.closed:
+                sheet.close()
+            writer.cleanup()
+        except (OSError, ValueError):
+            pass  # Already removed by a save that got that far
+
+# Function to generate Excel report
+# source is the catalog snapshot, or an open connection to fetch the objects from
+# progress, if given, is called as progress(sheets_done, sheets_total)
+def generate_excel_report(source, selected_table, dependencies, similar_tables, progress=None):
+    started = time.perf_counter()
+    summary_rows, objects = report_objects(selected_table, dependencies, similar_tables)
+    
+    # Create workbook
+    wb = Workbook()
+    
+    # Create summary sheet
+    summary_sheet = wb.active
+    summary_sheet.title = "Summary"
+    
+    # Add header
+    summary_sheet.append(SUMMARY_HEADER)
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+    
+    for cell in summary_sheet[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+    
+    # Add data
+    for row in summary_rows:
+        summary_sheet.append(row)
+    format_sheet(summary_sheet)
+    
+    if progress:
+        progress(0, len(objects))
+    
+    # Create sheets for each object
+    for done, (obj_type, obj_name, metadata) in enumerate(iter_object_metadata(source, objects), start=1):
+        obj_sheet = wb.create_sheet(title=sheet_title(obj_name))
+        for row in object_sheet_rows(obj_type, obj_name, metadata):
+            obj_sheet.append(row)
+        format_sheet(obj_sheet, obj_type)
+        
+        if progress:
+            progress(done, len(objects))
+    
+    # Save to a BytesIO object
+    excel_file = BytesIO()
+    with span("export", "save workbook") as timing:
+        wb.save(excel_file)
+        timing["bytes"] = excel_file.tell()
+    excel_file.seek(0)
+    
+    get_tracer().record("export", f"Excel report {selected_table}", started, time.perf_counter() - started,
+                        bytes=excel_file.getbuffer().nbytes, sheets=len(objects) + 1)
+    return excel_file
+
+# Function to generate Excel report in constant memory
+# Sheets are written one at a time by a write-only workbook and the result goes
+# to a temporary .xlsx file, whose path is returned; the caller deletes it
+def generate_excel_report_streaming(source, selected_table, dependencies, similar_tables, progress=None):
+    started = time.perf_counter()
+    summary_rows, objects = report_objects(selected_table, dependencies, similar_tables)
+    
+    wb = Workbook(write_only=True)
+    
+    # Create summary sheet; write-only sheets need widths before any rows
+    summary_sheet = wb.create_sheet(title="Summary")
+    format_sheet(summary_sheet)
+    
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+    header = []
+    for value in SUMMARY_HEADER:
+        cell = WriteOnlyCell(summary_sheet, value=value)
+        cell.font = header_font
+        cell.fill = header_fill
+        header.append(cell)
+    summary_sheet.append(header)
+    
+    for row in summary_rows:
+        summary_sheet.append(row)
+    
+    fd, report_path = tempfile.mkstemp(prefix="DB_Metadata_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        if progress:
+            progress(0, len(objects))
+        
+        # Each sheet is flushed to a temporary file as soon as it is written
+        for done, (obj_type, obj_name, metadata) in enumerate(iter_object_metadata(source, objects), start=1):
+            obj_sheet = wb.create_sheet(title=sheet_title(obj_name))
+            format_sheet(obj_sheet, obj_type)
+            for row in object_sheet_rows(obj_type, obj_name, metadata):
+                obj_sheet.append(row)
+            
+            if progress:
+                progress(done, len(objects))
+        
+        with span("export", "save workbook") as timing:
+            wb.save(report_path)
+            timing["bytes"] = os.path.getsize(report_path)
+    except BaseException:
+        # Cancelled or failed: remove the partial output, sheets included
+        discard_write_only_sheets(wb)
+        os.remove(report_path)
+        raise
+    
+    get_tracer().record("export", f"Excel report {selected_table} (streaming)", started,
+                        time.perf_counter() - started, bytes=os.path.getsize(report_path), sheets=len(objects) + 1)
+    return report_path
@@ -0,0 +1,166 @@
+"""
+Importable API of the Database Metadata Explorer.
+
+The functions behind the Streamlit app, usable from scripts, cron jobs and
+the extract_cli command line without importing Streamlit:
+
+    from explorer import open_catalog, find_dependencies, generate_mermaid_erd
+
+    pool, catalog, message = open_catalog("localhost\\SQLEXPRESS", "AdventureWorks")
+    graph = DependencyGraph.from_catalog(catalog)
+    dependencies, relationships = find_dependencies(graph, "SalesOrderHeader")
+
+Metadata comes back as plain lists and dicts; the app turns them into
+DataFrames for display.
+"""
+
+from connection_pool import get_pool
+from metadata_cache import MetadataCache, load_catalog_cached
+from parallel_extract import DEFAULT_PARALLELISM
+
+ODBC_DRIVER = "ODBC Driver 17 for SQL Server"
+
+
+# Function to build the ODBC connection string of a database
+def connection_string(server, database, username="", password=""):
+    """
+    Returns the connection string of a SQL Server database.
+
+    Windows authentication is used when username is empty.
+    """
+    if username == "":
+        return f"DRIVER={{{ODBC_DRIVER}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;"
+    return f"DRIVER={{{ODBC_DRIVER}}};SERVER={server};DATABASE={database};UID={username};PWD={password};"
+
+
+# Function to connect to a database and load its catalog
+def open_catalog(server, database, username="", password="", force_refresh=False,
+                 parallelism=DEFAULT_PARALLELISM, cache=None):
+    """
+    Connects to a database and loads its catalog snapshot.
+
+    Args:
+        server (str): SQL Server instance name.
+        database (str): Database name.
+        username (str): SQL login; empty for Windows authentication.
+        password (str): Password of the SQL login.
+        force_refresh (bool): Ignore the cached catalog and reload it.
+        parallelism (int): Maximum number of catalog queries run at once.
+        cache (MetadataCache): Catalog cache to use; the default on-disk
+            cache if None.
+
+    Returns:
+        tuple: (ConnectionPool, CatalogSnapshot, str) - the shared pool of
+        the database, its catalog and a message saying where the catalog
+        came from.
+    """
+    pool = get_pool(connection_string(server, database, username, password))
+    catalog, message = load_catalog_cached(
+        pool, server, database, cache or MetadataCache(), force_refresh, parallelism, login=username
+    )
+    return pool, catalog, message
+
+
+# Function to get all tables
+def get_tables(catalog):
+    return catalog.table_names()
+
+
+# Function to get table columns
+def get_table_metadata(catalog, table_name):
+    return catalog.table_columns(table_name)
+
+
+# Function to get views
+def get_view_metadata(catalog, view_name):
+    return {
+        "columns": catalog.view_columns(view_name),
+        "definition": catalog.view_definition(view_name)
+    }
+
+
+# Function to get stored procedure metadata
+def get_procedure_metadata(catalog, proc_name):
+    return {
+        "parameters": catalog.routine_parameters(proc_name),
+        "definition": catalog.routine_definition(proc_name, "PROCEDURE")
+    }
+
+
+# Function to get function metadata
+def get_function_metadata(catalog, func_name):
+    return {
+        "parameters": catalog.routine_parameters(func_name),
+        "return_type": catalog.function_return_type(func_name),
+        "definition": catalog.routine_definition(func_name, "FUNCTION")
+    }
+
+
+# Function to identify dependencies from the dependency graph
+def find_dependencies(graph, table_name, depth=1, direction="incoming"):
+    """
+    Finds the objects related to a table.
+
+    By default only objects referencing the table directly are returned:
+    tables with a foreign key to it and the views, procedures and functions
+    using it.
+
+    Args:
+        graph (DependencyGraph): Graph of the database.
+        table_name (str): The table to start from.
+        depth (int): Maximum number of hops; None for unlimited.
+        direction (str): "incoming", "outgoing" or "both", see
+            DependencyGraph.traverse.
+
+    Returns:
+        tuple: (dependencies, relationships) - a dict of "tables", "views",
+        "procedures" and "functions" name lists, nearest first, and the
+        foreign key relationships traversed, for the ERD.
+    """
+    dependencies = {
+        "tables": [],
+        "views": [],
+        "procedures": [],
+        "functions": []
+    }
+
+    nodes, edges = graph.traverse(table_name, depth, direction)
+
+    # Group the reached objects by type, nearest first
+    for name in nodes:
+        dependencies[graph.node_types[name] + "s"].append(name)
+
+    relationships = [data for _, _, edge_type, data in edges if edge_type == "fk"]
+    return dependencies, relationships
+
+
+# Function to generate Mermaid ERD
+def generate_mermaid_erd(relationships, selected_table):
+    mermaid_code = ["erDiagram"]
+
+    # Track added relationships to avoid duplicates
+    added_relationships = set()
+
+    for rel in relationships:
+        ref_table = rel.referencing_table
+        refed_table = rel.referenced_table
+
+        # Create a unique identifier for this relationship
+        rel_key = f"{ref_table}:{refed_table}:{rel.referencing_column}:{rel.referenced_column}"
+
+        if rel_key not in added_relationships:
+            # Add the relationship to the diagram
+            # Format: TableA ||--o{ TableB : "Column relationship"
+            mermaid_code.append(f'    {refed_table} ||--o{{ {ref_table} : "{rel.referenced_column}"')
+            added_relationships.add(rel_key)
+
+    return "\n".join(mermaid_code)
+
+
+# Function to find similar tables
+def find_similar_tables(similarity_index, selected_table):
+    """
+    Returns (table, similarity) pairs of the tables sharing most column
+    names and types with the selected table, whatever their names.
+    """
+    return similarity_index.similar(selected_table)
@@ -0,0 +1,213 @@
+"""
+Command line extractor for scheduled, non-interactive runs.
+
+Connects to one database, loads its catalog (through the same on-disk cache
+as the app) and writes, for every requested table, its dependencies and
+similar tables as JSON, its Mermaid ERD and its Excel report. Without
+--tables the whole database is processed, and the catalog snapshot and the
+paged whole-database ERD are written as well.
+
+    python extract_cli.py --server localhost\\SQLEXPRESS --database AdventureWorks \\
+        --tables Customer SalesOrderHeader --output-dir out --outputs dependencies erd report
+
+Streamlit is never imported, and heavy modules (openpyxl, the renderers) are
+only imported when an output needs them, so the command starts quickly.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+from dependency_graph import DependencyGraph, DIRECTIONS
+from connection_pool import close_all_pools
+from explorer import open_catalog, find_dependencies, find_similar_tables, generate_mermaid_erd
+from instrumentation import action, get_tracer
+from parallel_extract import DEFAULT_PARALLELISM
+from records import paused_gc
+
+OUTPUTS = ["dependencies", "erd", "png", "report"]
+DEFAULT_OUTPUTS = ["dependencies", "erd", "report"]
+
+
+def log(message, quiet=False):
+    if not quiet:
+        print(message, file=sys.stderr)
+
+
+def file_name(name):
+    """Returns a name usable as a file name on every platform."""
+    return re.sub(r"[^\w.\-]", "_", name)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract database metadata, ERDs and reports.")
+    parser.add_argument("--server", required=True, help="SQL Server instance, e.g. localhost\\SQLEXPRESS")
+    parser.add_argument("--database", required=True, help="Database name")
+    parser.add_argument("--username", default=os.environ.get("DB_USERNAME", ""),
+                        help="SQL login (default: $DB_USERNAME; empty for Windows authentication)")
+    parser.add_argument("--password", default=os.environ.get("DB_PASSWORD", ""),
+                        help="Password of the SQL login (default: $DB_PASSWORD)")
+    parser.add_argument("--tables", nargs="+", help="Tables to process (default: every table)")
+    parser.add_argument("--tables-file", help="File with one table name per line")
+    parser.add_argument("--output-dir", default="metadata_output", help="Directory to write the outputs to")
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUTS, default=DEFAULT_OUTPUTS,
+                        help="Per-table outputs to write (default: %(default)s)")
+    parser.add_argument("--depth", type=int, default=1, help="Relationship hops to follow; 0 for unlimited")
+    parser.add_argument("--direction", choices=DIRECTIONS, default="incoming")
+    parser.add_argument("--streaming", action="store_true", help="Write reports in constant memory")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore the cached catalog")
+    parser.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM,
+                        help="Maximum number of catalog queries run at once")
+    parser.add_argument("--trace", help="Write the timings of every query, render and export to this "
+                                         "Chrome trace JSON file")
+    parser.add_argument("--quiet", action="store_true", help="Only report errors")
+    return parser.parse_args(argv)
+
+
+def requested_tables(args, catalog):
+    names = list(args.tables or [])
+    if args.tables_file:
+        with open(args.tables_file, encoding="utf-8") as f:
+            names.extend(line.strip() for line in f if line.strip())
+    return names or catalog.table_names()
+
+
+# Function to write the outputs of one table
+def extract_table(catalog, graph, similarity_index, table, args):
+    """
+    Writes the requested outputs of a table to args.output_dir.
+
+    Returns:
+        str: The Mermaid ERD of the table, for rendering.
+    """
+    depth = args.depth or None
+    dependencies, relationships = find_dependencies(graph, table, depth, args.direction)
+    similar = find_similar_tables(similarity_index, table) if similarity_index else []
+    base = os.path.join(args.output_dir, file_name(table))
+
+    if "dependencies" in args.outputs:
+        with open(f"{base}.dependencies.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "table": table,
+                "schema": catalog.tables.get(table),
+                "dependencies": dependencies,
+                "similar_tables": [{"table": name, "similarity": score} for name, score in similar],
+                "relationships": [rel.to_dict() for rel in relationships],
+            }, f, indent=2)
+
+    mermaid_code = generate_mermaid_erd(relationships, table)
+    if "erd" in args.outputs:
+        with open(f"{base}.mmd", "w", encoding="utf-8") as f:
+            f.write(mermaid_code)
+
+    if "report" in args.outputs:
+        from excel_report import generate_excel_report, generate_excel_report_streaming
+
+        report_path = os.path.join(args.output_dir, f"DB_Metadata_{file_name(table)}.xlsx")
+        similar_tables = [name for name, _ in similar]
+        if args.streaming:
+            shutil.move(generate_excel_report_streaming(catalog, table, dependencies, similar_tables), report_path)
+        else:
+            with open(report_path, "wb") as f:
+                f.write(generate_excel_report(catalog, table, dependencies, similar_tables).getvalue())
+
+    return mermaid_code
+
+
+# Function to write the paged whole-database ERD
+def extract_schema_erd(catalog, args):
+    from schema_erd import generate_schema_erd
+
+    schema_erd = generate_schema_erd(catalog)
+    erd_dir = os.path.join(args.output_dir, "schema_erd")
+    os.makedirs(erd_dir, exist_ok=True)
+    diagrams = {"00_overview": schema_erd["overview"]}
+    for number, page in enumerate(schema_erd["pages"], start=1):
+        diagrams[f"{number:02d}_{file_name(page['tables'][0])}"] = page["code"]
+    for name, code in diagrams.items():
+        with open(os.path.join(erd_dir, f"{name}.mmd"), "w", encoding="utf-8") as f:
+            f.write(code)
+    return {os.path.join(erd_dir, name): code for name, code in diagrams.items()}
+
+
+# Function to render diagrams to PNG files next to their Mermaid sources
+def render_pngs(diagrams, quiet=False):
+    from diagram_render import render_batch
+    from render_cache import get_render_cache
+
+    paths = list(diagrams)
+    results = render_batch([diagrams[path] for path in paths], cache=get_render_cache())
+    failed = 0
+    for path, (image, error) in zip(paths, results):
+        if error is not None:
+            failed += 1
+            log(f"Could not render {path}.png: {error}", quiet)
+            continue
+        with open(f"{path}.png", "wb") as f:
+            f.write(image)
+    return failed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        with action("load catalog"), paused_gc():
+            _, catalog, message = open_catalog(
+                args.server, args.database, args.username, args.password, args.force_refresh, args.parallelism
+            )
+    finally:
+        # The catalog holds everything needed from here on
+        close_all_pools()
+    log(f"{message} {len(catalog.tables)} tables.", args.quiet)
+
+    tables = requested_tables(args, catalog)
+    unknown = [table for table in tables if table not in catalog.tables]
+    for table in unknown:
+        log(f"Unknown table: {table}")
+    tables = [table for table in tables if table in catalog.tables]
+
+    with action("build indexes"):
+        graph = DependencyGraph.from_catalog(catalog)
+        similarity_index = None
+        if "dependencies" in args.outputs or "report" in args.outputs:
+            from similarity_index import ColumnSimilarityIndex
+            similarity_index = ColumnSimilarityIndex.from_catalog(catalog)
+
+    diagrams = {}
+    for done, table in enumerate(tables, start=1):
+        with action(f"table {table}"):
+            code = extract_table(catalog, graph, similarity_index, table, args)
+        diagrams[os.path.join(args.output_dir, file_name(table))] = code
+        log(f"[{done}/{len(tables)}] {table}", args.quiet)
+
+    # Whole-database outputs
+    if not (args.tables or args.tables_file):
+        with action("whole database"):
+            with open(os.path.join(args.output_dir, "catalog.json"), "w", encoding="utf-8") as f:
+                json.dump(catalog.to_dict(), f, default=str)
+            schema_diagrams = extract_schema_erd(catalog, args)
+        if "png" in args.outputs:
+            diagrams.update(schema_diagrams)
+
+    failed = 0
+    if "png" in args.outputs:
+        with action("render diagrams"):
+            failed = render_pngs(diagrams, args.quiet)
+
+    if args.trace:
+        get_tracer().export_chrome_trace(args.trace)
+        log(f"Wrote the trace to {args.trace}.", args.quiet)
+
+    log(f"Wrote {len(tables)} tables to {args.output_dir} in {time.perf_counter() - started:.1f}s.", args.quiet)
+    return 1 if unknown or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
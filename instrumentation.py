@@ -0,0 +1,262 @@
+"""
+Timing of queries, diagram renders and exports.
+
+Every cursor execute, render and export step records a span with its
+duration, the rows it fetched or the bytes it produced, and the user action
+it ran for. Actions are set with a context manager around the work a button
+triggers:
+
+    with action("Analyze Database", session=session_id):
+        ...
+
+and follow the work onto worker threads and background jobs submitted
+through in_context. Spans are kept in a bounded in-memory buffer, can be
+summarized per action for the app's performance panel and exported in the
+Chrome trace event format, which chrome://tracing and https://ui.perfetto.dev
+open directly.
+
+Recording a span costs a few microseconds; set INSTRUMENTATION=0 to turn it
+off entirely.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("INSTRUMENTATION", "1") != "0"
+# Most recent spans kept in memory; older ones are dropped
+MAX_SPANS = int(os.environ.get("INSTRUMENTATION_MAX_SPANS", 20000))
+# Length of the query text shown as a span name
+LABEL_LENGTH = 80
+
+CATEGORIES = ["action", "query", "render", "export", "compute", "job"]
+
+# (action name, session ID) of the work running in the current context
+_current = contextvars.ContextVar("instrumentation_action", default=(None, None))
+
+
+def query_label(query):
+    """Returns a short single-line name for a SQL statement."""
+    text = " ".join(query.split())
+    return text if len(text) <= LABEL_LENGTH else text[:LABEL_LENGTH - 3] + "..."
+
+
+def current_action():
+    """Returns the (action, session) pair spans are currently recorded for."""
+    return _current.get()
+
+
+def in_context(func):
+    """
+    Returns func bound to a copy of the current context.
+
+    Pass the result to an executor so the spans recorded on the worker thread
+    belong to the action that submitted it.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+class _NullSpan(dict):
+    # Swallows the fields set on spans while instrumentation is disabled
+    def __setitem__(self, key, value):
+        pass
+
+
+class Tracer:
+    """
+    Bounded, thread-safe store of timed spans.
+
+    A span is a dict with the keys name, category, action, session, start
+    (seconds since the tracer was created), duration (seconds), rows, bytes,
+    thread and error, plus any extra fields given when it was recorded.
+
+    Args:
+        max_spans (int): Number of most recent spans kept.
+        enabled (bool): Record spans at all.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS, enabled=ENABLED):
+        self.enabled = enabled
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._epoch = time.perf_counter()
+
+    def record(self, category, name, started, duration, **fields):
+        """
+        Stores a span measured by the caller.
+
+        Args:
+            category (str): One of CATEGORIES.
+            name (str): What was done, e.g. a query label or file name.
+            started (float): time.perf_counter() at the start of the work.
+            duration (float): Seconds the work took.
+            **fields: rows, bytes, error or any extra detail.
+        """
+        if not self.enabled:
+            return
+        action_name, session = _current.get()
+        span = {
+            "name": name,
+            "category": category,
+            "action": action_name,
+            "session": session,
+            "start": started - self._epoch,
+            "duration": duration,
+            "rows": None,
+            "bytes": None,
+            "thread": threading.current_thread().name,
+            "error": None,
+        }
+        span.update(fields)
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, category, name, **fields):
+        """
+        Times a with block as a span.
+
+        Yields a dict in which the block can set "rows", "bytes" or other
+        fields once it knows them. An exception escaping the block is noted
+        in the span's "error" field and re-raised.
+        """
+        if not self.enabled:
+            yield _NullSpan()
+            return
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.record(category, name, started, time.perf_counter() - started, **fields)
+
+    def spans(self, session=None):
+        """Returns the recorded spans, oldest first, optionally of one session."""
+        with self._lock:
+            spans = list(self._spans)
+        if session is not None:
+            spans = [span for span in spans if span["session"] == session]
+        return spans
+
+    def clear(self, session=None):
+        """Forgets all spans, or only those of one session."""
+        with self._lock:
+            if session is None:
+                self._spans.clear()
+            else:
+                kept = [span for span in self._spans if span["session"] != session]
+                self._spans.clear()
+                self._spans.extend(kept)
+
+    def summary(self, session=None):
+        """
+        Aggregates spans per action and category.
+
+        Returns:
+            list: Dicts with action, category, count, seconds, rows and bytes,
+            the slowest actions first. The "action" category holds the wall
+            time of the actions themselves, the "job" category that of the
+            background jobs they started; the other categories show where
+            that time went.
+        """
+        totals = {}
+        for span in self.spans(session):
+            key = (span["action"] or "(no action)", span["category"])
+            entry = totals.setdefault(key, {"action": key[0], "category": key[1], "count": 0,
+                                            "seconds": 0.0, "rows": 0, "bytes": 0})
+            entry["count"] += 1
+            entry["seconds"] += span["duration"]
+            entry["rows"] += span["rows"] or 0
+            entry["bytes"] += span["bytes"] or 0
+
+        # Actions are ordered by their longest category (a background job
+        # outlasts the action that started it), categories as in CATEGORIES
+        action_seconds = {}
+        for (action_name, _), entry in totals.items():
+            action_seconds[action_name] = max(action_seconds.get(action_name, 0.0), entry["seconds"])
+
+        def order(entry):
+            category = entry["category"]
+            rank = CATEGORIES.index(category) if category in CATEGORIES else len(CATEGORIES)
+            return -action_seconds[entry["action"]], entry["action"], rank
+
+        return sorted(totals.values(), key=order)
+
+    def chrome_trace(self, session=None):
+        """
+        Returns the spans in the Chrome trace event format.
+
+        Returns:
+            dict: A JSON-serializable trace with one complete ("X") event per
+            span and the thread names as metadata events.
+        """
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for span in self.spans(session):
+            tid = threads.setdefault(span["thread"], len(threads) + 1)
+            args = {key: value for key, value in span.items()
+                    if key not in ("name", "category", "start", "duration", "thread") and value is not None}
+            if "sql" in args:
+                args["sql"] = " ".join(args["sql"].split())
+            events.append({
+                "name": span["name"],
+                "cat": span["category"],
+                "ph": "X",
+                "ts": round(span["start"] * 1e6, 1),
+                "dur": round(span["duration"] * 1e6, 1),
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        for thread, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path, session=None):
+        """Writes chrome_trace() to a JSON file and returns its path."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(session), f, default=str)
+        return path
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+# Function to get the process-wide tracer
+def get_tracer():
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+def span(category, name, **fields):
+    """Times a with block as a span of the process-wide tracer."""
+    return get_tracer().span(category, name, **fields)
+
+
+@contextmanager
+def action(name, session=None):
+    """
+    Attributes the spans recorded inside a with block to a user action.
+
+    The block itself is recorded as an "action" span. A nested action keeps
+    the session of the enclosing one unless given its own.
+    """
+    _, outer_session = _current.get()
+    token = _current.set((name, session if session is not None else outer_session))
+    try:
+        with get_tracer().span("action", name):
+            yield
+    finally:
+        _current.reset(token)
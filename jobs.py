@@ -0,0 +1,207 @@
+"""
+Background jobs for long-running report and diagram generation.
+
+Jobs run on process-wide thread pools, so they survive Streamlit reruns:
+a session only keeps the job ID and looks the job up again on the next run
+to show its progress, cancel it or pick up its result.
+
+The pools are shared by every session, so each kind of job has its own:
+long reports or exports never hold up diagram renders, and vice versa.
+
+Jobs that leave files behind register a cleanup, which runs when the job is
+discarded or, for jobs a session abandoned, when it expires.
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import in_context, span
+
+# Jobs of each kind run at once, unless KIND_WORKERS sets a kind apart
+DEFAULT_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+# Renders mostly wait on the diagram service, so more of them run at once
+KIND_WORKERS = {
+    "erd": int(os.environ.get("JOB_WORKERS_ERD", 4)),
+}
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", 3600))
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+class Job:
+    """
+    State of one background job.
+
+    The job function receives the Job as its "job" keyword argument and
+    reports progress through job.progress(), which is also where a pending
+    cancellation is raised as JobCancelled. It registers what must be undone
+    once its result is no longer wanted, e.g. deleting a temporary file,
+    with job.add_cleanup().
+    """
+
+    def __init__(self, kind, label):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.label = label
+        self.status = "queued"      # queued, running, done, failed or cancelled
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.discarded = False
+        self._cancel = threading.Event()
+        self._cleanups = []
+        self._cleanup_lock = threading.Lock()
+
+    def progress(self, done, total):
+        """Records progress and stops the job if it has been cancelled."""
+        self.done = done
+        self.total = total
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        """Requests cancellation; the job stops at its next progress report."""
+        self._cancel.set()
+
+    def add_cleanup(self, func, *args):
+        """Registers func(*args) to run once the job's result is discarded or expires."""
+        with self._cleanup_lock:
+            self._cleanups.append((func, args))
+
+    def cleanup(self):
+        """Runs the registered cleanups, once; files already gone are ignored."""
+        with self._cleanup_lock:
+            cleanups, self._cleanups = self._cleanups, []
+        for func, args in cleanups:
+            try:
+                func(*args)
+            except OSError:
+                pass
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+
+class JobManager:
+    """
+    Runs jobs on one bounded thread pool per kind and keeps them addressable by ID.
+
+    Args:
+        workers (int): Pool size of the kinds not in kind_workers.
+        kind_workers (dict): Pool size per job kind.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, kind_workers=None):
+        self.workers = workers
+        self.kind_workers = dict(KIND_WORKERS if kind_workers is None else kind_workers)
+        self._executors = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _executor(self, kind):
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                executor = self._executors[kind] = ThreadPoolExecutor(
+                    max_workers=self.kind_workers.get(kind, self.workers), thread_name_prefix=f"job-{kind}"
+                )
+            return executor
+
+    def submit(self, kind, label, func, *args, **kwargs):
+        """
+        Starts func(*args, job=job, **kwargs) in the background.
+
+        Args:
+            kind (str): Job category, e.g. "report" or "erd".
+            label (str): Human-readable description shown with the progress.
+            func (callable): The work to run; its return value becomes job.result.
+
+        Returns:
+            Job: The submitted job.
+        """
+        self._prune()
+        job = Job(kind, label)
+        with self._lock:
+            self._jobs[job.id] = job
+        # The job's spans belong to the action that submitted it
+        self._executor(kind).submit(in_context(self._run), job, func, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job, func, args, kwargs):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+        else:
+            job.status = "running"
+            try:
+                with span("job", job.label, kind=job.kind):
+                    job.result = func(*args, job=job, **kwargs)
+                job.status = "done"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = e
+                job.status = "failed"
+        job.finished_at = time.time()
+        # Discarded while it ran, so its result is not wanted either
+        if job.discarded:
+            job.cleanup()
+
+    def get(self, job_id):
+        """Returns the job with the given ID, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+
+    def discard(self, job_id):
+        """
+        Cancels a job and forgets it, running its cleanups now if it has
+        finished or else as soon as it does.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None:
+            return
+        job.discarded = True
+        job.cancel()
+        if job.finished:
+            job.cleanup()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished_at and job.finished_at < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            job.cleanup()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+# Function to get the process-wide job manager
+def get_job_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,235 @@
+"""
+In-process renderer for Mermaid ER diagrams.
+
+Understands the erDiagram subset produced by this application (entity blocks
+with typed attributes and key markers, and relationship lines) and draws it
+without any network access: entities are placed in layers, parents above
+their children, and drawn as boxes joined by straight connectors. Output is
+SVG text or a PNG drawn with Pillow.
+"""
+
+import re
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+# Layers wider than this are wrapped onto further rows
+MAX_PER_ROW = 6
+PADDING = 8
+GAP_X = 60
+GAP_Y = 70
+MARGIN = 20
+
+ENTITY_START = re.compile(r'^\s*([^\s{]+)\s*\{\s*$')
+RELATIONSHIP = re.compile(r'^\s*(\S+)\s+([|}o{]{1,2}(?:--|\.\.)[|}o{]{1,2})\s+(\S+)\s*:\s*"?(.*?)"?\s*$')
+
+
+# Function to parse a Mermaid erDiagram
+def parse_er_diagram(source):
+    """
+    Parses the entities and relationships of a Mermaid erDiagram.
+
+    Args:
+        source (str): The Mermaid diagram definition.
+
+    Returns:
+        tuple: (entities, relationships) - an ordered dict of entity name ->
+        list of (type, name, keys) attributes, and a list of
+        (parent, child, label) relationships.
+
+    Raises:
+        ValueError: If the source is not an erDiagram.
+    """
+    lines = [line for line in source.splitlines() if line.strip() and not line.strip().startswith("%%")]
+    if not lines or lines[0].strip() != "erDiagram":
+        raise ValueError("Only Mermaid erDiagram sources can be rendered locally")
+
+    entities = {}
+    relationships = []
+    current = None
+    for line in lines[1:]:
+        stripped = line.strip()
+        if current is not None:
+            if stripped == "}":
+                current = None
+            else:
+                # Comments are quoted and may contain spaces; show them after the keys
+                comment = re.search(r'"([^"]*)"', stripped)
+                parts = re.sub(r'"[^"]*"', "", stripped).split()
+                keys = " ".join(parts[2:] + ([comment.group(1)] if comment else []))
+                entities[current].append((parts[0], parts[1] if len(parts) > 1 else "", keys))
+            continue
+        match = ENTITY_START.match(line)
+        if match:
+            current = match.group(1)
+            entities.setdefault(current, [])
+            continue
+        match = RELATIONSHIP.match(line)
+        if match:
+            parent, _, child, label = match.groups()
+            entities.setdefault(parent, [])
+            entities.setdefault(child, [])
+            relationships.append((parent, child, label))
+    return entities, relationships
+
+
+def _layers(entities, relationships):
+    # Rank entities so that parents sit above their children; the number of
+    # relaxation rounds is bounded so cycles cannot loop forever
+    rank = {name: 0 for name in entities}
+    for _ in range(len(entities)):
+        changed = False
+        for parent, child, _ in relationships:
+            if parent != child and rank[child] < rank[parent] + 1 and rank[parent] + 1 < len(entities):
+                rank[child] = rank[parent] + 1
+                changed = True
+        if not changed:
+            break
+
+    layers = {}
+    for name in entities:
+        layers.setdefault(rank[name], []).append(name)
+
+    rows = []
+    for level in sorted(layers):
+        members = layers[level]
+        for i in range(0, len(members), MAX_PER_ROW):
+            rows.append(members[i:i + MAX_PER_ROW])
+    return rows
+
+
+# Function to place the entities of a diagram
+def layout(entities, relationships, char_width, line_height):
+    """
+    Computes box positions for the entities.
+
+    Args:
+        entities (dict): Entity name -> attributes, from parse_er_diagram.
+        relationships (list): (parent, child, label) tuples.
+        char_width (float): Width of one character in pixels.
+        line_height (float): Height of one text line in pixels.
+
+    Returns:
+        tuple: (boxes, width, height) - entity name -> (x, y, w, h) and the
+        size of the whole drawing.
+    """
+    sizes = {}
+    for name, attributes in entities.items():
+        texts = [name] + [" ".join(part for part in attribute if part) for attribute in attributes]
+        width = max(len(text) for text in texts) * char_width + 2 * PADDING
+        sizes[name] = (width, (len(attributes) + 1) * line_height + 2 * PADDING)
+
+    parents = {}
+    for parent, child, _ in relationships:
+        parents.setdefault(child, []).append(parent)
+
+    boxes = {}
+    y = MARGIN
+    width = 0
+    for row in _layers(entities, relationships):
+        # Order each row by the mean position of its parents to limit crossings
+        def position(name):
+            placed = [boxes[p][0] for p in parents.get(name, []) if p in boxes]
+            return sum(placed) / len(placed) if placed else float("inf")
+        row = sorted(row, key=position)
+
+        x = MARGIN
+        for name in row:
+            w, h = sizes[name]
+            boxes[name] = (x, y, w, h)
+            x += w + GAP_X
+        width = max(width, x - GAP_X + MARGIN)
+        y += max(sizes[name][1] for name in row) + GAP_Y
+    return boxes, width, max(y - GAP_Y + MARGIN, 2 * MARGIN)
+
+
+def _border_point(box, towards):
+    # Point where the line from the box centre to "towards" leaves the box
+    x, y, w, h = box
+    cx, cy = x + w / 2, y + h / 2
+    dx, dy = towards[0] - cx, towards[1] - cy
+    if dx == 0 and dy == 0:
+        return cx, cy
+    scale = min(w / 2 / abs(dx) if dx else float("inf"), h / 2 / abs(dy) if dy else float("inf"))
+    return cx + dx * scale, cy + dy * scale
+
+
+def _connectors(boxes, relationships):
+    # (parent point, child point, label) of every drawable relationship
+    lines = []
+    for parent, child, label in relationships:
+        if parent == child:
+            continue
+        a, b = boxes[parent], boxes[child]
+        start = _border_point(a, (b[0] + b[2] / 2, b[1] + b[3] / 2))
+        end = _border_point(b, (a[0] + a[2] / 2, a[1] + a[3] / 2))
+        lines.append((start, end, label))
+    return lines
+
+
+# Function to draw an ER diagram as SVG
+def render_svg(source):
+    """Returns the SVG document of a Mermaid erDiagram as bytes."""
+    entities, relationships = parse_er_diagram(source)
+    char_width, line_height = 7.2, 18
+    boxes, width, height = layout(entities, relationships, char_width, line_height)
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+           f'font-family="monospace" font-size="12">',
+           '<rect width="100%" height="100%" fill="white"/>']
+    for start, end, label in _connectors(boxes, relationships):
+        out.append(f'<line x1="{start[0]:.1f}" y1="{start[1]:.1f}" x2="{end[0]:.1f}" y2="{end[1]:.1f}" '
+                   f'stroke="#555"/>')
+        out.append(f'<circle cx="{end[0]:.1f}" cy="{end[1]:.1f}" r="3" fill="#555"/>')
+        if label:
+            out.append(f'<text x="{(start[0] + end[0]) / 2:.1f}" y="{(start[1] + end[1]) / 2:.1f}" '
+                       f'fill="#333" text-anchor="middle">{escape(label)}</text>')
+    for name, (x, y, w, h) in boxes.items():
+        out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" '
+                   f'fill="#ececff" stroke="#9370db"/>')
+        out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{line_height + PADDING:.1f}" '
+                   f'fill="#d6d6ff" stroke="#9370db"/>')
+        out.append(f'<text x="{x + PADDING:.1f}" y="{y + PADDING + line_height * 0.7:.1f}" '
+                   f'font-weight="bold">{escape(name)}</text>')
+        for i, attribute in enumerate(entities[name], start=1):
+            text = " ".join(part for part in attribute if part)
+            out.append(f'<text x="{x + PADDING:.1f}" y="{y + PADDING + line_height * (i + 0.7):.1f}">'
+                       f'{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out).encode("utf-8")
+
+
+# Function to draw an ER diagram as PNG
+def render_png(source):
+    """Returns the PNG image of a Mermaid erDiagram as bytes."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    entities, relationships = parse_er_diagram(source)
+    try:
+        font = ImageFont.load_default(size=13)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed bitmap font
+        font = ImageFont.load_default()
+    char_width = font.getlength("M")
+    left, top, right, bottom = font.getbbox("Mg")
+    line_height = bottom - top + 6
+    boxes, width, height = layout(entities, relationships, char_width, line_height)
+
+    image = Image.new("RGB", (int(width) + 1, int(height) + 1), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for start, end, label in _connectors(boxes, relationships):
+        draw.line([start, end], fill=(85, 85, 85), width=1)
+        draw.ellipse([end[0] - 3, end[1] - 3, end[0] + 3, end[1] + 3], fill=(85, 85, 85))
+        if label:
+            draw.text(((start[0] + end[0]) / 2, (start[1] + end[1]) / 2), label,
+                      fill=(51, 51, 51), font=font, anchor="mm")
+    for name, (x, y, w, h) in boxes.items():
+        draw.rectangle([x, y, x + w, y + h], fill=(236, 236, 255), outline=(147, 112, 219))
+        draw.rectangle([x, y, x + w, y + line_height + PADDING], fill=(214, 214, 255), outline=(147, 112, 219))
+        draw.text((x + PADDING, y + PADDING), name, fill=(0, 0, 0), font=font)
+        for i, attribute in enumerate(entities[name], start=1):
+            text = " ".join(part for part in attribute if part)
+            draw.text((x + PADDING, y + PADDING + line_height * i), text, fill=(0, 0, 0), font=font)
+
+    output = BytesIO()
+    image.save(output, "PNG")
+    return output.getvalue()
@@ -0,0 +1,234 @@
+"""
+Persistent on-disk cache of catalog snapshots.
+
+Snapshots are stored compressed in a local SQLite file, one entry per
+(server, database, login): logins can see different objects and
+definitions, so a snapshot is never served to, or refreshed by, another
+login than the one that loaded it. A cached snapshot is reused as long as the catalog
+version reported by the server is unchanged, so a new session only pays for
+one cheap validation query instead of a full catalog load; a stale copy is
+brought up to date incrementally. The file is kept under a size budget by
+evicting the least recently used databases.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+
+from catalog import CatalogSnapshot, load_catalog, refresh_catalog
+from parallel_extract import DEFAULT_PARALLELISM, execute_queries
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "METADATA_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".db_metadata_explorer", "catalog_cache.sqlite")
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("METADATA_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Changes whenever an object is created, altered or dropped
+CATALOG_VERSION_QUERY = """
+SELECT
+    COUNT(*),
+    MAX(modify_date),
+    CHECKSUM_AGG(CHECKSUM(object_id, modify_date))
+FROM sys.objects
+WHERE is_ms_shipped = 0
+"""
+
+
+# Function to read the catalog version of the connected database
+def catalog_version(conn):
+    """
+    Returns a string identifying the current state of the database catalog.
+
+    Args:
+        conn: An open pyodbc connection or a ConnectionPool.
+
+    Returns:
+        str: Object count, latest modify_date and checksum, joined by "|".
+    """
+    row = execute_queries(conn, [(CATALOG_VERSION_QUERY, ())])[0][0]
+    return "|".join(str(value) for value in row)
+
+
+class MetadataCache:
+    """
+    SQLite store of compressed catalog snapshots keyed by (server, database,
+    login), the login being empty for Windows authentication.
+
+    Every call opens its own short-lived SQLite connection, so one instance
+    can be shared by all Streamlit sessions and threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            # Entries cached before they were keyed by login cannot be told apart
+            columns = [row[1] for row in db.execute("PRAGMA table_info(catalogs)")]
+            if columns and "login" not in columns:
+                db.execute("DROP TABLE catalogs")
+            db.execute("""
+            CREATE TABLE IF NOT EXISTS catalogs (
+                server TEXT NOT NULL,
+                database TEXT NOT NULL,
+                login TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (server, database, login)
+            )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _key(server, database, login):
+        return server.strip().lower(), database.strip().lower(), login.strip().lower()
+
+    def get(self, server, database, login=""):
+        """
+        Returns the cached entry for a database.
+
+        Args:
+            server (str): SQL Server instance name.
+            database (str): Database name.
+            login (str): SQL login; empty for Windows authentication.
+
+        Returns:
+            tuple: (version, CatalogSnapshot), or None if nothing usable is
+            cached.
+        """
+        key = self._key(server, database, login)
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT version, payload FROM catalogs WHERE server = ? AND database = ? AND login = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE catalogs SET last_used = ? WHERE server = ? AND database = ? AND login = ?",
+                (time.time(),) + key
+            )
+        version, payload = row
+        data = json.loads(zlib.decompress(payload))
+        # Snapshots cached before definitions were read in full from
+        # sys.sql_modules hold truncated ones, so they are loaded again
+        if "compressed_definitions" not in data:
+            return None
+        return version, CatalogSnapshot.from_dict(data)
+
+    def put(self, server, database, version, catalog, login=""):
+        """Stores a snapshot for a database and evicts old entries if needed."""
+        payload = zlib.compress(json.dumps(catalog.to_dict(compact=True)).encode("utf-8"))
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO catalogs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._key(server, database, login) + (version, payload, len(payload), time.time())
+            )
+        self.evict()
+
+    def invalidate(self, server, database, login=""):
+        """Drops the cached entry of a database."""
+        with self._connect() as db:
+            db.execute(
+                "DELETE FROM catalogs WHERE server = ? AND database = ? AND login = ?",
+                self._key(server, database, login)
+            )
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT server, database, login, size FROM catalogs ORDER BY last_used DESC"
+            ).fetchall()
+            total = 0
+            evicted = False
+            for server, database, login, size in rows:
+                total += size
+                if total > self.max_bytes:
+                    db.execute(
+                        "DELETE FROM catalogs WHERE server = ? AND database = ? AND login = ?",
+                        (server, database, login)
+                    )
+                    evicted = True
+        if evicted:
+            # Give the freed pages back to the file system
+            db = sqlite3.connect(self.path, timeout=30)
+            try:
+                db.execute("VACUUM")
+            finally:
+                db.close()
+
+
+# Function to load a catalog through the persistent cache
+def load_catalog_cached(conn, server, database, cache, force_refresh=False, parallelism=DEFAULT_PARALLELISM,
+                        login=""):
+    """
+    Returns the catalog snapshot of a database, reusing the cached copy when
+    the server reports the same catalog version and refreshing it
+    incrementally when it does not.
+
+    Args:
+        conn: An open pyodbc connection or a ConnectionPool for the database.
+        server (str): SQL Server instance name, used as part of the cache key.
+        database (str): Database name, used as part of the cache key.
+        cache (MetadataCache): The cache to read from and write to.
+        force_refresh (bool): Ignore the cached copy and reload from the server.
+        parallelism (int): Maximum number of catalog queries run at once.
+        login (str): SQL login conn uses, used as part of the cache key;
+            empty for Windows authentication.
+
+    Returns:
+        tuple: (CatalogSnapshot, str) - the snapshot and a short message
+        saying where it came from.
+    """
+    version = catalog_version(conn)
+
+    cached = None if force_refresh else cache.get(server, database, login)
+    if cached and cached[0] == version:
+        return cached[1], "Catalog loaded from cache."
+
+    if cached and cached[1].high_water_mark:
+        catalog = cached[1]
+        stats = refresh_catalog(conn, catalog, parallelism=parallelism)
+        message = refresh_message(stats)
+    else:
+        catalog = load_catalog(conn, parallelism)
+        message = "Catalog loaded from the server."
+
+    cache.put(server, database, version, catalog, login)
+    return catalog, message
+
+
+# Function to refresh a catalog and its cache entry
+def refresh_catalog_cached(conn, server, database, cache, catalog, parallelism=DEFAULT_PARALLELISM, login=""):
+    """
+    Incrementally refreshes a snapshot in place and stores the result.
+
+    Returns:
+        str: A message with the number of objects re-read.
+    """
+    version = catalog_version(conn)
+    stats = refresh_catalog(conn, catalog, parallelism=parallelism)
+    cache.put(server, database, version, catalog, login)
+    return refresh_message(stats)
+
+
+def refresh_message(stats):
+    """Formats the counts returned by refresh_catalog for display."""
+    return (f"Catalog refreshed incrementally: {stats['reread']} objects re-read "
+            f"({stats['added']} added, {stats['changed']} changed, {stats['removed']} removed).")
@@ -0,0 +1,81 @@
+"""
+Concurrent execution of independent catalog queries.
+
+Statements are fanned out over worker threads, each borrowing its own
+connection from a ConnectionPool; pyodbc releases the GIL while it waits on
+the server, so the queries really run side by side. Results always come back
+in the order the statements were given, whatever order they finish in.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from connection_pool import ConnectionPool
+from instrumentation import in_context, query_label, span
+
+# Maximum number of catalog queries in flight per extraction
+DEFAULT_PARALLELISM = int(os.environ.get("EXTRACT_PARALLELISM", 4))
+# Rows fetched at a time from queries whose rows are converted on arrival
+CONVERT_CHUNK_ROWS = 100
+
+
+@contextmanager
+def borrow(source):
+    """Yields a connection from a ConnectionPool, or the connection itself."""
+    if isinstance(source, ConnectionPool):
+        with source.connection() as conn:
+            yield conn
+    else:
+        yield source
+
+
+def _run(conn, query, params, convert=None):
+    with span("query", query_label(query), sql=query, params=len(params)) as timing:
+        cursor = conn.cursor()
+        cursor.execute(query, *params)
+        if convert is None:
+            rows = [tuple(row) for row in cursor.fetchall()]
+        else:
+            # Only one chunk of unconverted rows is held at a time
+            rows = []
+            while True:
+                chunk = cursor.fetchmany(CONVERT_CHUNK_ROWS)
+                if not chunk:
+                    break
+                rows.extend(convert(tuple(row)) for row in chunk)
+        cursor.close()
+        timing["rows"] = len(rows)
+    return rows
+
+
+def _run_pooled(pool, query, params, convert=None):
+    with pool.connection() as conn:
+        return _run(conn, query, params, convert)
+
+
+# Function to run a list of independent queries
+def execute_queries(source, statements, parallelism=DEFAULT_PARALLELISM):
+    """
+    Runs independent queries and returns their rows in statement order.
+
+    Args:
+        source: A ConnectionPool, or a single open connection. Queries only
+            run concurrently when a pool is given.
+        statements (list): (query, params) pairs, params being a sequence of
+            values for the "?" placeholders, or (query, params, convert)
+            triples whose rows are fetched in chunks and passed through
+            convert(row) as they arrive, e.g. to compress large values.
+        parallelism (int): Maximum number of queries running at once. The
+            pool's max_size caps the number of connections used as well.
+
+    Returns:
+        list: One list of row tuples per statement.
+    """
+    if not isinstance(source, ConnectionPool) or parallelism <= 1 or len(statements) <= 1:
+        with borrow(source) as conn:
+            return [_run(conn, *statement) for statement in statements]
+
+    with ThreadPoolExecutor(max_workers=min(parallelism, len(statements))) as executor:
+        futures = [executor.submit(in_context(_run_pooled), source, *statement) for statement in statements]
+        return [future.result() for future in futures]
@@ -0,0 +1,125 @@
+"""
+Compact records for catalog columns, parameters and foreign keys.
+
+Large catalogs hold hundreds of thousands of these records. They are
+therefore __slots__ classes instead of dicts, which saves the per-instance
+__dict__ and its hash table.
+
+Strings that repeat across objects are interned, so all records share one
+copy of each:
+- data types and parameter modes
+- schema names
+- common column names such as "Id" or "ModifiedDate"
+
+Fields are read as attributes (column.data_type). to_dict and from_dict
+convert a record to and from the plain dict form used by the exports. The
+catalog cache stores values() lists instead, which are smaller and faster
+to load.
+"""
+
+import gc
+import sys
+from contextlib import contextmanager
+
+_intern = sys.intern
+
+
+def intern(value):
+    """Interns strings, passing other values (None, numbers) through."""
+    return sys.intern(value) if type(value) is str else value
+
+
+@contextmanager
+def paused_gc():
+    """
+    Suspends the cyclic garbage collector while a with block runs.
+
+    Building a catalog allocates hundreds of thousands of records, none of
+    them in reference cycles. With the collector running, every few
+    thousand allocations it rescans the growing heap, which can double the
+    build time.
+
+    The collector is process-wide, so this is only for command-line entry
+    points that own their process; never use it in the Streamlit server or
+    on worker threads shared with other work.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class Record:
+    """Base of the slotted records; subclasses list their fields in __slots__."""
+
+    __slots__ = ()
+
+    def values(self):
+        """Returns the field values as a tuple, in __slots__ order."""
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data[field] for field in cls.__slots__))
+
+    @classmethod
+    def load_all(cls, items):
+        """Rebuilds records from a JSON list of to_dict() dicts or values() lists."""
+        return [cls.from_dict(item) if type(item) is dict else cls(*item) for item in items]
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __hash__(self):
+        return hash(self.values())
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Column(Record):
+    """A table or view column; data_type is formatted, e.g. "varchar(50)"."""
+
+    __slots__ = ("name", "data_type", "nullable", "identity", "primary_key")
+
+    def __init__(self, name, data_type, nullable, identity=False, primary_key=False):
+        self.name = _intern(name)
+        self.data_type = _intern(data_type)
+        self.nullable = nullable
+        self.identity = identity
+        self.primary_key = primary_key
+
+
+class Parameter(Record):
+    """A procedure or function parameter."""
+
+    __slots__ = ("name", "data_type", "mode")
+
+    def __init__(self, name, data_type, mode):
+        self.name = intern(name)
+        self.data_type = intern(data_type)
+        self.mode = intern(mode)
+
+
+class Relationship(Record):
+    """One column of a foreign key, from the referencing (child) table to the referenced (parent) one."""
+
+    __slots__ = ("fk_name", "referencing_schema", "referencing_table", "referencing_column",
+                 "referenced_schema", "referenced_table", "referenced_column")
+
+    def __init__(self, fk_name, referencing_schema, referencing_table, referencing_column,
+                 referenced_schema, referenced_table, referenced_column):
+        self.fk_name = fk_name
+        self.referencing_schema = _intern(referencing_schema)
+        self.referencing_table = _intern(referencing_table)
+        self.referencing_column = _intern(referencing_column)
+        self.referenced_schema = _intern(referenced_schema)
+        self.referenced_table = _intern(referenced_table)
+        self.referenced_column = _intern(referenced_column)
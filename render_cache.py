@@ -0,0 +1,163 @@
+"""
+Content-addressed cache of rendered diagram images.
+
+An image is identified by the SHA-256 of its Mermaid source and render
+options, so the same diagram is only ever rendered once: repeat views are
+served from an in-memory LRU layer, and across sessions and restarts from
+an on-disk store of one file per image. The disk store is kept under a size
+budget by evicting the least recently used images.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_RENDER_CACHE_DIR = os.environ.get(
+    "RENDER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".db_metadata_explorer", "render_cache")
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+DEFAULT_MEMORY_ITEMS = int(os.environ.get("RENDER_CACHE_MEMORY_ITEMS", 64))
+
+
+# Function to compute the cache key of a diagram
+def render_key(source, options=None):
+    """
+    Returns the content address of a rendered diagram.
+
+    Args:
+        source (str): The Mermaid diagram definition.
+        options (dict): Render options that change the output image, such
+            as the format or the backend. Must be JSON-serializable.
+
+    Returns:
+        str: Hex SHA-256 digest of the source and options.
+    """
+    payload = json.dumps({"source": source, "options": options or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Two-level image cache: an in-memory LRU in front of a directory of files.
+
+    Files are written atomically under their key, so one directory can be
+    shared by all sessions and processes; the modification time of a file
+    is its last use and drives eviction.
+    """
+
+    def __init__(self, directory=DEFAULT_RENDER_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 memory_items=DEFAULT_MEMORY_ITEMS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.img")
+
+    def get(self, key):
+        """Returns the cached image bytes for a key, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        """Stores image bytes under a key and evicts old images if needed."""
+        self._remember(key, data)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get_or_render(self, source, render, options=None):
+        """
+        Returns the image of a diagram, rendering it only on a cache miss.
+
+        Args:
+            source (str): The Mermaid diagram definition.
+            render (callable): Called as render(source) on a miss; returns
+                the image bytes or raises.
+            options (dict): Render options, part of the cache key.
+
+        Returns:
+            bytes: The image.
+        """
+        key = render_key(source, options)
+        data = self.get(key)
+        if data is None:
+            data = render(source)
+            self.put(key, data)
+        return data
+
+    def evict(self):
+        """Removes least recently used files until the store fits max_bytes."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".img"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Drops every cached image."""
+        with self._lock:
+            self._memory.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(".img"):
+                os.remove(os.path.join(self.directory, name))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide render cache
+def get_render_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+        return _cache
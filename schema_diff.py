@@ -0,0 +1,389 @@
+"""
+Schema drift between two catalog snapshots.
+
+Every table, view, procedure and function gets a fingerprint: a hash of
+what the metadata lookups describe for it. For tables that is the columns
+(name, type, nullability, identity, primary key) and their foreign keys;
+for views the columns and definition text; for routines the parameters,
+return type and definition text. Object fingerprints are rolled up into
+one hash per schema and one for the whole catalog.
+
+Comparing two catalogs, e.g. last night's and today's or DEV and PROD,
+first compares the schema hashes and skips every schema whose hash is
+unchanged. Within the remaining schemas only the objects whose
+fingerprints differ are unpacked column by column. The result is a
+structured report of added, removed and changed objects.
+
+Catalogs are read from the catalog.json written by extract_cli or the
+per-database files of the crawler:
+
+    python schema_diff.py nightly/catalog.json today/catalog.json
+"""
+
+import argparse
+import difflib
+import gzip
+import hashlib
+import json
+import sys
+
+from catalog import CatalogSnapshot
+from records import paused_gc
+
+# Bytes of each fingerprint; 128 bits make accidental collisions negligible
+DIGEST_SIZE = 16
+
+OBJECT_TYPES = ["table", "view", "procedure", "function"]
+ROUTINE_OBJECT_TYPES = {"PROCEDURE": "procedure", "FUNCTION": "function"}
+
+# Separators that cannot occur in SQL Server identifiers or type names
+_FIELD = "\x1f"
+_ROW = "\x1e"
+_SECTION = "\x1d"
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _rows(records):
+    return _ROW.join(_FIELD.join(map(str, record.values())) for record in records)
+
+
+def normalize_definition(definition):
+    """
+    Returns definition text as compared between catalogs.
+
+    Line endings and trailing whitespace are ignored, as they differ between
+    servers a script was deployed to without being a change to the object.
+    """
+    if not definition:
+        return ""
+    return "\n".join(line.rstrip() for line in definition.splitlines()).strip()
+
+
+def catalog_objects(catalog):
+    """
+    Lists the objects of a catalog that fingerprints are computed for.
+
+    Returns:
+        dict: (object type, name) -> schema, for the types of OBJECT_TYPES.
+    """
+    objects = {("table", name): schema for name, schema in catalog.tables.items()}
+    for name, view in catalog.views.items():
+        objects[("view", name)] = view["schema"]
+    for name, routine in catalog.routines.items():
+        obj_type = ROUTINE_OBJECT_TYPES.get(routine["type"])
+        if obj_type:
+            objects[(obj_type, name)] = routine["schema"]
+    return objects
+
+
+def _foreign_keys(catalog, table_name):
+    # The catalog keeps them in query order, which is not stable for the
+    # columns of one key
+    return sorted(catalog.fks_by_referencing.get(table_name, []), key=lambda rel: rel.values())
+
+
+def object_fingerprint(catalog, obj_type, obj_name):
+    """
+    Returns the fingerprint of one object as a hex string.
+
+    Args:
+        catalog (CatalogSnapshot): Catalog holding the object.
+        obj_type (str): "table", "view", "procedure" or "function".
+        obj_name (str): Unqualified object name.
+    """
+    if obj_type == "table":
+        parts = [catalog.tables.get(obj_name, ""),
+                 _rows(catalog.columns.get(obj_name, [])),
+                 _rows(_foreign_keys(catalog, obj_name))]
+    elif obj_type == "view":
+        view = catalog.views.get(obj_name, {})
+        parts = [view.get("schema", ""),
+                 _rows(catalog.columns.get(obj_name, [])),
+                 normalize_definition(catalog.definition(obj_name))]
+    elif obj_type in ("procedure", "function"):
+        routine = catalog.routines.get(obj_name, {})
+        parts = [routine.get("schema", ""),
+                 routine.get("type", ""),
+                 routine.get("return_type", ""),
+                 _rows(catalog.parameters.get(obj_name, [])),
+                 normalize_definition(catalog.definition(obj_name))]
+    else:
+        raise ValueError(f"Unknown object type: {obj_type}")
+    return _digest(_SECTION.join([obj_type, obj_name] + parts))
+
+
+class CatalogFingerprint:
+    """
+    Object, schema and catalog fingerprints of one snapshot.
+
+    Attributes:
+        objects (dict): (object type, name) -> (schema, fingerprint).
+        schemas (dict): Schema -> fingerprint of all its objects.
+        by_schema (dict): Schema -> [(object type, name), ...].
+        digest (str): Fingerprint of the whole catalog.
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.by_schema = {}
+        for key, (schema, _) in objects.items():
+            self.by_schema.setdefault(schema, []).append(key)
+        self.schemas = {}
+        for schema, keys in self.by_schema.items():
+            keys.sort()
+            self.schemas[schema] = _digest(_ROW.join(
+                _FIELD.join((obj_type, name, objects[(obj_type, name)][1])) for obj_type, name in keys
+            ))
+        self.digest = _digest(_ROW.join(_FIELD.join(item) for item in sorted(self.schemas.items())))
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """Fingerprints every object of a CatalogSnapshot."""
+        return cls({(obj_type, name): (schema, object_fingerprint(catalog, obj_type, name))
+                    for (obj_type, name), schema in catalog_objects(catalog).items()})
+
+
+def object_schema(catalog, obj_type, obj_name):
+    """Returns the schema of an object, or None if the catalog lacks it."""
+    if obj_type == "table":
+        return catalog.tables.get(obj_name)
+    entry = catalog.views.get(obj_name) if obj_type == "view" else catalog.routines.get(obj_name)
+    return entry["schema"] if entry else None
+
+
+def _diff_records(old_records, new_records):
+    # Records are matched by name; fields are compared one by one
+    old_by_name = {record.name: record for record in old_records}
+    new_by_name = {record.name: record for record in new_records}
+    changes = {
+        "added": [record.to_dict() for record in new_records if record.name not in old_by_name],
+        "removed": [record.to_dict() for record in old_records if record.name not in new_by_name],
+        "changed": [],
+    }
+    for record in new_records:
+        old_record = old_by_name.get(record.name)
+        if old_record is None or old_record == record:
+            continue
+        old_values, new_values = old_record.to_dict(), record.to_dict()
+        changes["changed"].append({
+            "name": record.name,
+            "fields": {field: [old_values[field], value] for field, value in new_values.items()
+                       if old_values[field] != value},
+        })
+    common = set(old_by_name) & set(new_by_name)
+    if not any(changes.values()):
+        # Same records, so they can only have moved
+        if [r.name for r in old_records if r.name in common] != [r.name for r in new_records if r.name in common]:
+            changes["reordered"] = True
+        else:
+            return None
+    return changes
+
+
+def object_changes(old, new, obj_type, obj_name):
+    """
+    Describes how an object differs between two catalogs.
+
+    Returns:
+        dict: Only the aspects that changed, among "schema" and
+        "return_type" ([old, new]), "columns" and "parameters" (added,
+        removed and changed records, or "reordered"), "foreign_keys" (added
+        and removed relationships) and "definition" (the line counts; see
+        definition_diff for the text).
+    """
+    changes = {}
+    old_schema = object_schema(old, obj_type, obj_name)
+    new_schema = object_schema(new, obj_type, obj_name)
+    if old_schema != new_schema:
+        changes["schema"] = [old_schema, new_schema]
+
+    if obj_type in ("table", "view"):
+        columns = _diff_records(old.columns.get(obj_name, []), new.columns.get(obj_name, []))
+        if columns:
+            changes["columns"] = columns
+    if obj_type == "table":
+        old_keys, new_keys = _foreign_keys(old, obj_name), _foreign_keys(new, obj_name)
+        if old_keys != new_keys:
+            changes["foreign_keys"] = {
+                "added": [rel.to_dict() for rel in new_keys if rel not in old_keys],
+                "removed": [rel.to_dict() for rel in old_keys if rel not in new_keys],
+            }
+    if obj_type in ("procedure", "function"):
+        parameters = _diff_records(old.parameters.get(obj_name, []), new.parameters.get(obj_name, []))
+        if parameters:
+            changes["parameters"] = parameters
+        old_routine, new_routine = old.routines[obj_name], new.routines[obj_name]
+        if old_routine["return_type"] != new_routine["return_type"]:
+            changes["return_type"] = [old_routine["return_type"], new_routine["return_type"]]
+    # Definitions identical when compressed need not be decompressed
+    if obj_type != "table" and old.definitions.get(obj_name) != new.definitions.get(obj_name):
+        old_definition = normalize_definition(old.definition(obj_name))
+        new_definition = normalize_definition(new.definition(obj_name))
+        if old_definition != new_definition:
+            changes["definition"] = {"old_lines": len(old_definition.splitlines()),
+                                     "new_lines": len(new_definition.splitlines())}
+    return changes
+
+
+def definition_diff(old, new, obj_type, obj_name, context=3):
+    """
+    Returns a unified diff of a view or routine definition between two catalogs.
+
+    Computed on request rather than in diff_catalogs, as diffing thousands of
+    long procedures would dominate the comparison.
+    """
+    old_lines = normalize_definition(old.definition(obj_name)).splitlines()
+    new_lines = normalize_definition(new.definition(obj_name)).splitlines()
+    return "\n".join(difflib.unified_diff(old_lines, new_lines, "old", "new", n=context, lineterm=""))
+
+
+# Function to compare two catalog snapshots
+def diff_catalogs(old, new, old_fingerprint=None, new_fingerprint=None):
+    """
+    Compares two catalogs, descending only into what changed.
+
+    Args:
+        old (CatalogSnapshot): The baseline, e.g. last night's catalog.
+        new (CatalogSnapshot): The catalog compared with it.
+        old_fingerprint, new_fingerprint (CatalogFingerprint): Fingerprints
+            already computed for the catalogs; computed here if None.
+
+    Returns:
+        dict: "identical" (bool); "added" and "removed", lists of dicts with
+        type, schema and name; "changed", the same dicts with the
+        object_changes() under "changes"; "schemas", the added, removed and
+        changed schema names; and "stats" with the numbers of objects and
+        schemas compared and skipped.
+    """
+    old_fingerprint = old_fingerprint or CatalogFingerprint.from_catalog(old)
+    new_fingerprint = new_fingerprint or CatalogFingerprint.from_catalog(new)
+    report = {
+        "identical": old_fingerprint.digest == new_fingerprint.digest,
+        "added": [],
+        "removed": [],
+        "changed": [],
+        "schemas": {"added": [], "removed": [], "changed": []},
+        "stats": {"objects": len(new_fingerprint.objects), "objects_compared": 0,
+                  "schemas": len(new_fingerprint.schemas), "schemas_skipped": 0},
+    }
+    if report["identical"]:
+        report["stats"]["schemas_skipped"] = len(new_fingerprint.schemas)
+        return report
+
+    # Objects of the schemas whose roll-up hash differs; an object that moved
+    # schema changes the hash of both
+    keys = set()
+    for schema in sorted(set(old_fingerprint.schemas) | set(new_fingerprint.schemas)):
+        old_hash, new_hash = old_fingerprint.schemas.get(schema), new_fingerprint.schemas.get(schema)
+        if old_hash == new_hash:
+            report["stats"]["schemas_skipped"] += 1
+            continue
+        kind = "added" if old_hash is None else "removed" if new_hash is None else "changed"
+        report["schemas"][kind].append(schema)
+        keys.update(old_fingerprint.by_schema.get(schema, []))
+        keys.update(new_fingerprint.by_schema.get(schema, []))
+
+    for obj_type, name in sorted(keys, key=lambda key: (OBJECT_TYPES.index(key[0]), key[1].lower())):
+        old_entry = old_fingerprint.objects.get((obj_type, name))
+        new_entry = new_fingerprint.objects.get((obj_type, name))
+        report["stats"]["objects_compared"] += 1
+        if old_entry is None:
+            report["added"].append({"type": obj_type, "schema": new_entry[0], "name": name})
+        elif new_entry is None:
+            report["removed"].append({"type": obj_type, "schema": old_entry[0], "name": name})
+        elif old_entry[1] != new_entry[1]:
+            report["changed"].append({"type": obj_type, "schema": new_entry[0], "name": name,
+                                      "changes": object_changes(old, new, obj_type, name)})
+    return report
+
+
+def summary_rows(report):
+    """Returns one (change, type, schema, name, details) row per object of a diff report."""
+    rows = [("added", entry["type"], entry["schema"], entry["name"], "") for entry in report["added"]]
+    rows += [("removed", entry["type"], entry["schema"], entry["name"], "") for entry in report["removed"]]
+    for entry in report["changed"]:
+        rows.append(("changed", entry["type"], entry["schema"], entry["name"], describe_changes(entry["changes"])))
+    return rows
+
+
+def describe_changes(changes):
+    """Returns a one-line description of object_changes() output."""
+    parts = []
+    if "schema" in changes:
+        parts.append(f"moved from {changes['schema'][0]} to {changes['schema'][1]}")
+    for aspect in ("columns", "parameters"):
+        found = changes.get(aspect)
+        if not found:
+            continue
+        for kind in ("added", "removed"):
+            if found[kind]:
+                parts.append(f"{aspect} {kind}: " + ", ".join(record["name"] for record in found[kind]))
+        for change in found["changed"]:
+            fields = ", ".join(f"{field} {old} -> {new}" for field, (old, new) in change["fields"].items())
+            parts.append(f"{change['name']}: {fields}")
+        if found.get("reordered"):
+            parts.append(f"{aspect} reordered")
+    if "foreign_keys" in changes:
+        for kind in ("added", "removed"):
+            names = sorted(set(rel["fk_name"] for rel in changes["foreign_keys"][kind]))
+            if names:
+                parts.append(f"foreign keys {kind}: " + ", ".join(names))
+    if "return_type" in changes:
+        parts.append(f"returns {changes['return_type'][0]} -> {changes['return_type'][1]}")
+    if "definition" in changes:
+        parts.append(f"definition changed ({changes['definition']['old_lines']} -> "
+                     f"{changes['definition']['new_lines']} lines)")
+    return "; ".join(parts)
+
+
+def load_catalog_file(path_or_file):
+    """
+    Reads a catalog saved as JSON.
+
+    Accepts the catalog.json of extract_cli, to_dict() output in general,
+    and the per-database .json.gz files of the crawler, given as a path or a
+    binary file object.
+    """
+    if isinstance(path_or_file, str):
+        opener = gzip.open if path_or_file.endswith(".gz") else open
+        with opener(path_or_file, "rb") as f:
+            data = f.read()
+    else:
+        data = path_or_file.read()
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    data = json.loads(data)
+    return CatalogSnapshot.from_dict(data.get("catalog", data))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two saved catalogs and report schema drift.")
+    parser.add_argument("old", help="Baseline catalog (catalog.json or a crawler .json.gz file)")
+    parser.add_argument("new", help="Catalog compared with the baseline")
+    parser.add_argument("--json", help="Also write the full report to this JSON file")
+    parser.add_argument("--exit-code", action="store_true", help="Exit with 1 if the catalogs differ")
+    args = parser.parse_args(argv)
+
+    with paused_gc():
+        old, new = load_catalog_file(args.old), load_catalog_file(args.new)
+    report = diff_catalogs(old, new)
+    stats = report["stats"]
+    if report["identical"]:
+        print(f"No drift: {stats['objects']} objects in {stats['schemas']} schemas are identical.")
+    else:
+        print(f"{len(report['added'])} added, {len(report['removed'])} removed, {len(report['changed'])} changed "
+              f"({stats['schemas_skipped']} of {stats['schemas']} schemas unchanged)")
+        for change, obj_type, schema, name, details in summary_rows(report):
+            print(f"{change:<8} {obj_type:<10} {schema}.{name}" + (f"  {details}" if details else ""))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 1 if args.exit_code and not report["identical"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Whole-database ER diagrams.
+
+A single Mermaid diagram of a large schema is too big to render, so the
+tables are partitioned into clusters along the foreign key graph (connected
+components, optionally within each schema) and clusters above the page size
+are split in breadth-first order so related tables stay together. Each
+cluster becomes one small diagram with full entity attributes, and an
+overview diagram shows the clusters and the foreign keys between them.
+"""
+
+import re
+from collections import deque
+
+DEFAULT_MAX_TABLES = 25
+DEFAULT_MAX_COLUMNS = 15
+CLUSTER_MODES = ["component", "schema"]
+# Above this many clusters the overview shows counts only
+OVERVIEW_SAMPLE_LIMIT = 40
+
+
+def mermaid_name(name):
+    """Returns a name usable as a Mermaid entity or attribute word."""
+    cleaned = re.sub(r"[^A-Za-z0-9_\-\(\)\[\]]", "_", str(name))
+    return cleaned if re.match(r"[A-Za-z_\*]", cleaned) else "_" + cleaned
+
+
+def _fk_neighbours(catalog, tables):
+    # Undirected foreign key adjacency restricted to the given tables
+    neighbours = {table: [] for table in tables}
+    for rel in catalog.foreign_keys:
+        source, target = rel.referencing_table, rel.referenced_table
+        if source in neighbours and target in neighbours and source != target:
+            if target not in neighbours[source]:
+                neighbours[source].append(target)
+            if source not in neighbours[target]:
+                neighbours[target].append(source)
+    return neighbours
+
+
+def _components(neighbours):
+    # Connected components, each listed in breadth-first order from its
+    # best-connected table so that splitting keeps neighbours together
+    seen = set()
+    components = []
+    for start in sorted(neighbours, key=lambda t: (-len(neighbours[t]), t.lower())):
+        if start in seen:
+            continue
+        seen.add(start)
+        component = []
+        queue = deque([start])
+        while queue:
+            table = queue.popleft()
+            component.append(table)
+            for neighbour in sorted(neighbours[table], key=lambda t: (-len(neighbours[t]), t.lower())):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        components.append(component)
+    return components
+
+
+# Function to partition the tables of a catalog into diagram-sized clusters
+def cluster_tables(catalog, max_tables=DEFAULT_MAX_TABLES, mode="component"):
+    """
+    Groups tables into clusters of at most max_tables.
+
+    Args:
+        catalog (CatalogSnapshot): The catalog to partition.
+        max_tables (int): Maximum number of tables per cluster.
+        mode (str): "component" clusters by foreign key connectivity only,
+            "schema" first groups tables by schema.
+
+    Returns:
+        list: Clusters as lists of table names. Connected clusters come first,
+        largest first; tables without foreign keys are paged together last.
+    """
+    if mode == "schema":
+        groups = {}
+        for table, schema in catalog.tables.items():
+            groups.setdefault(schema, []).append(table)
+        groups = [groups[schema] for schema in sorted(groups, key=str.lower)]
+    else:
+        groups = [list(catalog.tables)]
+
+    connected = []
+    standalone = []
+    for group in groups:
+        for component in _components(_fk_neighbours(catalog, group)):
+            if len(component) == 1:
+                standalone.extend(component)
+            else:
+                for i in range(0, len(component), max_tables):
+                    connected.append(component[i:i + max_tables])
+
+    connected.sort(key=len, reverse=True)
+    standalone.sort(key=str.lower)
+    return connected + [standalone[i:i + max_tables] for i in range(0, len(standalone), max_tables)]
+
+
+def entity_lines(catalog, table, max_columns=DEFAULT_MAX_COLUMNS):
+    """
+    Returns the Mermaid entity block of a table with its columns.
+
+    Key columns are always listed; other columns are listed up to
+    max_columns in total.
+    """
+    fk_columns = set(rel.referencing_column for rel in catalog.fks_by_referencing.get(table, []))
+    lines = [f"    {mermaid_name(table)} {{"]
+    shown = 0
+    for column in catalog.columns.get(table, []):
+        keys = []
+        if column.primary_key:
+            keys.append("PK")
+        if column.name in fk_columns:
+            keys.append("FK")
+        if not keys and shown >= max_columns:
+            continue
+        shown += 1
+        line = f"        {mermaid_name(column.data_type)} {mermaid_name(column.name)}"
+        if keys:
+            line += " " + ", ".join(keys)
+        lines.append(line)
+    lines.append("    }")
+    return lines
+
+
+def relationship_line(rel):
+    """Returns the Mermaid line of a foreign key, parent side first."""
+    return (f'    {mermaid_name(rel.referenced_table)} ||--o{{ '
+            f'{mermaid_name(rel.referencing_table)} : "{rel.referencing_column}"')
+
+
+# Function to generate the paged whole-database ERD
+def generate_schema_erd(catalog, max_tables=DEFAULT_MAX_TABLES, mode="component", max_columns=DEFAULT_MAX_COLUMNS):
+    """
+    Builds an overview diagram and one diagram per table cluster.
+
+    Args:
+        catalog (CatalogSnapshot): The catalog to draw.
+        max_tables (int): Maximum number of tables per page.
+        mode (str): Clustering mode, see cluster_tables.
+        max_columns (int): Maximum number of non-key columns per entity.
+
+    Returns:
+        dict: "overview" - Mermaid code of the clusters and the number of
+        foreign keys between them; "pages" - list of dicts with "title",
+        "tables" and "code" of each cluster diagram.
+    """
+    clusters = cluster_tables(catalog, max_tables, mode)
+    cluster_of = {}
+    for number, tables in enumerate(clusters, start=1):
+        for table in tables:
+            cluster_of[table] = number
+
+    pages = []
+    for number, tables in enumerate(clusters, start=1):
+        members = set(tables)
+        code = ["erDiagram"]
+        for table in tables:
+            code.extend(entity_lines(catalog, table, max_columns))
+        added = set()
+        for table in tables:
+            for rel in catalog.fks_by_referencing.get(table, []):
+                key = (rel.referencing_table, rel.referenced_table, rel.referencing_column)
+                if rel.referenced_table in members and key not in added:
+                    added.add(key)
+                    code.append(relationship_line(rel))
+        pages.append({
+            "title": f"Cluster {number}: {tables[0]} ({len(tables)} tables)",
+            "tables": tables,
+            "code": "\n".join(code),
+        })
+
+    # Foreign keys crossing cluster boundaries, counted per cluster pair
+    crossing = {}
+    for rel in catalog.foreign_keys:
+        source = cluster_of.get(rel.referencing_table)
+        target = cluster_of.get(rel.referenced_table)
+        if source and target and source != target:
+            crossing[(target, source)] = crossing.get((target, source), 0) + 1
+
+    # Sample table names are only listed while the overview stays small
+    sample_size = 5 if len(clusters) <= OVERVIEW_SAMPLE_LIMIT else 0
+    overview = ["erDiagram"]
+    for number, tables in enumerate(clusters, start=1):
+        overview.append(f"    CLUSTER_{number} {{")
+        overview.append(f'        int table_count "{len(tables)}"')
+        for table in tables[:sample_size]:
+            overview.append(f"        table {mermaid_name(table)}")
+        overview.append("    }")
+    for (parent, child), count in sorted(crossing.items()):
+        overview.append(f'    CLUSTER_{parent} ||--o{{ CLUSTER_{child} : "{count} FKs"')
+
+    return {"overview": "\n".join(overview), "pages": pages}
@@ -0,0 +1,150 @@
+"""
+Trigram index for ranked, typo-tolerant table search.
+
+Every table name is broken into character trigrams (padded, so prefixes get
+trigrams of their own) and each trigram maps to the array of table numbers
+containing it. A query counts its shared trigrams against all tables at once
+with numpy, and only the best candidates are scored in Python, so a search
+stays in the millisecond range on catalogs with tens of thousands of tables.
+"""
+
+import re
+
+import numpy as np
+
+DEFAULT_LIMIT = 50
+# Candidates taken from the trigram counts before exact scoring
+CANDIDATE_POOL = 500
+# Minimum trigram similarity of a fuzzy match
+MIN_SIMILARITY = 0.3
+
+
+def trigrams(text):
+    """Returns the set of padded trigrams of a lower-cased string."""
+    padded = f"  {text.lower()} "
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def name_tokens(name):
+    """Splits a name into lower-case words at underscores, case changes and digits."""
+    return [token.lower() for token in re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+", name)]
+
+
+class TableSearchIndex:
+    """
+    Search index over the tables of a catalog.
+
+    Queries may be schema-qualified ("sales.ord"), in which case the part
+    before the dot has to be a prefix of the table's schema.
+    """
+
+    def __init__(self, tables):
+        """
+        Args:
+            tables (dict): Table name -> schema name.
+        """
+        self.names = sorted(tables, key=str.lower)
+        self.schemas = [tables[name] or "" for name in self.names]
+        self._lower = [name.lower() for name in self.names]
+        self._tokens = [set(name_tokens(name)) for name in self.names]
+        self._numbers = {name: number for number, name in enumerate(self.names)}
+
+        by_schema = {}
+        for number, schema in enumerate(self.schemas):
+            by_schema.setdefault(schema.lower(), []).append(number)
+        self._by_schema = {schema: np.array(numbers, dtype=np.int32) for schema, numbers in by_schema.items()}
+
+        postings = {}
+        sizes = []
+        for number, name in enumerate(self._lower):
+            grams = trigrams(name)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(number)
+        self._sizes = np.array(sizes, dtype=np.float32)
+        self._postings = {gram: np.array(numbers, dtype=np.int32) for gram, numbers in postings.items()}
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls(catalog.tables)
+
+    def qualified_name(self, name):
+        """Returns "schema.table" for a table name of the index."""
+        number = self._numbers.get(name)
+        schema = self.schemas[number] if number is not None else ""
+        return f"{schema}.{name}" if schema else name
+
+    def _schema_numbers(self, schema_prefix):
+        # Numbers of the tables whose schema starts with the prefix, in name order
+        matches = [numbers for schema, numbers in self._by_schema.items() if schema.startswith(schema_prefix)]
+        return np.sort(np.concatenate(matches)) if matches else np.array([], dtype=np.int32)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Returns the tables best matching a query.
+
+        Exact names rank first, then prefixes, substrings and whole-word
+        matches, then fuzzy matches by trigram similarity, which tolerates
+        typos and transposed letters.
+
+        Args:
+            query (str): Partial, possibly misspelt, optionally
+                schema-qualified table name.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: (table name, score) pairs, best first.
+        """
+        query = query.strip()
+        schema_prefix = None
+        if "." in query:
+            schema_prefix, query = query.rsplit(".", 1)
+            schema_prefix = schema_prefix.strip("[]").lower()
+        query = query.strip("[]").lower()
+
+        if not query:
+            numbers = range(len(self.names)) if schema_prefix is None else self._schema_numbers(schema_prefix).tolist()
+            return [(self.names[n], 1.0) for n in numbers[:limit]]
+
+        query_grams = trigrams(query)
+        lists = [self._postings[gram] for gram in query_grams if gram in self._postings]
+        if len(query) < 3:
+            # Too short for inner trigrams; substrings are found by a scan
+            lists.append(np.array([n for n, name in enumerate(self._lower) if query in name], dtype=np.int32))
+        lists = [numbers for numbers in lists if len(numbers)]
+        if not lists:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names)).astype(np.float32)
+        similarity = 2 * shared / (len(query_grams) + self._sizes)
+        if schema_prefix is not None:
+            allowed = np.zeros(len(self.names), dtype=bool)
+            allowed[self._schema_numbers(schema_prefix)] = True
+            similarity[~allowed] = -1
+
+        pool = min(CANDIDATE_POOL, len(self.names))
+        if pool < len(self.names):
+            candidates = np.argpartition(-similarity, pool - 1)[:pool]
+        else:
+            candidates = np.arange(len(self.names))
+
+        query_tokens = set(name_tokens(query)) | {query}
+        results = []
+        for number in candidates.tolist():
+            if similarity[number] < 0:
+                continue
+            name = self._lower[number]
+            score = float(similarity[number])
+            if name == query:
+                score += 3
+            elif name.startswith(query):
+                score += 2
+            elif query in name:
+                score += 1
+            elif query_tokens & self._tokens[number]:
+                score += 0.5
+            elif score < MIN_SIMILARITY:
+                continue
+            results.append((-score, len(name), name, number))
+
+        results.sort()
+        return [(self.names[number], round(-score, 3)) for score, _, _, number in results[:limit]]
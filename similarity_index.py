@@ -0,0 +1,193 @@
+"""
+Structural table similarity with MinHash and locality-sensitive hashing.
+
+Every table is fingerprinted by the set of its column names and of its
+column name/type pairs. A MinHash signature of that set estimates the
+Jaccard similarity between any two tables, and the signatures are cut into
+bands that are hashed into LSH buckets: tables sharing a bucket in any band
+are candidates, so a lookup only compares a table with the few tables likely
+to be similar instead of with the whole catalog. Candidates are then ranked
+by their exact Jaccard similarity.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+NUM_PERM = 128
+# 64 bands of 2 rows make a pair a candidate with probability
+# 1 - (1 - s**2)**64: about 93% at MIN_SIMILARITY and over 99% from 0.3
+BANDS = 64
+DEFAULT_TOP_K = 10
+# Tables below this similarity are not reported
+MIN_SIMILARITY = 0.2
+
+# Feature hashes permuted per numpy pass when signing many tables at once
+SIGNATURE_CHUNK = 8192
+
+# A prime above 2**32, so (a * h + b) % PRIME never overflows 64 bits
+PRIME = 4294967311
+
+
+def table_features(columns):
+    """
+    Returns the feature set of a table.
+
+    Args:
+        columns (list): Column records, as held by CatalogSnapshot.columns.
+
+    Returns:
+        frozenset: Lower-case column names and "name:type" pairs, the type
+        without its length.
+    """
+    features = set()
+    for column in columns:
+        name = column.name.lower()
+        base_type = re.sub(r"\(.*\)", "", column.data_type.lower())
+        features.add(name)
+        features.add(f"{name}:{base_type}")
+    return frozenset(features)
+
+
+class ColumnSimilarityIndex:
+    """
+    MinHash/LSH index of table feature sets.
+
+    Tables are added, replaced and removed one at a time, so the index can
+    follow an incrementally refreshed catalog through sync().
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+        # Mixes the rows of a band into one bucket number (wrapping arithmetic)
+        self._band_mix = generator.randint(1, 2 ** 32, size=self.rows, dtype=np.uint64)
+        self._hashes = {}       # feature -> 32-bit hash, shared by all tables
+        self.features = {}      # table name -> feature set
+        self._band_keys = {}    # table name -> [bucket key per band]
+        self._buckets = {}      # bucket key -> set of table names
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        index = cls()
+        index.sync(catalog)
+        return index
+
+    def _hash(self, feature):
+        value = self._hashes.get(feature)
+        if value is None:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest()
+            value = self._hashes[feature] = int.from_bytes(digest, "little")
+        return value
+
+    def signatures(self, feature_sets):
+        """
+        Returns the MinHash signatures of non-empty feature sets.
+
+        The sets are signed in chunks of about SIGNATURE_CHUNK features, each
+        chunk in a single vectorized pass.
+
+        Returns:
+            list: One array of num_perm values per feature set.
+        """
+        results = []
+        start = 0
+        while start < len(feature_sets):
+            end, size = start, 0
+            while end < len(feature_sets) and (end == start or size + len(feature_sets[end]) <= SIGNATURE_CHUNK):
+                size += len(feature_sets[end])
+                end += 1
+            chunk = feature_sets[start:end]
+            hashes = np.array([self._hash(feature) for features in chunk for feature in features], dtype=np.uint64)
+            offsets = np.cumsum([0] + [len(features) for features in chunk[:-1]])
+            permuted = (np.outer(self._a, hashes) + self._b[:, None]) % PRIME
+            results.extend(np.minimum.reduceat(permuted, offsets, axis=1).T)
+            start = end
+        return results
+
+    def add(self, table, features, signature=None):
+        """Adds or replaces a table."""
+        self.remove(table)
+        self.features[table] = features
+        if not features:
+            return
+        if signature is None:
+            signature = self.signatures([features])[0]
+        band_numbers = (signature.reshape(self.bands, self.rows) * self._band_mix).sum(axis=1)
+        keys = list(enumerate(band_numbers.tolist()))
+        self._band_keys[table] = keys
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(table)
+
+    def remove(self, table):
+        """Removes a table if it is indexed."""
+        self.features.pop(table, None)
+        for key in self._band_keys.pop(table, []):
+            bucket = self._buckets[key]
+            bucket.discard(table)
+            if not bucket:
+                del self._buckets[key]
+
+    def sync(self, catalog):
+        """
+        Brings the index in line with a catalog snapshot.
+
+        Only tables whose columns changed are re-hashed, so after an
+        incremental catalog refresh this costs little more than comparing
+        the feature sets.
+
+        Returns:
+            int: Number of tables added, replaced or removed.
+        """
+        removed = [table for table in self.features if table not in catalog.tables]
+        for table in removed:
+            self.remove(table)
+
+        changed = {}
+        for table in catalog.tables:
+            features = table_features(catalog.columns.get(table, []))
+            if self.features.get(table) != features:
+                changed[table] = features
+        tables = [table for table, features in changed.items() if features]
+        for table, signature in zip(tables, self.signatures([changed[table] for table in tables])):
+            self.add(table, changed[table], signature)
+        for table, features in changed.items():
+            if not features:
+                self.add(table, features)
+        return len(removed) + len(changed)
+
+    def similar(self, table, top_k=DEFAULT_TOP_K, min_similarity=MIN_SIMILARITY):
+        """
+        Returns the tables structurally most similar to a table.
+
+        Args:
+            table (str): Name of an indexed table.
+            top_k (int): Maximum number of results.
+            min_similarity (float): Lowest Jaccard similarity reported.
+
+        Returns:
+            list: (table name, similarity) pairs, most similar first.
+        """
+        features = self.features.get(table)
+        if not features:
+            return []
+        candidates = set()
+        for key in self._band_keys.get(table, []):
+            candidates |= self._buckets[key]
+        candidates.discard(table)
+
+        scored = []
+        for candidate in candidates:
+            other = self.features[candidate]
+            similarity = len(features & other) / len(features | other)
+            if similarity >= min_similarity:
+                scored.append((-similarity, candidate.lower(), candidate))
+        scored.sort()
+        return [(candidate, round(-similarity, 3)) for similarity, _, candidate in scored[:top_k]]
@@ -0,0 +1,161 @@
+"""
+Import-time profiling of cold starts.
+
+With STARTUP_PROFILE=1 the app times every module imported during the first
+script run of its process, and how long that run takes to finish (the first
+paint). The report goes to stderr, where container logs keep it, and is
+shown in the app's sidebar. Later reruns are not profiled, as their imports
+are already cached.
+
+The import cost of any module can also be measured from the command line
+in fresh interpreters, which is what a container scaled up from zero pays:
+
+    python startup_profile.py explorer extract_cli crawler
+"""
+
+import builtins
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ENABLED = os.environ.get("STARTUP_PROFILE", "0") == "1"
+# Modules listed in a report, slowest first
+REPORT_MODULES = int(os.environ.get("STARTUP_PROFILE_MODULES", 30))
+
+_original_import = None
+_started = None
+_first_run = None
+_finished = False
+_records = []       # (module, self seconds, cumulative seconds, nesting depth)
+_records_lock = threading.Lock()
+_local = threading.local()
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Modules already loaded and relative imports (counted in their parent)
+    # are passed straight through
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with _records_lock:
+            _records.append((name, elapsed - children, elapsed, len(stack)))
+
+
+def start():
+    """Starts timing imports, once per process and only when ENABLED."""
+    global _original_import, _started
+    if not ENABLED or _finished or _original_import is not None:
+        return
+    _started = time.perf_counter()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def finish():
+    """
+    Stops timing imports at the end of the first run and logs the report.
+
+    Returns:
+        bool: True on the call that finished profiling, False otherwise.
+    """
+    global _original_import, _first_run, _finished
+    if _original_import is None:
+        return False
+    builtins.__import__ = _original_import
+    _original_import = None
+    _first_run = time.perf_counter() - _started
+    _finished = True
+    print(format_report(), file=sys.stderr)
+    return True
+
+
+def report():
+    """
+    Returns the profile of the first run.
+
+    Returns:
+        dict: "first_run" and "imports" in seconds, and "modules", a list of
+        dicts with module, self_ms, cumulative_ms and depth (0 for modules
+        imported by the app itself), slowest cumulative first.
+    """
+    with _records_lock:
+        records = list(_records)
+    modules = [{"module": name, "self_ms": self_time * 1000, "cumulative_ms": cumulative * 1000, "depth": depth}
+               for name, self_time, cumulative, depth in records]
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return {
+        "first_run": _first_run,
+        "imports": sum(cumulative for _, _, cumulative, depth in records if depth == 0),
+        "modules": modules,
+    }
+
+
+def format_report(limit=REPORT_MODULES):
+    """Returns report() as a plain-text table."""
+    profile = report()
+    lines = []
+    if profile["first_run"] is not None:
+        lines.append(f"First run: {profile['first_run'] * 1000:.0f} ms, "
+                     f"of which imports: {profile['imports'] * 1000:.0f} ms")
+    lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for m in profile["modules"][:limit]:
+        lines.append(f"{m['cumulative_ms']:>14.1f} {m['self_ms']:>9.1f}  {'  ' * m['depth']}{m['module']}")
+    return "\n".join(lines)
+
+
+# Function to measure the cold import time of a module
+def measure_cold_import(module, runs=3):
+    """
+    Imports a module in fresh interpreters with -X importtime.
+
+    Args:
+        module (str): Name of the module to import.
+        runs (int): Interpreters started; the fastest run is kept, as the
+            first one also pays for filling the OS file cache.
+
+    Returns:
+        tuple: (total microseconds, list of (module, self us, cumulative us)
+        of the fastest run).
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            raise ImportError(result.stderr.strip().splitlines()[-1])
+        entries = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            entries.append((name.strip(), int(self_us), int(cumulative_us)))
+        # The module's own line holds the time of everything it imported
+        total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best
+
+
+def main(argv=None):
+    modules = (argv if argv is not None else sys.argv[1:]) or ["explorer"]
+    for module in modules:
+        total, entries = measure_cold_import(module)
+        print(f"{module}: {total / 1000:.1f} ms\n{'cumulative ms':>14} {'self ms':>9}  slowest modules")
+        for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[1], reverse=True)[:10]:
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Synthetic SQL Server catalogs and a stand-in for pyodbc connections.
+
+generate_catalog_rows builds the result sets of every catalog query for a
+made-up database of any size (tables with primary keys and a random foreign
+key graph, views, procedures and functions referencing them).
+SyntheticConnection answers the app's catalog, batch, refresh and version
+queries from those rows, with an optional per-query latency to imitate a
+network round trip, and counts the queries it serves. It is used by the
+benchmarks and works wherever a pyodbc connection or a ConnectionPool
+connect function is accepted:
+
+    rows = generate_catalog_rows(tables=1000)
+    stats = QueryStats()
+    pool = ConnectionPool("synthetic", connect=lambda _: SyntheticConnection(rows, 0.005, stats))
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from catalog import CATALOG_QUERIES, BATCH_QUERIES, REFRESH_QUERIES, _timestamp
+from connection_pool import VALIDATION_QUERY
+
+SCHEMAS = ["dbo", "sales", "hr", "finance", "inventory"]
+WORDS = ["customer", "order", "line", "product", "invoice", "payment", "address", "account",
+         "ledger", "stock", "item", "vendor", "employee", "shipment", "region", "price"]
+COLUMN_TYPES = [("int", None), ("bigint", None), ("varchar", 50), ("nvarchar", 200), ("nvarchar", -1),
+                ("decimal", None), ("datetime", None), ("bit", None), ("char", 3)]
+
+# Result columns of each batch query that are matched against the IN lists
+BATCH_FILTER_COLUMNS = {
+    "columns": [1], "primary_keys": [0], "views": [1], "routines": [1], "definitions": [0], "parameters": [0],
+    "tables": [1], "foreign_keys": [2, 5], "dependencies": [0, 1],
+}
+
+
+# Function to generate the catalog of a synthetic database
+def generate_catalog_rows(tables=100, columns=10, foreign_keys=1.5, views=None, procedures=None,
+                          functions=None, definition_size=0, seed=0):
+    """
+    Generates the result sets of CATALOG_QUERIES for a synthetic database.
+
+    Args:
+        tables (int): Number of tables.
+        columns (int): Columns per table, including the primary key.
+        foreign_keys (float): Average number of foreign keys per table, each
+            referencing a randomly chosen earlier table.
+        views (int): Number of views; tables // 5 by default.
+        procedures (int): Number of stored procedures; tables // 5 by default.
+        functions (int): Number of functions; tables // 10 by default.
+        definition_size (int): Approximate length in characters of every
+            procedure and function body; short one-line bodies if 0.
+        seed (int): Random seed, so a scale always yields the same database.
+
+    Returns:
+        dict: Catalog query name -> list of row tuples.
+    """
+    rng = random.Random(seed)
+    views = tables // 5 if views is None else views
+    procedures = tables // 5 if procedures is None else procedures
+    functions = tables // 10 if functions is None else functions
+    created = datetime(2024, 1, 1)
+
+    rows = {name: [] for name in CATALOG_QUERIES}
+    object_id = 1000
+
+    def add_object(name, obj_type):
+        nonlocal object_id
+        object_id += 1
+        modified = created + timedelta(minutes=object_id)
+        rows["objects"].append((object_id, name, obj_type, created, modified))
+
+    table_names = []
+    for number in range(tables):
+        name = "_".join(rng.sample(WORDS, rng.randint(1, 3))).title().replace("_", "") + str(number)
+        schema = rng.choice(SCHEMAS)
+        table_names.append((schema, name))
+        add_object(name, "U ")
+        rows["tables"].append((schema, name))
+        rows["columns"].append((schema, name, "Id", "int", None, "NO", 1))
+        rows["primary_keys"].append((name, "Id"))
+
+        # Foreign keys to earlier tables, so the graph has no self-loops
+        fk_count = min(number, int(foreign_keys) + (rng.random() < foreign_keys % 1))
+        for parent_schema, parent in rng.sample(table_names[:-1], fk_count):
+            column = f"{parent}Id"
+            rows["columns"].append((schema, name, column, "int", None, "YES", 0))
+            rows["foreign_keys"].append((f"FK_{name}_{parent}", schema, name, column, parent_schema, parent, "Id"))
+
+        for position in range(columns - 1 - fk_count):
+            data_type, max_length = rng.choice(COLUMN_TYPES)
+            column = f"{rng.choice(WORDS).title()}{rng.choice(['Name', 'Code', 'Date', 'Amount', 'Flag'])}{position}"
+            rows["columns"].append((schema, name, column, data_type, max_length, rng.choice(["YES", "NO"]), 0))
+
+    def referenced_tables():
+        return rng.sample(table_names, min(len(table_names), rng.randint(1, 3)))
+
+    for number in range(views):
+        schema, name = rng.choice(SCHEMAS), f"v_Report{number}"
+        add_object(name, "V ")
+        used = referenced_tables()
+        rows["views"].append((schema, name))
+        rows["definitions"].append((name, f"CREATE VIEW {name} AS SELECT * FROM {used[0][1]}"))
+        for position in range(min(columns, 8)):
+            rows["columns"].append((schema, name, f"Col{position}", "nvarchar", 100, "YES", 0))
+        rows["dependencies"].extend((table, name, "V ") for _, table in used)
+
+    for number in range(procedures + functions):
+        is_procedure = number < procedures
+        schema = rng.choice(SCHEMAS)
+        name = f"usp_Process{number}" if is_procedure else f"fn_Compute{number}"
+        obj_type = "P " if is_procedure else "FN"
+        add_object(name, obj_type)
+        used = referenced_tables()
+        statements = [f"SELECT * FROM {used[0][1]}"]
+        length = len(statements[0])
+        while length < definition_size:
+            _, table = rng.choice(used)
+            statements.append(f"UPDATE {table} SET {rng.choice(WORDS).title()}Amount = @p{rng.randint(0, 3)} "
+                              f"WHERE Id = {rng.randint(1, 100000)};")
+            length += len(statements[-1]) + 5
+        body = "AS BEGIN\r\n    " + "\r\n    ".join(statements) + "\r\nEND"
+        routine_type = "PROCEDURE" if is_procedure else "FUNCTION"
+        rows["routines"].append((schema, name, routine_type, None if is_procedure else "decimal", None))
+        rows["definitions"].append((name, f"CREATE {routine_type} {name} {body}"))
+        for position in range(rng.randint(0, 4)):
+            rows["parameters"].append((name, f"@p{position}", "int", None, "IN"))
+        rows["dependencies"].extend((table, name, obj_type) for _, table in used)
+
+    return rows
+
+
+class QueryStats:
+    """Thread-safe counters of the queries served by SyntheticConnections."""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.by_kind = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, rows):
+        with self._lock:
+            self.queries += 1
+            self.rows += rows
+            self.by_kind[kind] = self.by_kind.get(kind, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.rows = 0
+            self.by_kind = {}
+
+
+class SyntheticCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+
+    def execute(self, query, *params):
+        kind, rows = self.connection.answer(query, params)
+        if self.connection.latency:
+            time.sleep(self.connection.latency)
+        if self.connection.stats is not None:
+            self.connection.stats.record(kind, len(rows))
+        self._rows = rows
+        return self
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class SyntheticConnection:
+    """
+    pyodbc-like connection answering the app's queries from generated rows.
+
+    Args:
+        rows (dict): Result sets from generate_catalog_rows.
+        latency (float): Seconds every query waits before returning.
+        stats (QueryStats): Optional counters updated by every query.
+    """
+
+    def __init__(self, rows, latency=0.0, stats=None):
+        self.rows = rows
+        self.latency = latency
+        self.stats = stats
+        self._full = {" ".join(query.split()): name for name, query in CATALOG_QUERIES.items()}
+        # Batch queries are recognised by their text up to the first IN list
+        self._batch = [(" ".join(query.split("{names}")[0].split()), name) for name, query in BATCH_QUERIES.items()]
+
+    def cursor(self):
+        return SyntheticCursor(self)
+
+    def close(self):
+        pass
+
+    def answer(self, query, params):
+        """Returns (query kind, rows) for a query and its parameters."""
+        from metadata_cache import CATALOG_VERSION_QUERY
+
+        text = " ".join(query.split())
+        if text == VALIDATION_QUERY:
+            return "validation", [(1,)]
+        if text in self._full:
+            name = self._full[text]
+            return name, list(self.rows[name])
+        if query == CATALOG_VERSION_QUERY:
+            objects = self.rows["objects"]
+            return "version", [(len(objects), max((row[4] for row in objects), default=None), len(objects))]
+        if query == REFRESH_QUERIES["object_ids"]:
+            return "refresh", [(row[0],) for row in self.rows["objects"]]
+        if query == REFRESH_QUERIES["changed_objects"]:
+            mark = params[0]
+            return "refresh", [row for row in self.rows["objects"]
+                               if _timestamp(row[3]) > mark or _timestamp(row[4]) > mark]
+        for prefix, name in self._batch:
+            if text.startswith(prefix):
+                names = set(params)
+                return f"batch_{name}", [row for row in self.rows[name]
+                                         if any(row[i] in names for i in BATCH_FILTER_COLUMNS[name])]
+        raise ValueError(f"Unexpected query: {text[:120]}")